@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Latency and throughput benchmark for an Ollama endpoint.
+
+The benchmark sends the prompt from ``$OLLAMA_BENCH_PROMPT`` to
+``$OLLAMA_BENCH_MODEL`` at several concurrency levels (closed loop: each
+worker starts its next request as soon as the previous one finished) and
+streams every response so time-to-first-token can be measured client side.
+Prefill and decode rates come from the ``prompt_eval_*`` and ``eval_*``
+metrics in Ollama's final chunk.  Per level it reports p50/p95/p99 for wall
+latency and TTFT, the token rates and the aggregate throughput::
+
+    python scripts/bench_ollama.py --concurrency 1,2,4,8 --requests 16 --warmup
+
+Settings fall back to the process environment and then to the repository
+``.env``.  Results are written to
+``$EVIDENCE_ROOT/benchmarks/bench-<model>-<timestamp>/`` as ``summary.json``
+plus a Markdown ``report.md``.  The summary records the host fingerprint,
+Modelfile parameters and git commit the run is indexed by in
+``scripts/evidence_store.py``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Sequence
+
+from http_pool import ConnectionPool
+from ollama_api import DEFAULT_BASE_URL, StageRequest, stream_request
+from provenance import provenance
+from settings import DEFAULT_EVIDENCE_ROOT, REPO_ROOT, read_env_file, resolve_repo_path, resolve_setting
+from stats import distribution, rate
+
+DEFAULT_LEVELS = (1, 2, 4, 8)
+
+
+def parse_levels(raw: str) -> List[int]:
+    try:
+        levels = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid concurrency list {raw!r}") from exc
+    if not levels or any(level < 1 for level in levels):
+        raise argparse.ArgumentTypeError("concurrency levels must be positive integers")
+    return sorted(set(levels))
+
+
+@dataclass
+class Sample:
+    """One benchmark request."""
+
+    concurrency: int
+    index: int
+    ok: bool
+    wall_s: float
+    ttft_s: float | None = None
+    load_s: float | None = None
+    server_s: float | None = None
+    prompt_tokens: int | None = None
+    prefill_tps: float | None = None
+    eval_tokens: int | None = None
+    decode_tps: float | None = None
+    error: str | None = None
+
+
+def measure(
+    base_url: str,
+    model: str,
+    prompt: str,
+    timeout: float,
+    pool: ConnectionPool,
+    concurrency: int = 1,
+    index: int = 0,
+) -> Sample:
+    started = time.perf_counter()
+    try:
+        _, stats = stream_request(StageRequest(model=model, endpoint=base_url, prompt=prompt), timeout, pool=pool)
+    except RuntimeError as exc:
+        return Sample(concurrency, index, False, time.perf_counter() - started, error=str(exc))
+    server = stats.server
+    load_ns = server.get("load_duration")
+    total_ns = server.get("total_duration")
+    eval_count = server.get("eval_count")
+    decode = rate(eval_count, server.get("eval_duration"))
+    if decode is None and stats.first_token_at is not None and stats.finished_at and stats.chunks > 1:
+        # Without server metrics, approximate decode speed from the streamed chunks.
+        decode = (stats.chunks - 1) / max(stats.finished_at - stats.first_token_at, 1e-9)
+    return Sample(
+        concurrency=concurrency,
+        index=index,
+        ok=True,
+        wall_s=(stats.finished_at or time.perf_counter()) - started,
+        ttft_s=stats.time_to_first_token,
+        load_s=load_ns / 1e9 if isinstance(load_ns, (int, float)) else None,
+        server_s=total_ns / 1e9 if isinstance(total_ns, (int, float)) else None,
+        prompt_tokens=server.get("prompt_eval_count"),
+        prefill_tps=rate(server.get("prompt_eval_count"), server.get("prompt_eval_duration")),
+        eval_tokens=eval_count if isinstance(eval_count, int) else stats.chunks,
+        decode_tps=decode,
+    )
+
+
+def summarise_level(concurrency: int, samples: Sequence[Sample], wall: float) -> Dict[str, Any]:
+    ok = [sample for sample in samples if sample.ok]
+    decoded = sum(sample.eval_tokens or 0 for sample in ok)
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(ok) / wall, 4) if wall > 0 else None,
+        "aggregate_decode_tps": round(decoded / wall, 2) if wall > 0 else None,
+        "latency_s": distribution([sample.wall_s for sample in ok]),
+        "ttft_s": distribution([sample.ttft_s for sample in ok if sample.ttft_s is not None]),
+        "prefill_tps": distribution([sample.prefill_tps for sample in ok if sample.prefill_tps is not None]),
+        "decode_tps": distribution([sample.decode_tps for sample in ok if sample.decode_tps is not None]),
+    }
+
+
+def run_level(
+    base_url: str, model: str, prompt: str, concurrency: int, requests: int, timeout: float, pool: ConnectionPool
+) -> Dict[str, Any]:
+    """Run ``requests`` requests with ``concurrency`` workers and summarise them."""
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bench-c{concurrency}") as executor:
+        futures = [
+            executor.submit(measure, base_url, model, prompt, timeout, pool, concurrency, index)
+            for index in range(requests)
+        ]
+        samples = [future.result() for future in futures]
+    summary = summarise_level(concurrency, samples, time.perf_counter() - started)
+    summary["samples"] = [asdict(sample) for sample in samples]
+    return summary
+
+
+def run_sweep(
+    base_url: str,
+    model: str,
+    prompt: str,
+    levels: Sequence[int],
+    requests: int,
+    timeout: float,
+    warmup: bool = False,
+) -> Dict[str, Any]:
+    pool = ConnectionPool(max_per_host=max(levels))
+    try:
+        warmup_sample = None
+        if warmup:
+            print("Warm-up request...")
+            warmup_sample = asdict(measure(base_url, model, prompt, timeout, pool))
+        results = []
+        for level in levels:
+            count = max(requests, level)
+            print(f"Concurrency {level}: {count} request(s)")
+            results.append(run_level(base_url, model, prompt, level, count, timeout, pool))
+    finally:
+        pool.close()
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model": model,
+        "base_url": base_url,
+        "prompt_chars": len(prompt),
+        "requests_per_level": requests,
+        "warmup": warmup_sample,
+        "levels": results,
+    }
+
+
+def format_table(report: Mapping[str, Any]) -> List[str]:
+    def cell(summary: Mapping[str, Any] | None, key: str, digits: int = 3) -> str:
+        if not summary:
+            return "n/a"
+        return f"{summary[key]:.{digits}f}"
+
+    lines = [
+        "| Concurrency | Requests | Errors | Req/s | Latency p50/p95/p99 (s) | TTFT p50/p95/p99 (s) | Prefill tok/s p50 | Decode tok/s p50 | Aggregate decode tok/s |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for level in report["levels"]:
+        latency, ttft = level["latency_s"], level["ttft_s"]
+        lines.append(
+            f"| {level['concurrency']} | {level['requests']} | {level['errors']} | {level['throughput_rps'] or 0:.2f} | "
+            f"{cell(latency, 'p50')} / {cell(latency, 'p95')} / {cell(latency, 'p99')} | "
+            f"{cell(ttft, 'p50')} / {cell(ttft, 'p95')} / {cell(ttft, 'p99')} | "
+            f"{cell(level['prefill_tps'], 'p50', 1)} | {cell(level['decode_tps'], 'p50', 1)} | "
+            f"{level['aggregate_decode_tps'] or 0:.1f} |"
+        )
+    return lines
+
+
+def run_directory(evidence_root: Path, kind: str, model: str) -> Path:
+    sanitized = re.sub(r"[^A-Za-z0-9]+", "-", model).strip("-")
+    run_dir = evidence_root / "benchmarks" / f"{kind}-{sanitized}-{time.strftime('%Y%m%d-%H%M%S')}"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+
+def write_report(report: Mapping[str, Any], evidence_root: Path) -> Path:
+    run_dir = run_directory(evidence_root, "bench", str(report["model"]))
+    (run_dir / "summary.json").write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    markdown = [
+        "# Ollama benchmark report",
+        "",
+        f"*Generated by scripts/bench_ollama.py on {report['generated_at']}*",
+        "",
+        f"- Model: {report['model']}",
+        f"- Endpoint: {report['base_url']}",
+        f"- Prompt: {report.get('prompt_file') or 'inline'} ({report['prompt_chars']} chars)",
+        "",
+        *format_table(report),
+    ]
+    (run_dir / "report.md").write_text("\n".join(markdown) + "\n", encoding="utf-8")
+    return run_dir
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark an Ollama model across concurrency levels.")
+    parser.add_argument("--model", help="Model to benchmark (default: OLLAMA_BENCH_MODEL).")
+    parser.add_argument("--prompt-file", help="Prompt file relative to the repository (default: OLLAMA_BENCH_PROMPT).")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Ollama endpoint (default: %(default)s).")
+    parser.add_argument(
+        "--concurrency",
+        type=parse_levels,
+        default=list(DEFAULT_LEVELS),
+        help="Comma-separated concurrency levels to sweep (default: 1,2,4,8).",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=8,
+        help="Requests per concurrency level; raised to the level if lower (default: %(default)s).",
+    )
+    parser.add_argument("--warmup", action="store_true", help="Send one untimed request first so the model is loaded.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-read timeout in seconds (default: %(default)s).")
+    parser.add_argument("--output-root", help="Evidence directory (default: EVIDENCE_ROOT or docs/evidence).")
+    parser.add_argument(
+        "--env-file",
+        type=Path,
+        default=REPO_ROOT / ".env",
+        help="Environment file consulted for unset settings (default: repository .env).",
+    )
+    args = parser.parse_args(argv)
+    if args.requests < 1:
+        parser.error("--requests must be at least 1")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    env_file = read_env_file(args.env_file)
+    model = resolve_setting(args.model, "OLLAMA_BENCH_MODEL", env_file)
+    if not model:
+        print("Error: model not specified and OLLAMA_BENCH_MODEL is not configured.", file=sys.stderr)
+        return 1
+    prompt_setting = resolve_setting(args.prompt_file, "OLLAMA_BENCH_PROMPT", env_file)
+    if not prompt_setting:
+        print("Error: prompt file not specified and OLLAMA_BENCH_PROMPT is not configured.", file=sys.stderr)
+        return 1
+    prompt_path = resolve_repo_path(prompt_setting)
+    if not prompt_path.is_file():
+        print(f"Error: prompt file not found at {prompt_path}", file=sys.stderr)
+        return 1
+    prompt = prompt_path.read_text(encoding="utf-8")
+    if not prompt.strip():
+        print("Error: prompt file is empty; provide a prompt with representative workload.", file=sys.stderr)
+        return 1
+    evidence_root = resolve_repo_path(resolve_setting(args.output_root, "EVIDENCE_ROOT", env_file) or DEFAULT_EVIDENCE_ROOT)
+
+    base_url = args.base_url.rstrip("/")
+    print(f"Benchmarking '{model}' on {base_url} with prompt '{prompt_path}'.")
+    report = run_sweep(base_url, model, prompt, args.concurrency, args.requests, args.timeout, args.warmup)
+    report["prompt_file"] = str(prompt_path)
+    report["provenance"] = provenance(base_url, model)
+    run_dir = write_report(report, evidence_root)
+    print()
+    print("\n".join(format_table(report)))
+    print(f"\nBenchmark artifacts saved to {run_dir}")
+    failed = [str(level["concurrency"]) for level in report["levels"] if level["errors"] >= level["requests"]]
+    if failed:
+        print(f"Error: every request failed at concurrency {', '.join(failed)}.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
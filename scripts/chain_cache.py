@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Content-addressed response cache for ``ollama_chain`` stages.
+
+Entries are keyed by a SHA-256 over the model, endpoint, the full stage prompt
+and the generation options, so any change to an earlier stage naturally
+produces a new key.  Payloads are zlib-compressed JSON stored in a single
+SQLite file below the cache directory.  The cache is capped in size and evicts
+the least recently used entries first.
+
+The module doubles as an inspection tool::
+
+    python scripts/chain_cache.py --cache-dir .cache/ollama_chain stats
+    python scripts/chain_cache.py --cache-dir .cache/ollama_chain purge --older-than-days 7
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+CACHE_DIR_ENV = "OLLAMA_CHAIN_CACHE_DIR"
+DB_NAME = "responses.sqlite3"
+DEFAULT_MAX_MB = 256.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+def cache_key(model: str, endpoint: str, prompt: str, options: Optional[Mapping[str, Any]] = None) -> str:
+    """Return the content address for a single stage request."""
+
+    material = json.dumps(
+        {"model": model, "endpoint": endpoint, "prompt": prompt, "options": dict(options or {})},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheInfo:
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    oldest: float | None
+    newest: float | None
+
+
+class ResponseCache:
+    """Size-capped LRU cache of Ollama responses backed by SQLite."""
+
+    def __init__(self, root: Path, max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024)) -> None:
+        if max_bytes <= 0:
+            raise ValueError("Cache size cap must be positive.")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(root / DB_NAME, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, model: str, endpoint: str, payload: Mapping[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, model, endpoint, size, created, last_used, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, endpoint, len(blob), now, now, blob),
+            )
+            self._evict_locked()
+            self._db.commit()
+
+    def _evict_locked(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims: List[str] = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in victims])
+        self.evictions += len(victims)
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            entries, size, oldest, newest = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(last_used), MAX(last_used) FROM entries"
+            ).fetchone()
+        return CacheInfo(entries, size, self.max_bytes, oldest, newest)
+
+    def purge(self, older_than: float | None = None, model: str | None = None) -> int:
+        """Delete entries last used before ``older_than`` (epoch seconds) and/or for ``model``."""
+
+        clauses: List[str] = []
+        params: List[Any] = []
+        if older_than is not None:
+            clauses.append("last_used < ?")
+            params.append(older_than)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            removed = self._db.execute(f"DELETE FROM entries{where}", params).rowcount
+            self._db.commit()
+            if not clauses:
+                self._db.execute("VACUUM")
+        return removed
+
+    def summary(self) -> str:
+        info = self.info()
+        return (
+            f"Cache: {self.hits} hit(s), {self.misses} miss(es), {self.evictions} eviction(s); "
+            f"{info.entries} entr{'y' if info.entries == 1 else 'ies'}, "
+            f"{info.size_bytes / 1048576:.2f} / {info.max_bytes / 1048576:.0f} MiB"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def open_cache(cache_dir: str | None, disabled: bool, max_mb: float) -> ResponseCache | None:
+    """Resolve the CLI flags (and ``$OLLAMA_CHAIN_CACHE_DIR``) into a cache instance."""
+
+    if disabled:
+        return None
+    directory = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not directory:
+        return None
+    return ResponseCache(Path(directory), max_bytes=int(max_mb * 1024 * 1024))
+
+
+def format_timestamp(value: float | None) -> str:
+    if value is None:
+        return "n/a"
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value))
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or purge the ollama_chain response cache.")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get(CACHE_DIR_ENV),
+        help=f"Cache directory (default: ${CACHE_DIR_ENV}).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Print entry count, size and age of the cache.")
+    purge = subparsers.add_parser("purge", help="Delete cache entries.")
+    purge.add_argument("--older-than-days", type=float, help="Only remove entries unused for this many days.")
+    purge.add_argument("--model", help="Only remove entries produced by this model.")
+    args = parser.parse_args(argv)
+
+    if not args.cache_dir:
+        parser.error(f"--cache-dir is required when ${CACHE_DIR_ENV} is not set")
+    cache_path = Path(args.cache_dir)
+    if not (cache_path / DB_NAME).exists():
+        print(f"No cache found at {cache_path}")
+        return 0
+
+    cache = ResponseCache(cache_path)
+    try:
+        if args.command == "stats":
+            info = cache.info()
+            print(f"Cache directory: {cache_path.resolve()}")
+            print(f"Entries:         {info.entries}")
+            print(f"Size:            {info.size_bytes / 1048576:.2f} MiB")
+            print(f"Oldest use:      {format_timestamp(info.oldest)}")
+            print(f"Newest use:      {format_timestamp(info.newest)}")
+        else:
+            cutoff = time.time() - args.older_than_days * 86400 if args.older_than_days is not None else None
+            removed = cache.purge(older_than=cutoff, model=args.model)
+            print(f"Removed {removed} cache entr{'y' if removed == 1 else 'ies'} from {cache_path.resolve()}")
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""DAG pipeline definitions and a concurrent scheduler for ``ollama_chain``.
+
+A pipeline file (JSON or TOML) lists nodes that each name a step and the nodes
+whose output they need::
+
+    {
+      "prompt": "Entwirf eine REST-API für Kundenverwaltung.",
+      "nodes": [
+        {"id": "coder", "step": "deepseek-coder:6.7b@http://localhost:11435#Implementiere den API-Entwurf"},
+        {"id": "review", "step": "qwen2.5-coder:7b@http://localhost:11436#Prüfe den Code", "inputs": ["coder"]},
+        {"id": "docs", "step": "llama3.1:8b#Erstelle die Dokumentation", "inputs": ["coder"]}
+      ]
+    }
+
+``step`` uses the familiar ``model[{options}][@endpoint][#directive]`` syntax;
+``model``, ``endpoint`` and ``directive`` keys may be given separately instead.
+Generation options may also be given as an ``options`` object (plus
+``keep_alive``), e.g. ``"options": {"num_predict": 256, "stop": ["###"], "output": "code"}``;
+they override the ones in ``step``.  A node
+sees the user prompt plus the output of all of its ancestors, always in file
+order, so fan-in merges are deterministic.  A pipeline where every node
+depends on its predecessor sees what a ``--step`` chain sees, but runs without
+the chain's streaming, prefetch, journal, hedging and deadline.
+
+Ready nodes run concurrently, with at most ``max_per_endpoint`` requests in
+flight per endpoint (per replica for a ``model@http://a,http://b`` pool).  After the run :func:`critical_path` walks back from the
+last node to finish along the input that gated each start.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Protocol, Sequence, Set, Tuple
+
+from chain_options import validate_options
+
+
+class StepLike(Protocol):
+    model: str
+    directive: str | None
+    options: Dict[str, Any]
+    keep_alive: str | int | None
+    output: Any
+
+    def normalised_endpoint(self) -> str: ...
+
+
+@dataclass
+class PipelineNode:
+    id: str
+    step: StepLike
+    inputs: List[str] = field(default_factory=list)
+
+    @property
+    def endpoint(self) -> str:
+        return self.step.normalised_endpoint()
+
+
+@dataclass
+class Pipeline:
+    nodes: List[PipelineNode]
+    prompt: str | None = None
+    ancestors: Dict[str, List[str]] = field(default_factory=dict)
+
+    def node(self, node_id: str) -> PipelineNode:
+        for node in self.nodes:
+            if node.id == node_id:
+                return node
+        raise KeyError(node_id)
+
+
+@dataclass
+class NodeResult:
+    node_id: str
+    output: str
+    ready_at: float
+    started_at: float
+    finished_at: float
+    endpoint: str
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+    @property
+    def queued(self) -> float:
+        return self.started_at - self.ready_at
+
+
+def build_pipeline(nodes: Sequence[PipelineNode], prompt: str | None = None) -> Pipeline:
+    """Validate ids and inputs, reject cycles and precompute each node's ancestors in file order."""
+
+    if not nodes:
+        raise ValueError("Pipeline defines no nodes.")
+    order = {node.id: position for position, node in enumerate(nodes)}
+    if len(order) != len(nodes):
+        duplicates = sorted({node.id for node in nodes if sum(other.id == node.id for other in nodes) > 1})
+        raise ValueError(f"Duplicate node id(s) in pipeline: {', '.join(duplicates)}")
+    for node in nodes:
+        unknown = [name for name in node.inputs if name not in order]
+        if unknown:
+            raise ValueError(f"Node '{node.id}' references unknown input(s): {', '.join(unknown)}")
+        if node.id in node.inputs:
+            raise ValueError(f"Node '{node.id}' lists itself as an input")
+
+    by_id = {node.id: node for node in nodes}
+    ancestors: Dict[str, List[str]] = {}
+    visiting: Set[str] = set()
+
+    def resolve(node_id: str) -> List[str]:
+        if node_id in ancestors:
+            return ancestors[node_id]
+        if node_id in visiting:
+            raise ValueError(f"Pipeline contains a cycle through node '{node_id}'")
+        visiting.add(node_id)
+        found: Set[str] = set()
+        for parent in by_id[node_id].inputs:
+            found.add(parent)
+            found.update(resolve(parent))
+        visiting.discard(node_id)
+        ancestors[node_id] = sorted(found, key=order.__getitem__)
+        return ancestors[node_id]
+
+    for node in nodes:
+        resolve(node.id)
+    return Pipeline(list(nodes), prompt, ancestors)
+
+
+def load_pipeline(path: Path, parse_step: Callable[[str, str], StepLike], default_endpoint: str) -> Pipeline:
+    """Read a JSON or TOML pipeline file; ``parse_step`` turns step strings into step objects."""
+
+    raw_text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".toml":
+        import tomllib
+
+        data: Any = tomllib.loads(raw_text)
+    else:
+        data = json.loads(raw_text)
+    if not isinstance(data, dict) or not isinstance(data.get("nodes"), list):
+        raise ValueError(f"{path}: expected an object with a 'nodes' list")
+
+    nodes: List[PipelineNode] = []
+    for position, entry in enumerate(data["nodes"], start=1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path}: node #{position} must be an object")
+        node_id = str(entry.get("id") or "").strip()
+        if not node_id:
+            raise ValueError(f"{path}: node #{position} is missing an 'id'")
+        if "step" in entry:
+            step = parse_step(str(entry["step"]), default_endpoint)
+        else:
+            definition = str(entry.get("model") or "")
+            if entry.get("endpoint"):
+                definition += f"@{entry['endpoint']}"
+            if entry.get("directive"):
+                definition += f"#{entry['directive']}"
+            step = parse_step(definition, default_endpoint)
+        if "options" in entry or "keep_alive" in entry:
+            raw_options = entry.get("options") or {}
+            if not isinstance(raw_options, dict):
+                raise ValueError(f"{path}: node '{node_id}' has an invalid 'options' object")
+            if "keep_alive" in entry:
+                raw_options = {**raw_options, "keep_alive": entry["keep_alive"]}
+            try:
+                options, keep_alive, output = validate_options(raw_options)
+            except ValueError as exc:
+                raise ValueError(f"{path}: node '{node_id}': {exc}") from None
+            step = replace(
+                step,  # type: ignore[type-var]
+                options={**step.options, **options},
+                keep_alive=keep_alive if keep_alive is not None else step.keep_alive,
+                output=output if output is not None else step.output,
+            )
+        inputs = entry.get("inputs", [])
+        if not isinstance(inputs, list) or not all(isinstance(name, str) for name in inputs):
+            raise ValueError(f"{path}: node '{node_id}' has an invalid 'inputs' list")
+        nodes.append(PipelineNode(node_id, step, list(inputs)))
+
+    prompt = data.get("prompt")
+    if prompt is not None and not isinstance(prompt, str):
+        raise ValueError(f"{path}: 'prompt' must be a string")
+    return build_pipeline(nodes, prompt.strip() if prompt else None)
+
+
+def schedule(
+    pipeline: Pipeline,
+    run_node: Callable[[PipelineNode, Dict[str, str]], str],
+    max_per_endpoint: int = 1,
+    on_finish: Callable[[NodeResult], None] | None = None,
+) -> Dict[str, NodeResult]:
+    """Run every node once its inputs are done, capping in-flight work per endpoint.
+
+    ``run_node`` receives the node and the outputs finished so far and returns
+    the node's output.  Submission follows file order, so runs are repeatable.
+    The first failing node aborts the run after in-flight nodes complete.
+    """
+
+    if max_per_endpoint < 1:
+        raise ValueError("max_per_endpoint must be at least 1")
+    outputs: Dict[str, str] = {}
+    results: Dict[str, NodeResult] = {}
+    ready_at: Dict[str, float] = {}
+    in_flight: Dict[str, int] = {}
+    running: Dict[Future[Tuple[str, float, float]], PipelineNode] = {}
+    pending = list(pipeline.nodes)
+
+    def execute(node: PipelineNode, snapshot: Dict[str, str]) -> Tuple[str, float, float]:
+        started = time.perf_counter()
+        output = run_node(node, snapshot)
+        return output, started, time.perf_counter()
+
+    def capacity(endpoint: str) -> int:
+        # A replica pool ("http://a,http://b") gets the allowance once per replica.
+        return max_per_endpoint * len(endpoint.split(","))
+
+    workers = max(1, min(len(pipeline.nodes), sum(capacity(endpoint) for endpoint in {node.endpoint for node in pipeline.nodes})))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dag") as executor:
+        while pending or running:
+            now = time.perf_counter()
+            for node in list(pending):
+                if not all(name in outputs for name in node.inputs):
+                    continue
+                ready_at.setdefault(node.id, now)
+                if in_flight.get(node.endpoint, 0) >= capacity(node.endpoint):
+                    continue
+                in_flight[node.endpoint] = in_flight.get(node.endpoint, 0) + 1
+                pending.remove(node)
+                running[executor.submit(execute, node, dict(outputs))] = node
+            if not running:
+                raise RuntimeError("Pipeline stalled: remaining nodes have unsatisfiable inputs")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                in_flight[node.endpoint] -= 1
+                try:
+                    output, started, finished = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                outputs[node.id] = output
+                result = NodeResult(node.id, output, ready_at[node.id], started, finished, node.endpoint)
+                results[node.id] = result
+                if on_finish is not None:
+                    on_finish(result)
+    return results
+
+
+def critical_path(pipeline: Pipeline, results: Dict[str, NodeResult]) -> List[str]:
+    """Return node ids from the first to the last node on the path that determined the wall time."""
+
+    if not results:
+        return []
+    current = max(results.values(), key=lambda result: result.finished_at).node_id
+    path = [current]
+    while pipeline.node(current).inputs:
+        current = max(pipeline.node(current).inputs, key=lambda name: results[name].finished_at)
+        path.append(current)
+    path.reverse()
+    return path
+
+
+def timing_report(pipeline: Pipeline, results: Dict[str, NodeResult], wall: float) -> List[str]:
+    lines = [f"{'node':<16} {'endpoint':<32} {'queued':>8} {'run':>8}"]
+    for node in pipeline.nodes:
+        result = results[node.id]
+        lines.append(f"{node.id:<16} {node.endpoint:<32} {result.queued:>7.2f}s {result.duration:>7.2f}s")
+    path = critical_path(pipeline, results)
+    path_time = sum(results[name].duration for name in path)
+    serial = sum(result.duration for result in results.values())
+    lines.append("")
+    lines.append(f"Critical path: {' -> '.join(path)} ({path_time:.2f}s of {wall:.2f}s wall)")
+    if wall > 0:
+        lines.append(f"Serial node time: {serial:.2f}s (parallel speed-up x{serial / wall:.2f})")
+    return lines
@@ -0,0 +1,204 @@
+"""Whole-chain deadlines and idle timeouts for ``ollama_chain``.
+
+``--timeout`` bounds every socket read on its own, so a chain of N stages may
+take N times as long and a stage that stalls mid-stream keeps the server busy
+until the read times out.  :class:`DeadlineBudget` instead holds one wall-clock
+budget for the whole chain (``--deadline``).  Each stage gets an even share of
+what is left when it starts, so time a fast or cached stage did not use flows
+to the stages after it and the chain as a whole stays within the deadline.
+
+:class:`StageWatch` enforces a stage's share, plus an idle limit between
+streamed tokens once the first token has arrived (``--idle-timeout``), from a
+watchdog thread.  When either runs out it fires the stage's
+:class:`http_pool.Cancellation`, which closes the connection, so Ollama stops
+generating and frees the slot at once.  The request then fails with
+:class:`http_pool.RequestCancelled`.  Every stage's share, use and outcome is
+kept for the run report.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from http_pool import Cancellation
+
+
+class DeadlineExceeded(RuntimeError):
+    """A stage was cancelled because its share of the deadline or its idle limit ran out."""
+
+
+class StageWatch:
+    """Cancels a stage's requests when its budget runs out or its token stream stalls.
+
+    Use as a context manager around the stage's request(s).  Every request
+    registers its :class:`Cancellation` through :meth:`attach` (hedged stages
+    register one per candidate) and token callbacks go through :meth:`wrap`,
+    which also keeps the text received so far for partial replies.
+    """
+
+    def __init__(self, budget_s: float | None, idle_s: float | None, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.budget_s = budget_s
+        self.idle_s = idle_s
+        self.reason: str | None = None  # "deadline" or "idle" once the watch fired.
+        self._clock = clock
+        self._started = clock()
+        self._last_token: float | None = None
+        self._cancels: List[Cancellation] = []
+        self._parts: List[str] = []
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def text(self) -> str:
+        with self._condition:
+            return "".join(self._parts)
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self._started
+
+    def attach(self, cancel: Cancellation | None = None) -> Cancellation:
+        """Register ``cancel`` (or a new one) so it fires with the watch."""
+
+        cancel = cancel or Cancellation()
+        with self._condition:
+            self._cancels.append(cancel)
+            fired = self.reason
+        if fired is not None:
+            cancel.cancel(self.describe())
+        return cancel
+
+    def wrap(self, on_token: Optional[Callable[[str], None]]) -> Callable[[str], None]:
+        def forward(fragment: str) -> None:
+            with self._condition:
+                self._last_token = self._clock()
+                self._parts.append(fragment)
+                self._condition.notify_all()
+            if on_token is not None:
+                on_token(fragment)
+
+        return forward
+
+    def __enter__(self) -> "StageWatch":
+        if self.budget_s is not None or self.idle_s is not None:
+            self._thread = threading.Thread(target=self._run, name="chain-deadline", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _next_expiry(self) -> Tuple[float | None, str]:
+        candidates = []
+        if self.budget_s is not None:
+            candidates.append((self._started + self.budget_s, "deadline"))
+        if self.idle_s is not None and self._last_token is not None:
+            candidates.append((self._last_token + self.idle_s, "idle"))
+        if not candidates:
+            return None, ""
+        return min(candidates)
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._closed:
+                expiry, reason = self._next_expiry()
+                now = self._clock()
+                if expiry is not None and now >= expiry:
+                    self.reason = reason
+                    cancels = list(self._cancels)
+                    break
+                self._condition.wait(None if expiry is None else expiry - now)
+            else:
+                return
+        for cancel in cancels:
+            cancel.cancel(self.describe())
+
+    def describe(self) -> str:
+        """Why the watch fired, for error messages and cancellation reasons."""
+
+        if self.reason == "idle":
+            return f"no token for {self.idle_s:g}s (idle timeout)"
+        return f"stage budget of {self.budget_s:.2f}s used up"
+
+
+@dataclass
+class StageSpend:
+    label: str
+    allotted_s: float | None
+    used_s: float
+    outcome: str
+    kept_chars: int = 0  # Characters of a partial reply passed on after a cancellation.
+
+
+@dataclass
+class DeadlineBudget:
+    """The chain's deadline and how its stages spent it."""
+
+    total_s: float | None
+    idle_s: float | None = None
+    clock: Callable[[], float] = time.perf_counter
+    started: float = 0.0
+    stages: List[StageSpend] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.started = self.clock()
+
+    def remaining(self) -> float | None:
+        if self.total_s is None:
+            return None
+        return self.total_s - (self.clock() - self.started)
+
+    def share(self, stages_left: int) -> float | None:
+        """An even share of the remaining budget for the next of ``stages_left`` stages."""
+
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return max(remaining, 0.0) / max(stages_left, 1)
+
+    def watch(self, label: str, share: float | None) -> StageWatch:
+        if share is not None and share <= 0:
+            raise DeadlineExceeded(f"{label}: the {self.total_s:g}s deadline was used up before the stage started")
+        return StageWatch(share, self.idle_s, self.clock)
+
+    def record(self, label: str, allotted_s: float | None, used_s: float, outcome: str, kept_chars: int = 0) -> None:
+        self.stages.append(StageSpend(label, allotted_s, used_s, outcome, kept_chars))
+
+    def lines(self) -> List[str]:
+        used = self.clock() - self.started
+        if self.total_s is None:
+            head = f"Idle timeout {self.idle_s:g}s, no deadline; {used:.2f}s used"
+        else:
+            head = f"Deadline {self.total_s:g}s: {used:.2f}s used, {max(self.total_s - used, 0.0):.2f}s left"
+        lines = [head]
+        for spend in self.stages:
+            share = "n/a" if spend.allotted_s is None else f"{spend.allotted_s:.2f}s"
+            line = f"{spend.label}: {spend.used_s:.2f}s of {share} ({spend.outcome})"
+            if spend.outcome in ("deadline", "idle"):
+                line += f", cancelled, {spend.kept_chars} char(s) kept" if spend.kept_chars else ", cancelled"
+            lines.append(line)
+        return lines
+
+    def as_dict(self) -> Dict[str, Any]:
+        used = self.clock() - self.started
+        return {
+            "deadline_s": self.total_s,
+            "idle_timeout_s": self.idle_s,
+            "used_s": round(used, 4),
+            "stages": [
+                dict(
+                    asdict(spend),
+                    allotted_s=None if spend.allotted_s is None else round(spend.allotted_s, 4),
+                    used_s=round(spend.used_s, 4),
+                )
+                for spend in self.stages
+            ],
+        }
@@ -0,0 +1,295 @@
+"""Hedged and raced requests for stages that are slow to start.
+
+A stage usually spends its worst-case latency before the first token: a cold
+model load, a replica busy with someone else's request, a long prefill.
+:func:`run_hedged` attacks that tail in two ways:
+
+* **hedge** – start the primary candidate; if no first token has arrived after
+  ``delay`` seconds (fixed, or the p95 of earlier runs kept in
+  :class:`TtftHistory`), start the next candidate (another replica of the
+  pool or a ``--hedge-to`` fallback model), and so on.  The first candidate to
+  produce a token wins and streams on; every other one is cancelled by closing
+  its connection, which also stops Ollama from generating for it.
+* **race** – start all candidates at once and keep the first one that
+  finishes.
+
+Candidates are opaque launchers, ``launch(on_token, cancel) -> (text, stats)``,
+so this module does not depend on how a stage is sent.  Time saved by a
+winning hedge can only be estimated because the loser is cancelled: it is the
+mean of the primary's past time-to-first-token samples that exceeded the
+moment the hedge answered, minus that moment (zero without such samples).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from http_pool import Cancellation
+from stats import percentile
+
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200
+
+Launcher = Callable[[Callable[[str], None], Cancellation], Tuple[str, Any]]
+
+
+def parse_hedge_after(raw: str) -> Tuple[float | None, float | None]:
+    """Parse ``--hedge-after``: seconds (``1.5``) or a learned percentile (``p95``)."""
+
+    value = raw.strip().lower()
+    try:
+        if value.startswith("p"):
+            percentile = float(value[1:])
+            if not 0 < percentile < 100:
+                raise ValueError
+            return None, percentile
+        seconds = float(value)
+        if seconds < 0:
+            raise ValueError
+        return seconds, None
+    except ValueError:
+        raise ValueError(f"Invalid --hedge-after '{raw}': expected seconds (e.g. 2.5) or a percentile (e.g. p95)") from None
+
+
+class TtftHistory:
+    """Time-to-first-token samples per ``model@endpoint``, persisted between runs.
+
+    Cancelled candidates contribute the time they had waited as a (lower
+    bound) sample, otherwise hedging would hide the slow tail it is meant to
+    measure and the learned percentile would keep shrinking.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if isinstance(data, dict):
+            for key, values in data.items():
+                if isinstance(values, list):
+                    self.samples[str(key)] = [float(v) for v in values if isinstance(v, (int, float))][-MAX_SAMPLES:]
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            values = self.samples.setdefault(key, [])
+            values.append(round(seconds, 4))
+            del values[:-MAX_SAMPLES]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self.samples.get(key, []))
+
+    def percentile(self, key: str, q: float) -> float | None:
+        """Return the ``q``-th percentile for ``key`` once :data:`MIN_SAMPLES` are known."""
+
+        with self._lock:
+            values = list(self.samples.get(key, []))
+        if len(values) < MIN_SAMPLES:
+            return None
+        return percentile(values, q)
+
+    def expected_beyond(self, key: str, elapsed: float) -> float | None:
+        """Mean of the samples for ``key`` that are slower than ``elapsed``."""
+
+        with self._lock:
+            slower = [value for value in self.samples.get(key, []) if value > elapsed]
+        return sum(slower) / len(slower) if slower else None
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with self._lock:
+            temporary.write_text(json.dumps(self.samples, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(temporary, self.path)
+
+
+@dataclass
+class HedgeOutcome:
+    """Which candidate won a hedged or raced stage and what it cost."""
+
+    mode: str
+    labels: List[str]
+    winner: int
+    launched: int
+    wall_s: float
+    ttft_s: float | None = None  # Winner's first token, measured from the start of the stage.
+    fired_after: List[float] = field(default_factory=list)  # Start offsets of the extra candidates.
+    waited: Dict[int, float] = field(default_factory=dict)  # Cancelled candidate -> seconds it waited without a token.
+    saved_s: float = 0.0
+    result: Any = field(default=None, repr=False)
+
+    @property
+    def fired(self) -> bool:
+        return self.launched > 1
+
+    @property
+    def hedge_won(self) -> bool:
+        return self.winner > 0
+
+    def summary(self) -> str:
+        winner = self.labels[self.winner]
+        if self.mode == "race":
+            return f"race of {self.launched}: {winner} finished first after {self.wall_s:.2f}s"
+        if not self.fired:
+            ttft = "n/a" if self.ttft_s is None else f"{self.ttft_s:.2f}s"
+            return f"hedge not needed, first token after {ttft}"
+        fired = ", ".join(f"{offset:.2f}s" for offset in self.fired_after)
+        if not self.hedge_won:
+            return f"hedge fired at {fired}; primary {winner} answered first, hedge cancelled"
+        return f"hedge fired at {fired}; {winner} answered first, ~{self.saved_s:.2f}s saved"
+
+
+def run_hedged(
+    launchers: Sequence[Launcher],
+    labels: Sequence[str],
+    delay: float | None,
+    on_token: Optional[Callable[[str], None]] = None,
+    race: bool = False,
+) -> HedgeOutcome:
+    """Run ``launchers`` as hedge (staggered by ``delay``) or race and return the winner.
+
+    In hedge mode the winner is the first candidate to produce a token; only
+    its tokens reach ``on_token``.  A candidate that fails before any token
+    has arrived triggers the next one immediately.  In race mode every
+    candidate starts at once and the first to finish wins.  The winner's
+    error is re-raised; if every candidate fails, the primary's error is.
+    """
+
+    if not launchers:
+        raise ValueError("run_hedged needs at least one candidate")
+    condition = threading.Condition()
+    cancels = [Cancellation() for _ in launchers]
+    started_at: Dict[int, float] = {}
+    first_token: Dict[int, float] = {}
+    finished: Dict[int, Tuple[str, Any]] = {}
+    failed: Dict[int, BaseException] = {}
+    winner: List[int] = []
+    decided: List[float] = []
+    origin = time.perf_counter()
+
+    def elapsed() -> float:
+        return time.perf_counter() - origin
+
+    def crown(index: int) -> None:
+        # Caller holds the condition.
+        winner.append(index)
+        decided.append(elapsed())
+        for other, cancel in enumerate(cancels):
+            if other != index:
+                cancel.cancel("another candidate answered first")
+
+    def forwarder(index: int) -> Callable[[str], None]:
+        def forward(fragment: str) -> None:
+            with condition:
+                if index not in first_token:
+                    first_token[index] = elapsed()
+                    if not race and not winner:
+                        crown(index)
+                    condition.notify_all()
+                mine = not race and winner[:1] == [index]
+            if mine and on_token is not None:
+                on_token(fragment)
+
+        return forward
+
+    def attempt(index: int) -> None:
+        try:
+            result = launchers[index](forwarder(index), cancels[index])
+        except BaseException as exc:  # noqa: BLE001 - handed to the waiting thread.
+            with condition:
+                failed[index] = exc
+                condition.notify_all()
+            return
+        with condition:
+            finished[index] = result
+            if not winner:
+                crown(index)
+            condition.notify_all()
+
+    fired_after: List[float] = []
+    with ThreadPoolExecutor(max_workers=len(launchers), thread_name_prefix="hedge") as executor:
+
+        def launch(index: int) -> None:
+            started_at[index] = elapsed()
+            if index:
+                fired_after.append(started_at[index])
+            executor.submit(attempt, index)
+
+        with condition:
+            for index in range(len(launchers) if race else 1):
+                launch(index)
+            while True:
+                if winner and (winner[0] in finished or winner[0] in failed):
+                    break
+                launched = len(started_at)
+                if len(failed) == launched and launched == len(launchers):
+                    break
+                timeout: float | None = None
+                if not race and not winner and launched < len(launchers):
+                    due = 0.0 if len(failed) == launched else None
+                    if due is None and delay is not None:
+                        due = started_at[launched - 1] + delay - elapsed()
+                    if due is not None and due <= 0:
+                        launch(launched)
+                        continue
+                    timeout = due
+                condition.wait(timeout)
+            for index, cancel in enumerate(cancels):
+                if not winner or index != winner[0]:
+                    cancel.cancel("hedge finished")
+        wall = elapsed()
+
+    if not winner or winner[0] in failed:
+        raise failed[winner[0]] if winner else failed[0]
+    chosen = winner[0]
+    cancelled = [index for index in started_at if index != chosen and (index not in failed or cancels[index].cancelled)]
+    waited = {index: decided[0] - started_at[index] for index in cancelled if index not in first_token}
+    return HedgeOutcome(
+        mode="race" if race else "hedge",
+        labels=list(labels),
+        winner=chosen,
+        launched=len(started_at),
+        wall_s=wall,
+        ttft_s=first_token.get(chosen),
+        fired_after=[] if race else fired_after,
+        waited=waited,
+        result=finished[chosen],
+    )
+
+
+@dataclass
+class HedgeReport:
+    """Per-stage hedge outcomes of a run."""
+
+    outcomes: List[Tuple[str, HedgeOutcome]] = field(default_factory=list)
+
+    def add(self, label: str, outcome: HedgeOutcome) -> None:
+        self.outcomes.append((label, outcome))
+
+    def lines(self) -> List[str]:
+        hedged = [outcome for _, outcome in self.outcomes if outcome.mode == "hedge"]
+        raced = [outcome for _, outcome in self.outcomes if outcome.mode == "race"]
+        lines: List[str] = []
+        if hedged:
+            fired = sum(outcome.fired for outcome in hedged)
+            won = sum(outcome.hedge_won for outcome in hedged)
+            saved = sum(outcome.saved_s for outcome in hedged)
+            lines.append(
+                f"Hedges fired in {fired}/{len(hedged)} stage(s) ({fired / len(hedged):.0%}), "
+                f"won {won}, ~{saved:.2f}s saved (estimated)"
+            )
+        if raced:
+            extra = sum(outcome.launched - 1 for outcome in raced)
+            lines.append(f"Raced {len(raced)} stage(s) with {extra} extra request(s)")
+        lines.extend(f"{label}: {outcome.summary()}" for label, outcome in self.outcomes)
+        return lines
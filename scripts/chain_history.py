@@ -0,0 +1,117 @@
+"""Token-budgeted history window for ``ollama_chain``.
+
+Every stage normally receives all previous responses verbatim, so long chains
+silently outgrow ``num_ctx`` and prefill time keeps rising.  :class:`HistoryWindow`
+estimates the size of each history section and, once a stage would exceed its
+budget, compacts the oldest sections first: either by asking a summariser model
+for a condensed version or, without one, by trimming the section to its head
+and tail.  Compacted sections stay compacted for the rest of the chain and
+identical sections are only summarised once, which keeps the rendered prefix
+stable between stages.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CHARS_PER_TOKEN = 4.0  # Rough average for English/German prose and code with llama-style tokenisers.
+SECTION_OVERHEAD_TOKENS = 4  # "### label" heading plus separators.
+
+Section = Tuple[str, str]
+Summariser = Callable[[str, str], str]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def section_tokens(section: Section) -> int:
+    label, text = section
+    return estimate_tokens(label) + estimate_tokens(text) + SECTION_OVERHEAD_TOKENS
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of ``text`` within roughly ``max_tokens`` tokens."""
+
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(int(max_tokens * CHARS_PER_TOKEN) // 2, 1)
+    dropped = estimate_tokens(text) - max_tokens
+    return f"{text[:keep].rstrip()}\n[... {dropped} token(s) trimmed ...]\n{text[-keep:].lstrip()}"
+
+
+class HistoryWindow:
+    """Decide how the history of one chain is presented to the next stage.
+
+    ``sections[0]`` (the user prompt) and the ``keep_recent`` newest sections
+    are never compacted.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        summariser: Optional[Summariser] = None,
+        keep_recent: int = 1,
+        trim_tokens: int = 256,
+        summaries: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if budget <= 0:
+            raise ValueError("History budget must be a positive token count.")
+        self.budget = budget
+        self.summariser = summariser
+        self.keep_recent = max(keep_recent, 0)
+        self.trim_tokens = trim_tokens
+        self.summaries = summaries if summaries is not None else {}
+        self.compacted: Dict[int, Section] = {}
+        self.tokens_saved = 0
+        self.last_estimate = 0
+
+    def fit(self, sections: Sequence[Section], reserve_tokens: int = 0) -> List[Section]:
+        """Return ``sections`` with older entries compacted until the budget holds."""
+
+        view = [self.compacted.get(index, section) for index, section in enumerate(sections)]
+        total = sum(section_tokens(section) for section in view) + reserve_tokens
+        first_protected_tail = max(len(sections) - self.keep_recent, 1)
+        for index in range(1, first_protected_tail):
+            if total <= self.budget:
+                break
+            if index in self.compacted:
+                continue
+            replacement = self._compact(*sections[index])
+            saved = section_tokens(sections[index]) - section_tokens(replacement)
+            total -= saved
+            self.tokens_saved += saved
+            self.compacted[index] = replacement
+            view[index] = replacement
+        self.last_estimate = total
+        return view
+
+    @property
+    def over_budget(self) -> bool:
+        return self.last_estimate > self.budget
+
+    def _compact(self, label: str, text: str) -> Section:
+        if self.summariser is not None:
+            digest = hashlib.sha256(f"{label}\0{text}".encode("utf-8")).hexdigest()
+            summary = self.summaries.get(digest)
+            if summary is None:
+                try:
+                    summary = self.summariser(label, text).strip()
+                except RuntimeError as exc:
+                    print(f"[history] Summariser failed for '{label}', trimming instead: {exc}")
+                else:
+                    self.summaries[digest] = summary
+            if summary and estimate_tokens(summary) < estimate_tokens(text):
+                return (f"{label} (summary)", summary)
+        return (f"{label} (trimmed)", trim_text(text, self.trim_tokens))
+
+
+def summary_prompt(label: str, text: str) -> str:
+    return (
+        f"Summarise the following output of {label} for a later expert in the same workflow. "
+        "Keep decisions, code identifiers, interfaces and open issues; drop explanations and repetition. "
+        "Reply with the summary only.\n\n"
+        f"{text.strip()}"
+    )
@@ -0,0 +1,203 @@
+"""Append-only run journal that makes ``ollama_chain`` runs resumable.
+
+Every finished stage is appended to a JSONL file (and fsync'd) straight away,
+together with a hash of its inputs (the same content address the response
+cache uses), its output and its timings.  When a run is restarted with
+``--resume`` the journal is scanned once for those hashes; stages whose
+inputs still match are taken from the journal instead of being regenerated.
+Because each stage's inputs contain every earlier output, the first changed
+or missing stage invalidates everything after it automatically.  A stage cut
+off by ``--deadline`` with ``--on-deadline keep-partial`` is recorded with
+``"partial": true``: transcripts include it, but ``--resume`` generates it
+again instead of reusing the truncated reply.
+
+Records are written one per line::
+
+    {"type": "run", "run_id": "...", "started_at": "...", "prompt": "..."}
+    {"type": "stage", "run_id": "...", "index": 1, "label": "...", "inputs_hash": "...", "output": "...", ...}
+    {"type": "reuse", "run_id": "...", "index": 1, "label": "...", "inputs_hash": "..."}
+
+Only byte offsets are kept in memory; outputs are read back from disk when
+needed, and :func:`render_transcript` streams the Markdown transcript of the
+latest run straight from the journal.  A torn last line from a crash is
+ignored.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Mapping, Set, Tuple
+
+
+def read_records(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(offset, record)`` for every complete, valid line of ``path``."""
+
+    with path.open("rb") as handle:
+        offset = 0
+        for line in handle:
+            start, offset = offset, offset + len(line)
+            if not line.endswith(b"\n"):
+                break  # Torn write from an interrupted run.
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict):
+                yield start, record
+
+
+def read_record_at(handle: BinaryIO, offset: int) -> Dict[str, Any]:
+    handle.seek(offset)
+    return json.loads(handle.readline())
+
+
+class StageJournal:
+    """Writer for one run; with ``resume`` it also indexes the stages of earlier runs."""
+
+    def __init__(self, path: Path, prompt: str, resume: bool = False) -> None:
+        self.path = path
+        self.completed: Dict[str, int] = {}  # inputs hash -> offset of the stage record holding its output
+        self.partial: Set[str] = set()  # inputs hashes journalled only as partial replies
+        self.recorded = 0
+        self.recorded_partial = 0
+        self.reused = 0
+        if resume:
+            if not path.is_file():
+                raise FileNotFoundError(f"Journal {path} does not exist; nothing to resume.")
+            for offset, record in read_records(path):
+                if record.get("type") == "stage" and isinstance(record.get("inputs_hash"), str):
+                    if record.get("partial"):
+                        self.partial.add(record["inputs_hash"])
+                    else:
+                        self.completed[record["inputs_hash"]] = offset
+            self._truncate_torn_tail()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = path.open("ab")
+        self._reader = path.open("rb")
+        self.run_id = uuid.uuid4().hex[:12]
+        self._append(
+            {
+                "type": "run",
+                "run_id": self.run_id,
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "prompt": prompt,
+            }
+        )
+
+    def _truncate_torn_tail(self) -> None:
+        with self.path.open("rb+") as handle:
+            data_end = handle.seek(0, os.SEEK_END)
+            if data_end == 0:
+                return
+            handle.seek(max(data_end - 1, 0))
+            if handle.read(1) == b"\n":
+                return
+            # Drop the partial record so the next append starts on a fresh line.
+            handle.seek(0)
+            keep = handle.read().rfind(b"\n") + 1
+            handle.truncate(keep)
+
+    def _append(self, record: Mapping[str, Any]) -> None:
+        self._writer.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+
+    def lookup(self, inputs_hash: str) -> str | None:
+        """Return the journaled output of a stage with identical inputs, if any."""
+
+        offset = self.completed.get(inputs_hash)
+        if offset is None:
+            return None
+        return str(read_record_at(self._reader, offset)["output"])
+
+    def record_stage(
+        self,
+        index: int,
+        label: str,
+        model: str,
+        endpoint: str,
+        inputs_hash: str,
+        output: str,
+        started: float,
+        finished: float,
+        metrics: Mapping[str, Any] | None = None,
+        partial: bool = False,
+    ) -> None:
+        """Append a finished stage; ``started``/``finished`` are epoch seconds.
+
+        A ``partial`` stage is kept for the transcript but never reused by a resume.
+        """
+
+        offset = self._writer.tell()
+        record: Dict[str, Any] = {
+            "type": "stage",
+            "run_id": self.run_id,
+            "index": index,
+            "label": label,
+            "model": model,
+            "endpoint": endpoint,
+            "inputs_hash": inputs_hash,
+            "output": output,
+            "started_at": round(started, 3),
+            "duration_s": round(finished - started, 3),
+            "metrics": dict(metrics or {}),
+        }
+        if partial:
+            record["partial"] = True
+        self._append(record)
+        self.recorded += 1
+        if partial:
+            self.partial.add(inputs_hash)
+            self.recorded_partial += 1
+        else:
+            self.completed[inputs_hash] = offset
+
+    def record_reuse(self, index: int, label: str, inputs_hash: str) -> None:
+        self._append({"type": "reuse", "run_id": self.run_id, "index": index, "label": label, "inputs_hash": inputs_hash})
+        self.reused += 1
+
+    def summary(self) -> str:
+        partial = f" ({self.recorded_partial} partial)" if self.recorded_partial else ""
+        return f"Journal: {self.reused} stage(s) resumed, {self.recorded} recorded{partial} in {self.path.resolve()}"
+
+    def close(self) -> None:
+        self._writer.close()
+        self._reader.close()
+
+
+def render_transcript(journal_path: Path, output_path: Path, run_id: str | None = None) -> None:
+    """Write the Markdown transcript of ``run_id`` (default: the latest run) from the journal."""
+
+    stage_offsets: Dict[str, int] = {}
+    current: str | None = None
+    run_offset: int | None = None
+    sections: Dict[int, Tuple[str, int]] = {}  # stage index -> (label, offset of the record with the output)
+    for offset, record in read_records(journal_path):
+        kind = record.get("type")
+        if kind == "run":
+            if run_id is None or record.get("run_id") == run_id:
+                current, run_offset, sections = str(record.get("run_id")), offset, {}
+            continue
+        if kind == "stage" and not record.get("partial"):
+            stage_offsets[str(record.get("inputs_hash"))] = offset
+        if current is not None and record.get("run_id") == current and kind in ("stage", "reuse"):
+            source = offset if kind == "stage" else stage_offsets.get(str(record.get("inputs_hash")))
+            if source is not None:
+                sections[int(record["index"])] = (str(record["label"]), source)
+    if run_offset is None:
+        raise ValueError(f"Journal {journal_path} contains no run.")
+
+    with journal_path.open("rb") as reader, output_path.open("w", encoding="utf-8") as output:
+        output.write("# Ollama Chain Transcript")
+        entries = [("User Prompt", run_offset, "prompt")]
+        entries += [(label, offset, "output") for _, (label, offset) in sorted(sections.items())]
+        for label, offset, field_name in entries:
+            record = read_record_at(reader, offset)
+            text = str(record[field_name]).strip()
+            if record.get("partial"):
+                label += " (partial)"
+            output.write(f"\n\n## {label}\n\n{text or '(leer)'}")
@@ -0,0 +1,270 @@
+"""Per-stage and per-run performance metrics for ``ollama_chain``.
+
+Ollama reports where a generation spent its time in every final response:
+``load_duration`` (model load), ``prompt_eval_count``/``prompt_eval_duration``
+(prefill), ``eval_count``/``eval_duration`` (decode) and ``total_duration``.
+:class:`StageMetrics` keeps those figures next to the client-side wall time,
+so the difference between the two (queueing, network, JSON handling) becomes
+visible too.  Each stage also keeps the generation options it was sent with
+and Ollama's ``done_reason``, so time and tokens saved by ``num_predict`` or
+``stop`` can be attributed to the setting.  :class:`MetricsCollector` gathers
+the stages of a run and writes
+
+* ``chain-<timestamp>.json`` with every stage and the run totals, and
+* ``ollama_chain.prom`` in the Prometheus textfile-collector format, replaced
+  atomically so node exporter never scrapes a half-written file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+PROM_FILE = "ollama_chain.prom"
+METRIC_PREFIX = "ollama_chain"
+
+
+def _seconds(payload: Mapping[str, Any], key: str) -> float | None:
+    value = payload.get(key)
+    return float(value) / 1e9 if isinstance(value, (int, float)) else None
+
+
+def _count(payload: Mapping[str, Any], key: str) -> int | None:
+    value = payload.get(key)
+    return int(value) if isinstance(value, (int, float)) else None
+
+
+def _rate(tokens: int | None, seconds: float | None) -> float | None:
+    if not tokens or not seconds or seconds <= 0:
+        return None
+    return tokens / seconds
+
+
+@dataclass
+class StageMetrics:
+    """Timing of one generation as seen by the client and reported by Ollama."""
+
+    label: str
+    model: str
+    endpoint: str
+    wall_s: float
+    cached: bool = False
+    ttft_s: float | None = None
+    server_s: float | None = None
+    load_s: float | None = None
+    prompt_tokens: int | None = None
+    prompt_eval_s: float | None = None
+    eval_tokens: int | None = None
+    eval_s: float | None = None
+    done_reason: str | None = None  # "length" when num_predict cut the stage short.
+    options: Dict[str, Any] = field(default_factory=dict)  # Generation options the stage was sent with.
+
+    @classmethod
+    def from_payload(
+        cls,
+        label: str,
+        model: str,
+        endpoint: str,
+        payload: Mapping[str, Any],
+        wall_s: float,
+        ttft_s: float | None = None,
+        cached: bool = False,
+        options: Mapping[str, Any] | None = None,
+    ) -> "StageMetrics":
+        if cached:
+            return cls(label, model, endpoint, wall_s, cached=True, options=dict(options or {}))
+        done_reason = payload.get("done_reason")
+        return cls(
+            label=label,
+            model=model,
+            endpoint=endpoint,
+            wall_s=wall_s,
+            ttft_s=ttft_s,
+            server_s=_seconds(payload, "total_duration"),
+            load_s=_seconds(payload, "load_duration"),
+            prompt_tokens=_count(payload, "prompt_eval_count"),
+            prompt_eval_s=_seconds(payload, "prompt_eval_duration"),
+            eval_tokens=_count(payload, "eval_count"),
+            eval_s=_seconds(payload, "eval_duration"),
+            done_reason=str(done_reason) if done_reason else None,
+            options=dict(options or {}),
+        )
+
+    @property
+    def prefill_tps(self) -> float | None:
+        return _rate(self.prompt_tokens, self.prompt_eval_s)
+
+    @property
+    def decode_tps(self) -> float | None:
+        return _rate(self.eval_tokens, self.eval_s)
+
+    @property
+    def client_overhead_s(self) -> float | None:
+        """Wall time Ollama did not account for: queueing, network and response handling."""
+
+        if self.server_s is None:
+            return None
+        return max(self.wall_s - self.server_s, 0.0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.update(
+            prefill_tps=self.prefill_tps,
+            decode_tps=self.decode_tps,
+            client_overhead_s=self.client_overhead_s,
+        )
+        return {key: round(value, 4) if isinstance(value, float) else value for key, value in data.items()}
+
+    def summary(self) -> str:
+        def fmt(value: float | None, unit: str, digits: int = 2) -> str:
+            return "n/a" if value is None else f"{value:.{digits}f}{unit}"
+
+        if self.cached:
+            return f"wall {fmt(self.wall_s, 's')} (cached)"
+        return (
+            f"wall {fmt(self.wall_s, 's')}, server {fmt(self.server_s, 's')}, load {fmt(self.load_s, 's')}, "
+            f"prefill {fmt(self.prefill_tps, ' tok/s', 0)}, decode {fmt(self.decode_tps, ' tok/s', 1)}"
+        )
+
+
+def _total(values: Sequence[float | int | None]) -> float:
+    return float(sum(value for value in values if value is not None))
+
+
+class MetricsCollector:
+    """Thread-safe collection of the stages of one run."""
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.stages: List[StageMetrics] = []
+        self.deadline: Dict[str, Any] | None = None  # How a --deadline was spent, see chain_deadline.
+        self._lock = threading.Lock()
+
+    def add(self, stage: StageMetrics) -> None:
+        with self._lock:
+            self.stages.append(stage)
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = list(self.stages)
+        generated = [stage for stage in stages if not stage.cached]
+        prompt_tokens = _total([stage.prompt_tokens for stage in generated])
+        prompt_eval_s = _total([stage.prompt_eval_s for stage in generated])
+        eval_tokens = _total([stage.eval_tokens for stage in generated])
+        eval_s = _total([stage.eval_s for stage in generated])
+        run_wall = (self.finished or time.perf_counter()) - self.started
+        return {
+            "stages": len(stages),
+            "cached_stages": len(stages) - len(generated),
+            "truncated_stages": sum(stage.done_reason == "length" for stage in generated),
+            "run_wall_s": round(run_wall, 4),
+            "stage_wall_s": round(_total([stage.wall_s for stage in stages]), 4),
+            "server_s": round(_total([stage.server_s for stage in generated]), 4),
+            "load_s": round(_total([stage.load_s for stage in generated]), 4),
+            "client_overhead_s": round(_total([stage.client_overhead_s for stage in generated]), 4),
+            "prompt_tokens": int(prompt_tokens),
+            "eval_tokens": int(eval_tokens),
+            "prefill_tps": round(prompt_tokens / prompt_eval_s, 2) if prompt_eval_s > 0 else None,
+            "decode_tps": round(eval_tokens / eval_s, 2) if eval_s > 0 else None,
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = [stage.as_dict() for stage in self.stages]
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mode": self.mode,
+            "totals": self.totals(),
+            "stages": stages,
+        }
+        if self.deadline is not None:
+            report["deadline"] = self.deadline
+        return report
+
+    def openmetrics(self) -> str:
+        """Render the run in the Prometheus text exposition format."""
+
+        with self._lock:
+            stages = list(self.stages)
+        families: List[Tuple[str, str, List[Tuple[Dict[str, str], float | int | None]]]] = []
+
+        def family(name: str, help_text: str, getter: Any) -> None:
+            samples = [
+                ({"stage": stage.label, "model": stage.model, "endpoint": stage.endpoint}, getter(stage))
+                for stage in stages
+                if not stage.cached
+            ]
+            families.append((f"{METRIC_PREFIX}_stage_{name}", help_text, samples))
+
+        family("wall_seconds", "Client wall time of the stage.", lambda stage: stage.wall_s)
+        family("server_seconds", "Ollama total_duration of the stage.", lambda stage: stage.server_s)
+        family("load_seconds", "Ollama load_duration of the stage.", lambda stage: stage.load_s)
+        family("client_overhead_seconds", "Wall time not accounted for by Ollama.", lambda stage: stage.client_overhead_s)
+        family("prompt_tokens", "Prompt tokens evaluated (prefill).", lambda stage: stage.prompt_tokens)
+        family("eval_tokens", "Tokens generated (decode).", lambda stage: stage.eval_tokens)
+        family("prefill_tokens_per_second", "Prefill throughput of the stage.", lambda stage: stage.prefill_tps)
+        family("decode_tokens_per_second", "Decode throughput of the stage.", lambda stage: stage.decode_tps)
+
+        totals = self.totals()
+        run_labels = {"mode": self.mode}
+        for key, name, help_text in (
+            ("run_wall_s", "wall_seconds", "Wall time of the whole run."),
+            ("server_s", "server_seconds", "Sum of Ollama total_duration over all stages."),
+            ("load_s", "load_seconds", "Sum of model load time over all stages."),
+            ("client_overhead_s", "client_overhead_seconds", "Sum of wall time not accounted for by Ollama."),
+            ("prefill_tps", "prefill_tokens_per_second", "Prefill throughput over all stages."),
+            ("decode_tps", "decode_tokens_per_second", "Decode throughput over all stages."),
+            ("stages", "stages", "Stages in the run."),
+            ("cached_stages", "cached_stages", "Stages answered from the response cache."),
+        ):
+            families.append((f"{METRIC_PREFIX}_run_{name}", help_text, [(run_labels, totals[key])]))
+        families.append(
+            (f"{METRIC_PREFIX}_run_last_completion_timestamp_seconds", "Unix time the run finished.", [(run_labels, time.time())])
+        )
+
+        lines: List[str] = []
+        for name, help_text, samples in families:
+            present = [(labels, value) for labels, value in samples if value is not None]
+            if not present:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in present:
+                rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_sample_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path) -> Tuple[Path, Path]:
+        """Write the JSON summary and (atomically) the textfile-collector file."""
+
+        directory.mkdir(parents=True, exist_ok=True)
+        json_path = directory / f"chain-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        json_path.write_text(json.dumps(self.to_json(), indent=2) + "\n", encoding="utf-8")
+        prom_path = directory / PROM_FILE
+        temporary = prom_path.with_name(f".{PROM_FILE}.{os.getpid()}.tmp")
+        temporary.write_text(self.openmetrics(), encoding="utf-8")
+        os.replace(temporary, prom_path)
+        return json_path, prom_path
+
+
+def _sample_value(value: float | int) -> str:
+    """Exact text for a sample: counters stay integers, floats keep every digit (epoch timestamps)."""
+
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
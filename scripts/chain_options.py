@@ -0,0 +1,185 @@
+"""Per-step generation options for ``ollama_chain``.
+
+Without options every stage generates until the model stops on its own and
+uses the model's default context.  A step may carry an options block between
+the model name and the endpoint::
+
+    qwen2.5-coder:7b{num_predict=256,temperature=0.2,stop="###"}@http://localhost:11436#Prüfe den Code
+
+Values are bare words or double-quoted JSON strings (for commas, braces or
+escapes such as ``"\\n\\n"``).  ``stop`` may be repeated to give several stop
+sequences.  ``keep_alive`` is not a model option; it overrides the run's
+``--keep-alive`` for this step, and ``output`` picks what later stages see of
+the reply (``output=code``, see ``scripts/chain_output.py``).  Pipeline files
+may give the same settings as an ``options`` object instead.  Everything is
+validated when the chain is parsed, so a typo fails before the first model is
+loaded.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Mapping, Tuple
+
+from chain_output import OutputFilter, parse_output_filter
+
+# name -> (type, minimum, maximum); None leaves a bound open.
+OPTION_SPECS: Dict[str, Tuple[type, float | None, float | None]] = {
+    "num_predict": (int, -2, None),
+    "num_ctx": (int, 1, None),
+    "temperature": (float, 0, None),
+    "top_k": (int, 0, None),
+    "top_p": (float, 0, 1),
+    "min_p": (float, 0, 1),
+    "typical_p": (float, 0, 1),
+    "repeat_penalty": (float, 0, None),
+    "repeat_last_n": (int, -1, None),
+    "presence_penalty": (float, None, None),
+    "frequency_penalty": (float, None, None),
+    "seed": (int, None, None),
+}
+KNOWN = sorted([*OPTION_SPECS, "stop", "keep_alive", "output"])
+
+
+def parse_keep_alive(raw: str | None) -> str | int | None:
+    """Accept Ollama durations (``"10m"``) or plain seconds (``"300"``, ``"-1"``)."""
+
+    if raw is None or not raw.strip():
+        return None
+    value = raw.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _convert(name: str, value: Any) -> Any:
+    kind, lower, upper = OPTION_SPECS[name]
+    if isinstance(value, bool):
+        raise ValueError(f"option '{name}' expects a number, got {value!r}")
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"option '{name}' expects {'an integer' if kind is int else 'a number'}, got {value!r}") from None
+    if kind is int and isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"option '{name}' expects an integer, got {value!r}")
+    if (lower is not None and number < lower) or (upper is not None and number > upper):
+        bounds = f">= {lower}" if upper is None else f"between {lower} and {upper}"
+        raise ValueError(f"option '{name}' must be {bounds}, got {value!r}")
+    return number
+
+
+def validate_options(raw: Mapping[str, Any]) -> Tuple[Dict[str, Any], str | int | None, OutputFilter | None]:
+    """Check ``raw`` and return the Ollama ``options``, the step's ``keep_alive`` and its output filter."""
+
+    options: Dict[str, Any] = {}
+    keep_alive: str | int | None = None
+    output: OutputFilter | None = None
+    for name, value in raw.items():
+        if name == "output":
+            output = parse_output_filter(str(value))
+        elif name == "keep_alive":
+            keep_alive = parse_keep_alive(str(value))
+            if keep_alive is None:
+                raise ValueError("option 'keep_alive' may not be empty")
+        elif name == "stop":
+            stops = value if isinstance(value, list) else [value]
+            if not stops or not all(isinstance(stop, str) and stop for stop in stops):
+                raise ValueError("option 'stop' expects non-empty strings")
+            options["stop"] = list(stops)
+        elif name in OPTION_SPECS:
+            options[name] = _convert(name, value)
+        else:
+            raise ValueError(f"unknown option '{name}' (known: {', '.join(KNOWN)})")
+    return options, keep_alive, output
+
+
+def _split_block(block: str) -> List[str]:
+    """Split ``a=1,b="x,y"`` on commas outside double quotes."""
+
+    parts: List[str] = []
+    current: List[str] = []
+    quoted = escaped = False
+    for char in block:
+        if quoted:
+            current.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+            current.append(char)
+        elif char == ",":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if quoted:
+        raise ValueError("unterminated quote in options block")
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_option_block(block: str) -> Tuple[Dict[str, Any], str | int | None, OutputFilter | None]:
+    """Parse the text between the braces of ``model{...}``."""
+
+    raw: Dict[str, Any] = {}
+    for part in _split_block(block):
+        name, separator, value = part.partition("=")
+        name, value = name.strip(), value.strip()
+        if not separator or not name:
+            raise ValueError(f"expected name=value in options block, got '{part}'")
+        if value.startswith('"'):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError(f"invalid quoted value for option '{name}': {value}") from None
+        if name == "stop":
+            raw.setdefault("stop", []).append(value)
+        elif name in raw:
+            raise ValueError(f"option '{name}' given twice")
+        else:
+            raw[name] = value
+    return validate_options(raw)
+
+
+def split_option_block(core: str) -> Tuple[str, str | None, str]:
+    """Split ``model{block}rest`` into ``(model, block, rest)``; ``block`` is ``None`` without braces.
+
+    Quotes are honoured while looking for the closing brace, so a quoted stop
+    sequence may contain ``}``, ``@`` or ``#``.
+    """
+
+    start = core.find("{")
+    if start < 0:
+        return core, None, ""
+    quoted = escaped = False
+    for position in range(start + 1, len(core)):
+        char = core[position]
+        if quoted:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "}":
+            return core[:start], core[start + 1 : position], core[position + 1 :]
+    raise ValueError("options block is missing its closing '}'")
+
+
+def describe_options(options: Mapping[str, Any], keep_alive: str | int | None = None, output: OutputFilter | None = None) -> str:
+    """Render options the way they are written in a step, for logs."""
+
+    parts = [f"{name}={json.dumps(value) if isinstance(value, str) else value}" for name, value in options.items() if name != "stop"]
+    parts.extend(f"stop={json.dumps(stop)}" for stop in options.get("stop", []))
+    if keep_alive is not None:
+        parts.append(f"keep_alive={keep_alive}")
+    if output is not None:
+        parts.append(f"output={json.dumps(output.spec)}")
+    return ", ".join(parts)
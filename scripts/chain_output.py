@@ -0,0 +1,157 @@
+"""Output filters that decide what later stages of ``ollama_chain`` see.
+
+Every stage normally hands its whole reply to all later stages, so a review
+stage re-reads the coder's explanations as well as the code and prefill grows
+with every step.  A step can name a filter with ``output=...`` in its options
+block (see ``scripts/chain_options.py``):
+
+* ``code`` or ``code:python`` – only the fenced code blocks (of that language);
+* ``json`` or ``json:review.issues`` – the reply is requested in Ollama's
+  structured-output mode (``format``) and only that field is passed on;
+* ``regex:PATTERN`` – every match, or its first group if the pattern has one;
+* ``last:N`` – the last N sections (Markdown headings, else paragraphs).
+
+The transcript always keeps the full reply.  When a filter finds nothing the
+full reply is passed on and the stage reports it, so a chain never continues
+on an empty context by accident.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+
+from chain_history import estimate_tokens
+
+KINDS = ("code", "json", "regex", "last")
+FENCE = re.compile(r"^```([^\n`]*)\n(.*?)^```[ \t]*$", re.MULTILINE | re.DOTALL)
+HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class OutputFilter:
+    kind: str
+    argument: str | None = None
+
+    @property
+    def spec(self) -> str:
+        return self.kind if self.argument is None else f"{self.kind}:{self.argument}"
+
+    def request_format(self) -> Any:
+        """Ollama ``format`` for this filter: a schema requiring the field, ``"json"``, or ``None``."""
+
+        if self.kind != "json":
+            return None
+        if not self.argument:
+            return "json"
+        field = self.argument.split(".", 1)[0]
+        return {"type": "object", "properties": {field: {}}, "required": [field]}
+
+    def apply(self, text: str) -> str | None:
+        """Return the extract of ``text``, or ``None`` when the filter found nothing."""
+
+        if self.kind == "code":
+            blocks = [
+                f"```{language}\n{body.rstrip()}\n```"
+                for language, body in FENCE.findall(text)
+                if self.argument is None or language.strip().lower() == self.argument.lower()
+            ]
+            return "\n\n".join(blocks) or None
+        if self.kind == "json":
+            return _json_field(text, self.argument)
+        if self.kind == "regex":
+            pattern = re.compile(self.argument or "", re.MULTILINE)
+            found = [match.group(1) if pattern.groups else match.group(0) for match in pattern.finditer(text)]
+            return "\n".join(part for part in found if part) or None
+        sections = _sections(text)
+        return "\n\n".join(sections[-int(self.argument or 1) :]) or None
+
+
+def parse_output_filter(raw: str) -> OutputFilter:
+    kind, separator, argument = raw.strip().partition(":")
+    kind = kind.strip().lower()
+    if kind not in KINDS:
+        raise ValueError(f"unknown output filter '{raw}' (known: {', '.join(KINDS)})")
+    value = argument.strip() if separator else None
+    if kind == "regex":
+        if not value:
+            raise ValueError("output filter 'regex' needs a pattern, e.g. regex:^diff.*")
+        try:
+            re.compile(value, re.MULTILINE)
+        except re.error as exc:
+            raise ValueError(f"invalid regex in output filter '{raw}': {exc}") from None
+    elif kind == "last":
+        if not value or not value.isdigit() or int(value) < 1:
+            raise ValueError(f"output filter 'last' needs a positive section count, e.g. last:2, got '{raw}'")
+    return OutputFilter(kind, value or None)
+
+
+def _sections(text: str) -> List[str]:
+    starts = [match.start() for match in HEADING.finditer(text)]
+    if starts:
+        bounds = ([0] if starts[0] > 0 else []) + starts + [len(text)]
+        return [text[start:end].strip() for start, end in zip(bounds, bounds[1:]) if text[start:end].strip()]
+    return [part.strip() for part in re.split(r"\n\s*\n", text) if part.strip()]
+
+
+def _json_field(text: str, path: str | None) -> str | None:
+    data: Any = None
+    candidates = [text] + [body for _, body in FENCE.findall(text)]
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:  # A reply cut short by num_predict may have no closing brace.
+        candidates.append(text[start : end + 1])
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    for part in path.split(".") if path else []:
+        if isinstance(data, dict) and part in data:
+            data = data[part]
+        elif isinstance(data, list) and part.lstrip("-").isdigit() and -len(data) <= int(part) < len(data):
+            data = data[int(part)]
+        else:
+            return None
+    if data is None:
+        return None
+    return data if isinstance(data, str) else json.dumps(data, indent=2, ensure_ascii=False)
+
+
+@dataclass
+class Projection:
+    """What a stage's filter passed on, in estimated tokens."""
+
+    label: str
+    spec: str | None
+    full_tokens: int
+    kept_tokens: int
+    matched: bool = True
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.kept_tokens
+
+    def summary(self, later_stages: int) -> str:
+        if not self.matched:
+            return f"output filter {self.spec} matched nothing, passing the full reply (~{self.full_tokens} token(s))"
+        return (
+            f"output filter {self.spec}: later stages see ~{self.kept_tokens} of ~{self.full_tokens} token(s), "
+            f"~{self.saved_tokens} saved per later stage (~{self.saved_tokens * later_stages} over {later_stages})"
+        )
+
+
+def project(label: str, text: str, output: OutputFilter | None) -> Tuple[str, Projection]:
+    """Apply ``output`` to ``text`` and return the extract with its :class:`Projection`."""
+
+    full = estimate_tokens(text)
+    if output is None:
+        return text, Projection(label, None, full, full)
+    extract = output.apply(text)
+    if extract is None:
+        return text, Projection(label, output.spec, full, full, matched=False)
+    return extract.strip(), Projection(label, output.spec, full, estimate_tokens(extract.strip()))
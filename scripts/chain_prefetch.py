@@ -0,0 +1,128 @@
+"""Background model preloading and unloading for ``ollama_chain``.
+
+Ollama loads a model when an ``/api/generate`` request arrives with an empty
+prompt and unloads it when ``keep_alive`` is ``0``.  :class:`Prefetcher` uses
+that to warm the next stage's model on its own endpoint while the current stage
+is still generating, so the load no longer sits on the critical path, and to
+release models the chain will not use again.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from chain_router import ReplicaUnavailable, default_router, split_endpoints
+from http_pool import HttpConnectionError, HttpError, default_pool
+
+ModelKey = Tuple[str, str]  # (endpoint, model)
+
+
+@dataclass
+class LoadReport:
+    """How much of a stage's model load was hidden behind the previous stage."""
+
+    hidden: float = 0.0
+    exposed: float = 0.0
+    prefetched: bool = False
+
+    def summary(self) -> str:
+        origin = "prefetched" if self.prefetched else "on demand"
+        return f"load hidden={self.hidden:.2f}s exposed={self.exposed:.2f}s ({origin})"
+
+
+def _post(endpoint: str, model: str, keep_alive: str | int, timeout: float) -> Dict[str, object]:
+    body = json.dumps({"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}).encode("utf-8")
+    response = default_pool().request(
+        "POST", f"{endpoint}/api/generate", body=body, headers={"Content-Type": "application/json"}, timeout=timeout
+    )
+    try:
+        return json.loads(response.text())
+    except json.JSONDecodeError:
+        return {}
+
+
+def load_model(endpoint: str, model: str, keep_alive: str | int, timeout: float) -> float:
+    """Load ``model`` without generating and return the server-side load time in seconds.
+
+    For a replica pool the router picks the replica the next request will most
+    likely be sent to, which then counts as holding the model.
+    """
+
+    replicas = split_endpoints(endpoint)
+    if len(replicas) > 1:
+        return default_router().call(
+            replicas, model, lambda single: load_model(single, model, keep_alive, timeout), lambda seconds: seconds, record_latency=False
+        )
+    started = time.perf_counter()
+    try:
+        payload = _post(endpoint, model, keep_alive, timeout)
+    except HttpConnectionError as exc:
+        raise ReplicaUnavailable(f"Failed to reach {endpoint}: {exc.reason}") from exc
+    load_ns = payload.get("load_duration")
+    if isinstance(load_ns, (int, float)):
+        return float(load_ns) / 1e9
+    return time.perf_counter() - started
+
+
+def unload_model(endpoint: str, model: str, timeout: float) -> None:
+    """Unload ``model``; for a replica pool, from every replica known to hold it."""
+
+    replicas = split_endpoints(endpoint)
+    for replica in default_router().holders(replicas, model) if len(replicas) > 1 else replicas:
+        _post(replica, model, 0, timeout)
+        default_router().forget(replica, model)
+
+
+class Prefetcher:
+    """Runs load and unload requests on a small background pool."""
+
+    def __init__(self, keep_alive: str | int, timeout: float, workers: int = 2) -> None:
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._loads: Dict[ModelKey, Future[float]] = {}
+        self._unloads: list[Future[None]] = []
+
+    def schedule(self, endpoint: str, model: str) -> None:
+        key = (endpoint, model)
+        if key not in self._loads:
+            self._loads[key] = self._executor.submit(load_model, endpoint, model, self.keep_alive, self.timeout)
+
+    def collect(self, endpoint: str, model: str, timeout: float | None = None) -> LoadReport:
+        """Wait up to ``timeout`` for a scheduled load of ``model``; the wait is the part of the load left exposed.
+
+        When the load takes longer the stage goes ahead and its request waits for the model on the server.
+        """
+
+        future = self._loads.pop((endpoint, model), None)
+        if future is None:
+            return LoadReport()
+        started = time.perf_counter()
+        try:
+            load_seconds = future.result(timeout=timeout)
+        except FutureTimeout:
+            print(f"[prefetch] {model} on {endpoint} is still loading after {timeout:.2f}s; not waiting any longer")
+            return LoadReport(exposed=time.perf_counter() - started, prefetched=True)
+        except (HttpError, OSError, ReplicaUnavailable) as exc:
+            print(f"[prefetch] Preloading {model} on {endpoint} failed: {exc}")
+            return LoadReport()
+        waited = time.perf_counter() - started
+        return LoadReport(hidden=max(load_seconds - waited, 0.0), exposed=waited, prefetched=True)
+
+    def release(self, endpoint: str, model: str) -> None:
+        self._unloads.append(self._executor.submit(self._unload_quietly, endpoint, model))
+
+    def _unload_quietly(self, endpoint: str, model: str) -> None:
+        try:
+            unload_model(endpoint, model, self.timeout)
+        except (HttpError, OSError) as exc:
+            print(f"[prefetch] Unloading {model} on {endpoint} failed: {exc}")
+
+    def close(self) -> None:
+        for future in self._unloads:
+            future.result()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,238 @@
+"""Replica selection and failover for steps that name several endpoints.
+
+A step written as ``model@http://a:11434,http://b:11434`` may run on any of
+the listed Ollama replicas.  :class:`Router` picks one per request and keeps
+per-replica counters:
+
+* ``ewma`` (default) estimates each replica's completion time from an
+  exponentially weighted moving average of its latency for the model, scaled
+  by the requests already in flight there, plus the model's cold-load time if
+  the replica does not hold the model yet.
+* ``least-loaded`` picks the replica with the fewest requests in flight and
+  breaks ties in favour of replicas that already have the model loaded.
+
+Which replica holds which model is learned from ``/api/ps`` when a replica is
+first used and from the requests it served since.  A replica that refused a
+connection is retried elsewhere (up to ``max_attempts`` replicas) and avoided
+for ``cooldown`` seconds.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, TypeVar
+
+from http_pool import HttpError, default_pool
+
+POLICIES = ("ewma", "least-loaded")
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_ALPHA = 0.3
+DEFAULT_COOLDOWN = 10.0
+
+T = TypeVar("T")
+
+
+class ReplicaUnavailable(RuntimeError):
+    """A replica could not be reached, so the request may be retried on another one."""
+
+
+def split_endpoints(endpoint: str) -> List[str]:
+    """Split a comma-separated endpoint pool, dropping blanks and duplicates."""
+
+    return list(dict.fromkeys(part.strip() for part in endpoint.split(",") if part.strip()))
+
+
+def loaded_models(endpoint: str, timeout: float) -> List[Dict[str, Any]] | None:
+    """The model entries ``/api/ps`` lists for ``endpoint``; ``None`` when it cannot be asked."""
+
+    try:
+        loaded = json.loads(default_pool().request("GET", f"{endpoint}/api/ps", timeout=timeout).text()).get("models") or []
+    except (HttpError, OSError, ValueError, AttributeError):
+        return None
+    return [entry for entry in loaded if isinstance(entry, dict)]
+
+
+@dataclass
+class Replica:
+    endpoint: str
+    in_flight: int = 0
+    requests: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    failovers: int = 0
+    models: Set[str] = field(default_factory=set)
+    latency: Dict[str, float] = field(default_factory=dict)  # EWMA seconds per model, excluding load time.
+    down_until: float = 0.0
+    probed: bool = False
+
+    def expected_seconds(self, model: str, cold_load: float) -> float:
+        warm = 0.0 if model in self.models else cold_load
+        return self.latency.get(model, 0.0) * (self.in_flight + 1) + warm
+
+
+class Router:
+    """Thread-safe replica chooser shared by every stage of a run."""
+
+    def __init__(
+        self,
+        policy: str = "ewma",
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        alpha: float = DEFAULT_ALPHA,
+        cooldown: float = DEFAULT_COOLDOWN,
+        probe_timeout: float = 2.0,
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.policy = policy
+        self.max_attempts = max_attempts
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.replicas: Dict[str, Replica] = {}
+        self.cold_load: Dict[str, float] = {}  # Last observed load time per model, in seconds.
+        self._lock = threading.Lock()
+
+    def _replica(self, endpoint: str) -> Replica:
+        replica = self.replicas.get(endpoint)
+        if replica is None:
+            replica = self.replicas[endpoint] = Replica(endpoint)
+        return replica
+
+    def discover(self, endpoints: Sequence[str]) -> None:
+        """Ask replicas seen for the first time which models they already hold."""
+
+        with self._lock:
+            fresh = [self._replica(endpoint) for endpoint in endpoints if not self._replica(endpoint).probed]
+            for replica in fresh:
+                replica.probed = True
+        for replica in fresh:
+            loaded = loaded_models(replica.endpoint, self.probe_timeout)
+            if loaded is None:
+                continue
+            names = {str(entry.get("name") or entry.get("model")) for entry in loaded}
+            with self._lock:
+                replica.models.update(name for name in names if name != "None")
+
+    def acquire(self, endpoints: Sequence[str], model: str, exclude: Sequence[str] = ()) -> Replica:
+        """Choose a replica for ``model`` and count the request as in flight there."""
+
+        with self._lock:
+            candidates = [self._replica(endpoint) for endpoint in endpoints if endpoint not in exclude]
+            if not candidates:
+                raise ValueError("No replica left to try")
+            now = time.monotonic()
+            healthy = [replica for replica in candidates if replica.down_until <= now] or candidates
+            order = {replica.endpoint: position for position, replica in enumerate(healthy)}
+            cold = self.cold_load.get(model, 0.0)
+            if self.policy == "least-loaded":
+                chosen = min(
+                    healthy,
+                    key=lambda r: (r.in_flight, model not in r.models, r.latency.get(model, 0.0), order[r.endpoint]),
+                )
+            else:
+                chosen = min(healthy, key=lambda r: (r.expected_seconds(model, cold), r.in_flight, order[r.endpoint]))
+            chosen.in_flight += 1
+            chosen.requests += 1
+            return chosen
+
+    def succeeded(
+        self, replica: Replica, model: str, seconds: float, load_seconds: float = 0.0, record_latency: bool = True
+    ) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+            replica.succeeded += 1
+            replica.models.add(model)
+            replica.down_until = 0.0
+            if load_seconds > 0:
+                self.cold_load[model] = load_seconds
+            if not record_latency:
+                return
+            sample = max(seconds - load_seconds, 0.0)
+            previous = replica.latency.get(model)
+            replica.latency[model] = sample if previous is None else self.alpha * sample + (1 - self.alpha) * previous
+
+    def failed(self, replica: Replica, unreachable: bool) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+            replica.failed += 1
+            if unreachable:
+                replica.failovers += 1
+                replica.down_until = time.monotonic() + self.cooldown
+                replica.models.clear()
+
+    def call(
+        self,
+        endpoints: Sequence[str],
+        model: str,
+        send: Callable[[str], T],
+        load_seconds: Optional[Callable[[T], float]] = None,
+        record_latency: bool = True,
+    ) -> T:
+        """Run ``send(endpoint)`` on the best replica, failing over on :class:`ReplicaUnavailable`.
+
+        Requests that generate nothing (model preloads) pass ``record_latency=False``
+        so they update which replica holds the model and its cold-load time, not the
+        latency estimate.
+        """
+
+        self.discover(endpoints)
+        tried: List[str] = []
+        last_error: ReplicaUnavailable | None = None
+        for _ in range(min(self.max_attempts, len(endpoints))):
+            replica = self.acquire(endpoints, model, exclude=tried)
+            tried.append(replica.endpoint)
+            started = time.monotonic()
+            try:
+                result = send(replica.endpoint)
+            except ReplicaUnavailable as exc:
+                self.failed(replica, unreachable=True)
+                last_error = exc
+                print(f"[router] {replica.endpoint} unavailable for {model}, trying another replica: {exc}")
+                continue
+            except BaseException:
+                self.failed(replica, unreachable=False)
+                raise
+            load = load_seconds(result) if load_seconds is not None else 0.0
+            self.succeeded(replica, model, time.monotonic() - started, load, record_latency)
+            return result
+        raise ReplicaUnavailable(f"No replica could serve {model} after {len(tried)} attempt(s): {last_error}")
+
+    def holders(self, endpoints: Sequence[str], model: str) -> List[str]:
+        with self._lock:
+            return [endpoint for endpoint in endpoints if model in self._replica(endpoint).models]
+
+    def forget(self, endpoint: str, model: str) -> None:
+        with self._lock:
+            self._replica(endpoint).models.discard(model)
+
+    def summary_lines(self) -> List[str]:
+        with self._lock:
+            replicas = list(self.replicas.values())
+        lines = [f"{'replica':<32} {'requests':>8} {'ok':>5} {'failed':>6} {'failover':>8}  latency (ewma)"]
+        for replica in replicas:
+            latency = ", ".join(f"{model} {seconds:.2f}s" for model, seconds in sorted(replica.latency.items())) or "n/a"
+            lines.append(
+                f"{replica.endpoint:<32} {replica.requests:>8} {replica.succeeded:>5} {replica.failed:>6} "
+                f"{replica.failovers:>8}  {latency}"
+            )
+        return lines
+
+
+_default_router = Router()
+
+
+def default_router() -> Router:
+    return _default_router
+
+
+def configure_router(policy: str = "ewma", max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Router:
+    """Replace the process-wide router, resetting its counters for a new run."""
+
+    global _default_router
+    _default_router = Router(policy=policy, max_attempts=max_attempts)
+    return _default_router
@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""Long-running chain service that schedules many users' chains on shared Ollama hosts.
+
+When several people run ``ollama_chain.py`` against the same hosts, their
+stages interleave and every switch evicts someone else's model.  The service
+accepts chain jobs over HTTP instead and schedules their *stages*: pending
+stages are grouped by ``(endpoint, model)`` and a loaded model drains its group
+before the endpoint switches to another model (see :class:`AffinityQueue`).
+Two bounds keep that fair: after ``--max-affinity`` consecutive stages of one
+model the endpoint yields to the group that has waited longest, and any group
+whose oldest stage has waited ``--max-wait`` seconds is served next
+regardless of affinity.  Admission control rejects new jobs with HTTP 429 once
+``--max-jobs`` jobs are queued or running, and request bodies larger than
+``--max-body`` bytes with HTTP 413::
+
+    python scripts/chain_service.py serve --port 8765
+    python scripts/chain_service.py submit --url http://127.0.0.1:8765 \
+        --prompt "Entwirf eine REST-API." --step "qwen2.5-coder:7b" --step "llama3.1:8b#Dokumentiere"
+
+Endpoints (JSON unless noted):
+
+* ``POST /jobs`` with ``{"prompt": ..., "steps": ["model@endpoint#directive", ...]}``
+  and optional ``api`` (``generate``/``chat``), ``default_directive``,
+  ``keep_alive`` and ``stream`` (default ``true``).  Streaming requests receive
+  the job's events as NDJSON (``accepted``, ``stage_queued``,
+  ``stage_started``, ``token``, ``stage_done``, ``done`` or ``failed``);
+  otherwise the reply is ``202`` with the job id.
+* ``GET /jobs/<id>`` job status, ``GET /jobs/<id>/events`` the event stream
+  (replayed from the start; once a job has finished its ``token`` events are
+  merged into one per stage), ``GET /jobs`` all jobs.
+* ``GET /queue`` pending stages per ``model@endpoint``, stages running per
+  endpoint, job counts and the number of model switches.
+
+Stages are built exactly as in a linear ``ollama_chain`` run and streamed
+through :func:`ollama_api.stream_request`, so replica pools, routing and
+the shared connection pool apply unchanged.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Generic, List, Sequence, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from chain_router import split_endpoints
+from http_pool import HttpError, HttpStatusError, default_pool
+from ollama_api import DEFAULT_BASE_URL, JSON_HEADERS, stream_request
+from ollama_chain import DEFAULT_DIRECTIVE, Conversation, Step, load_prompt, parse_keep_alive, parse_step, resolve_directive
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_JOBS = 32
+DEFAULT_MAX_BODY = 1 << 20  # A job is a prompt plus a few step strings; 1 MiB leaves ample room.
+DEFAULT_MAX_AFFINITY = 8
+DEFAULT_MAX_WAIT = 120.0
+HEARTBEAT_SECONDS = 15.0
+KEEP_FINISHED = 200
+TERMINAL_EVENTS = ("done", "failed")
+
+T = TypeVar("T")
+
+
+class AffinityQueue(Generic[T]):
+    """Pending stages grouped by ``(endpoint, model)`` with model affinity and aging.
+
+    :meth:`pop` keeps serving the model an endpoint ran last while its group
+    has work, up to ``max_affinity`` stages in a row when other groups wait.
+    It then switches to the group whose oldest stage has waited longest; a
+    group whose head waited ``max_wait`` seconds always goes next.
+    """
+
+    def __init__(self, max_affinity: int = DEFAULT_MAX_AFFINITY, max_wait: float = DEFAULT_MAX_WAIT) -> None:
+        if max_affinity < 1:
+            raise ValueError("max_affinity must be at least 1")
+        self.max_affinity = max_affinity
+        self.max_wait = max_wait
+        self.groups: Dict[Tuple[str, str], Deque[Tuple[float, T]]] = {}
+        self.current: Dict[str, str] = {}  # Endpoint -> model it served last.
+        self.streak: Dict[str, int] = {}
+        self.switches = 0
+
+    def push(self, endpoint: str, model: str, item: T, now: float) -> None:
+        self.groups.setdefault((endpoint, model), deque()).append((now, item))
+
+    def endpoints(self) -> List[str]:
+        return list(dict.fromkeys(endpoint for (endpoint, _), pending in self.groups.items() if pending))
+
+    def pop(self, endpoint: str, now: float) -> Tuple[str, T, float] | None:
+        """Return ``(model, item, seconds queued)`` for the next stage on ``endpoint``."""
+
+        waiting = {model: pending for (ep, model), pending in self.groups.items() if ep == endpoint and pending}
+        if not waiting:
+            return None
+        current = self.current.get(endpoint)
+        oldest = min(waiting, key=lambda model: waiting[model][0][0])
+        if now - waiting[oldest][0][0] >= self.max_wait:
+            chosen = oldest
+        elif current in waiting and (self.streak.get(endpoint, 0) < self.max_affinity or len(waiting) == 1):
+            chosen = current
+        else:
+            others = [model for model in waiting if model != current]
+            chosen = min(others, key=lambda model: waiting[model][0][0])
+        if chosen == current:
+            self.streak[endpoint] = self.streak.get(endpoint, 0) + 1
+        else:
+            if current is not None:
+                self.switches += 1
+            self.current[endpoint] = chosen
+            self.streak[endpoint] = 1
+        queued_at, item = waiting[chosen].popleft()
+        return chosen, item, now - queued_at
+
+    def depth(self) -> Dict[str, int]:
+        return {f"{model}@{endpoint}": len(pending) for (endpoint, model), pending in self.groups.items() if pending}
+
+    def __len__(self) -> int:
+        return sum(len(pending) for pending in self.groups.values())
+
+
+@dataclass
+class StageState:
+    index: int
+    model: str
+    endpoint: str
+    state: str = "pending"  # pending, queued, running, done, failed
+    queued_s: float | None = None
+    wall_s: float | None = None
+    ttft_s: float | None = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            key: round(value, 3) if isinstance(value, float) else value
+            for key, value in self.__dict__.items()
+        }
+
+
+def collapse_tokens(events: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge each run of ``token`` events of one stage into a single event with the joined text."""
+
+    collapsed: List[Dict[str, Any]] = []
+    for event in events:
+        previous = collapsed[-1] if collapsed else None
+        if event["event"] == "token" and previous is not None and previous["event"] == "token" and previous["stage"] == event["stage"]:
+            collapsed[-1] = dict(previous, text=previous["text"] + event["text"])
+        else:
+            collapsed.append(event)
+    return collapsed
+
+
+@dataclass
+class Job:
+    """One submitted chain and the events it produced so far."""
+
+    id: str
+    steps: List[Step]
+    api: str
+    default_directive: str
+    keep_alive: str | int | None
+    conversation: Conversation
+    submitted: float = field(default_factory=time.time)
+    state: str = "queued"
+    error: str | None = None
+    stages: List[StageState] = field(default_factory=list)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    listeners: List["asyncio.Queue[Dict[str, Any]]"] = field(default_factory=list)
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        event = dict(event, job=self.id)
+        if event["event"] in TERMINAL_EVENTS:
+            # Finished jobs are kept for replay (up to KEEP_FINISHED); one token event per stage is enough for that.
+            self.events = collapse_tokens(self.events)
+        self.events.append(event)
+        for listener in self.listeners:
+            listener.put_nowait(event)
+
+    def subscribe(self) -> "asyncio.Queue[Dict[str, Any]]":
+        listener: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+        for event in self.events:
+            listener.put_nowait(event)
+        self.listeners.append(listener)
+        return listener
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+    def status(self) -> Dict[str, Any]:
+        history = self.conversation.transcript
+        return {
+            "id": self.id,
+            "state": self.state,
+            "submitted_at": round(self.submitted, 3),
+            "api": self.api,
+            "stages": [stage.as_dict() for stage in self.stages],
+            "output": history[-1][1] if self.state == "done" and history else None,
+            "error": self.error,
+        }
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ChainService:
+    """Job registry, stage scheduler and HTTP front end, all on one event loop."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        max_affinity: int = DEFAULT_MAX_AFFINITY,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        per_endpoint: int = 1,
+        timeout: float = 600.0,
+        keep_alive: str | int | None = None,
+        max_body: int = DEFAULT_MAX_BODY,
+    ) -> None:
+        if per_endpoint < 1:
+            raise ValueError("per_endpoint must be at least 1")
+        self.base_url = base_url
+        self.max_jobs = max_jobs
+        self.max_body = max_body
+        self.per_endpoint = per_endpoint
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.queue: AffinityQueue[Tuple[Job, int]] = AffinityQueue(max_affinity, max_wait)
+        self.jobs: Dict[str, Job] = {}
+        self.running: Dict[str, int] = {}
+        self.rejected = 0
+        self.executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="chain-stage")
+        self.server: asyncio.AbstractServer | None = None
+
+    # -- scheduling -------------------------------------------------------
+
+    def capacity(self, endpoint: str) -> int:
+        return self.per_endpoint * len(split_endpoints(endpoint))
+
+    def active_jobs(self) -> int:
+        return sum(not job.finished for job in self.jobs.values())
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        if self.active_jobs() >= self.max_jobs:
+            self.rejected += 1
+            raise ServiceError(429, f"queue full: {self.max_jobs} job(s) queued or running")
+        try:
+            prompt = load_prompt(str(payload.get("prompt") or ""), None)
+            raw_steps = payload.get("steps")
+            if not isinstance(raw_steps, list) or not raw_steps:
+                raise ValueError("'steps' must be a non-empty list of step strings")
+            steps = [parse_step(str(raw), self.base_url) for raw in raw_steps]
+            api = str(payload.get("api") or "generate")
+            if api not in ("generate", "chat"):
+                raise ValueError("'api' must be 'generate' or 'chat'")
+            keep_alive = payload.get("keep_alive")
+            keep_alive = parse_keep_alive(str(keep_alive)) if keep_alive is not None else self.keep_alive
+            default_directive = payload.get("default_directive", DEFAULT_DIRECTIVE)
+            if not isinstance(default_directive, str):
+                raise ValueError("'default_directive' must be a string; an empty one disables it")
+        except ValueError as exc:
+            raise ServiceError(400, str(exc)) from exc
+        job = Job(
+            id=uuid.uuid4().hex[:12],
+            steps=steps,
+            api=api,
+            default_directive=default_directive,
+            keep_alive=keep_alive,
+            conversation=Conversation.start(prompt),
+            stages=[StageState(index, step.model, step.normalised_endpoint()) for index, step in enumerate(steps, start=1)],
+        )
+        self.jobs[job.id] = job
+        self._forget_finished()
+        job.emit({"event": "accepted", "stages": len(steps)})
+        self._enqueue(job, 0)
+        return job
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[: max(len(finished) - KEEP_FINISHED, 0)]:
+            del self.jobs[job_id]
+
+    def _enqueue(self, job: Job, position: int) -> None:
+        stage = job.stages[position]
+        stage.state = "queued"
+        self.queue.push(stage.endpoint, stage.model, (job, position), time.monotonic())
+        job.emit({"event": "stage_queued", "stage": stage.index, "model": stage.model, "endpoint": stage.endpoint, "queue_depth": len(self.queue)})
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        for endpoint in self.queue.endpoints():
+            while self.running.get(endpoint, 0) < self.capacity(endpoint):
+                picked = self.queue.pop(endpoint, now)
+                if picked is None:
+                    break
+                _, (job, position), queued = picked
+                self.running[endpoint] = self.running.get(endpoint, 0) + 1
+                asyncio.get_running_loop().create_task(self._run_stage(job, position, queued))
+
+    async def _run_stage(self, job: Job, position: int, queued: float) -> None:
+        state = job.stages[position]
+        step = job.steps[position]
+        state.state, state.queued_s = "running", queued
+        job.state = "running"
+        job.emit({"event": "stage_started", "stage": state.index, "model": state.model, "endpoint": state.endpoint, "queued_s": round(queued, 3)})
+        directive = resolve_directive(step, state.index, job.default_directive)
+        stage = job.conversation.stage_request(step, state.index, directive, job.api, job.keep_alive)
+        loop = asyncio.get_running_loop()
+
+        def on_token(fragment: str) -> None:
+            loop.call_soon_threadsafe(job.emit, {"event": "token", "stage": state.index, "text": fragment})
+
+        started = time.perf_counter()
+        try:
+            raw, stats = await loop.run_in_executor(self.executor, lambda: stream_request(stage, self.timeout, on_token))
+        except Exception as exc:  # noqa: BLE001 - reported to the client instead of killing the service.
+            state.state, job.state, job.error = "failed", "failed", str(exc)
+            job.emit({"event": "failed", "stage": state.index, "error": str(exc)})
+        else:
+            state.state, state.wall_s, state.ttft_s = "done", time.perf_counter() - started, stats.time_to_first_token
+            job.conversation.record(step.display_name, raw, step.output)
+            job.emit(
+                {
+                    "event": "stage_done",
+                    "stage": state.index,
+                    "summary": stats.summary(),
+                    "wall_s": round(state.wall_s, 3),
+                    "eval_tokens": stats.server.get("eval_count"),
+                    "done_reason": stats.server.get("done_reason"),
+                    "options": stage.options or {},
+                }
+            )
+            if position + 1 < len(job.steps):
+                self._enqueue(job, position + 1)
+            else:
+                job.state = "done"
+                job.emit({"event": "done", "output": job.conversation.transcript[-1][1]})
+        finally:
+            self.running[state.endpoint] -= 1
+            self._dispatch()
+
+    def queue_status(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        return {
+            "queued_stages": len(self.queue),
+            "depth": self.queue.depth(),
+            "running": {endpoint: count for endpoint, count in self.running.items() if count},
+            "loaded": dict(self.queue.current),
+            "jobs": counts,
+            "max_jobs": self.max_jobs,
+            "rejected": self.rejected,
+            "switches": self.queue.switches,
+        }
+
+    # -- HTTP -------------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> int:
+        """Start listening and return the bound port (useful with ``port=0``)."""
+
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return int(self.server.sockets[0].getsockname()[1])
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, body = await read_request(reader, self.max_body)
+            await self._route(method, path, body, writer)
+        except ServiceError as exc:
+            await write_json(writer, exc.status, {"error": str(exc)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        parts = [part for part in path.split("/") if part]
+        if parts == ["healthz"]:
+            await write_json(writer, 200, {"status": "ok"})
+        elif parts == ["queue"]:
+            await write_json(writer, 200, self.queue_status())
+        elif parts == ["jobs"] and method == "POST":
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError as exc:
+                raise ServiceError(400, f"invalid JSON body: {exc.msg}") from exc
+            if not isinstance(payload, dict):
+                raise ServiceError(400, "expected a JSON object")
+            job = self.submit(payload)
+            if payload.get("stream", True):
+                await self._stream_events(job, writer)
+            else:
+                await write_json(writer, 202, {"id": job.id, "status_url": f"/jobs/{job.id}"})
+        elif parts == ["jobs"]:
+            await write_json(writer, 200, {"jobs": [job.status() for job in self.jobs.values()]})
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise ServiceError(404, f"unknown job {parts[1]}")
+            if len(parts) == 3 and parts[2] == "events":
+                await self._stream_events(job, writer)
+            elif len(parts) == 2:
+                await write_json(writer, 200, job.status())
+            else:
+                raise ServiceError(404, f"no route for {path}")
+        else:
+            raise ServiceError(404, f"no route for {method} {path}")
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        listener = job.subscribe()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(listener.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    event = {"event": "heartbeat", "job": job.id, "state": job.state}
+                data = json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n"
+                writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                await writer.drain()
+                if event["event"] in TERMINAL_EVENTS:
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # A client that disconnects only stops following the job; the job keeps running.
+            job.listeners.remove(listener)
+
+
+async def read_request(reader: asyncio.StreamReader, max_body: int = DEFAULT_MAX_BODY) -> Tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise ServiceError(400, "malformed request line") from None
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            try:
+                length = int(value.strip() or 0)
+            except ValueError:
+                raise ServiceError(400, f"invalid Content-Length {value.strip()!r}") from None
+            if length < 0:
+                raise ServiceError(400, f"invalid Content-Length {length}")
+            if length > max_body:
+                raise ServiceError(413, f"request body of {length} bytes exceeds the {max_body}-byte limit")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, body
+
+
+async def write_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+    reasons = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 429: "Too Many Requests"}
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = [
+        f"HTTP/1.1 {status} {reasons.get(status, 'Error')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    if status == 429:
+        headers.append("Retry-After: 5")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+def submit_job(url: str, payload: Dict[str, Any], timeout: float) -> int:
+    """Submit a job and print its streamed events the way ``ollama_chain --stream`` prints stages."""
+
+    body = json.dumps(dict(payload, stream=True)).encode("utf-8")
+    try:
+        with default_pool().stream("POST", f"{url.rstrip('/')}/jobs", body=body, headers=JSON_HEADERS, timeout=timeout) as response:
+            for raw_line in response:
+                if not raw_line.strip():
+                    continue
+                event = json.loads(raw_line)
+                kind = event.get("event")
+                if kind == "accepted":
+                    print(f"Job {event['job']} accepted ({event['stages']} stage(s)).")
+                elif kind == "stage_started":
+                    print(f"\n[Step {event['stage']}] Running {event['model']} via {event['endpoint']} (queued {event['queued_s']:.2f}s)...")
+                    print("--- Response ---", flush=True)
+                elif kind == "token":
+                    sys.stdout.write(event["text"])
+                    sys.stdout.flush()
+                elif kind == "stage_done":
+                    print(f"\n[Step {event['stage']}] {event['summary']}")
+                elif kind == "failed":
+                    print(f"Error: job {event['job']} failed: {event['error']}", file=sys.stderr)
+                    return 1
+                elif kind == "done":
+                    return 0
+    except HttpStatusError as exc:
+        print(f"Error: {exc.body.decode('utf-8', errors='ignore')}", file=sys.stderr)
+        return 1
+    except (HttpError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print("Error: the service closed the stream before the job finished.", file=sys.stderr)
+    return 1
+
+
+async def serve(args: argparse.Namespace) -> None:
+    service = ChainService(
+        base_url=args.base_url.rstrip("/"),
+        max_jobs=args.max_jobs,
+        max_affinity=args.max_affinity,
+        max_wait=args.max_wait,
+        per_endpoint=args.per_endpoint,
+        timeout=args.timeout,
+        keep_alive=parse_keep_alive(args.keep_alive),
+        max_body=args.max_body,
+    )
+    port = await service.start(args.host, args.port)
+    print(f"Chain service listening on http://{args.host}:{port} (max {args.max_jobs} job(s), affinity {args.max_affinity})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve or submit ollama_chain jobs with model-affinity scheduling.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the chain service.")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: %(default)s).")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to bind (default: %(default)s).")
+    serve_parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Endpoint for steps without one (default: %(default)s).")
+    serve_parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help="Queued plus running jobs before new ones get HTTP 429 (default: %(default)s).")
+    serve_parser.add_argument(
+        "--max-affinity",
+        type=int,
+        default=DEFAULT_MAX_AFFINITY,
+        help="Consecutive stages of one model before an endpoint serves another waiting model (default: %(default)s).",
+    )
+    serve_parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=DEFAULT_MAX_WAIT,
+        help="Seconds after which a waiting model group is served regardless of affinity (default: %(default)s).",
+    )
+    serve_parser.add_argument("--per-endpoint", type=int, default=1, help="Stages running at once per endpoint replica (default: %(default)s).")
+    serve_parser.add_argument("--timeout", type=float, default=600.0, help="Per-read timeout for Ollama requests (default: %(default)s).")
+    serve_parser.add_argument("--keep-alive", help="Default keep_alive for stage requests, e.g. 30m.")
+    serve_parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY, help="Largest request body in bytes; larger ones get HTTP 413 (default: %(default)s).")
+
+    submit_parser = commands.add_parser("submit", help="Submit a chain and stream its output.")
+    submit_parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="Service URL (default: %(default)s).")
+    submit_parser.add_argument("--prompt", help="Initial prompt text.")
+    submit_parser.add_argument("--prompt-file", help="Path to a file containing the initial prompt.")
+    submit_parser.add_argument("--step", action="append", required=True, help="Step as in ollama_chain: model[@endpoint][#directive].")
+    submit_parser.add_argument("--api", choices=("generate", "chat"), default="generate", help="Ollama API (default: %(default)s).")
+    submit_parser.add_argument("--default-directive", help="Directive for steps >= 2 without their own; an empty string disables it.")
+    submit_parser.add_argument("--keep-alive", help="keep_alive for this job's stage requests.")
+    submit_parser.add_argument("--timeout", type=float, default=900.0, help="Per-read timeout while following the job (default: %(default)s).")
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    try:
+        prompt = load_prompt(args.prompt, args.prompt_file)
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    payload: Dict[str, Any] = {"prompt": prompt, "steps": args.step, "api": args.api}
+    if args.default_directive is not None:
+        payload["default_directive"] = args.default_directive
+    if args.keep_alive:
+        payload["keep_alive"] = args.keep_alive
+    return submit_job(args.url, payload, args.timeout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
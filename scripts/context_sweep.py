@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""Context-length sweep: prefill throughput, memory and latency against ``num_ctx``.
+
+For every model of the selected profile and every ``num_ctx`` in the sweep
+the engine sends one synthetic recall prompt (labelled sections with secret
+keys, as ``eval-context.ps1`` uses) sized to fill ``CONTEXT_FILL`` of the
+context, and records Ollama's ``load_duration``, prefill rate, total latency,
+resident memory from ``/api/ps`` and whether the model recalled the key::
+
+    python scripts/context_sweep.py --safe --cpu-only --num-ctx 2048,4096,8192 --write-report
+
+Prompt sizes are exact in model tokens rather than characters: two small
+probes per model fit ``prompt_eval_count = overhead + per_unit * filler`` and
+every measured run refines the fit (:class:`TokenCalibration`).  Each prompt
+starts with a random nonce so Ollama's prompt cache cannot shortcut prefill.
+
+Between runs the engine waits in proportion to the ``load_duration`` it just
+observed (capped by ``--inter-run-delay``, or ``--gpu-cooldown`` when the next
+run moves to another GPU) instead of sleeping a fixed time; runs that found
+the model warm continue immediately, but a GPU switch always waits at least
+``GPU_SWITCH_MIN_COOLDOWN``.  The report names, per model and
+device, the largest context whose latency stayed within ``--target-latency``.
+
+``--list-profiles`` prints the built-in profiles (the PowerShell wrapper's
+``-ListProfiles`` calls it).  ``--plan-only`` prints and reports the plan without contacting Ollama, so CI
+can exercise the pipeline without models.  The exit code is 1 when a run
+failed or the model did not recall its key, as with the PowerShell sweep.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Sequence, Tuple
+
+from chain_router import loaded_models
+from http_pool import HttpError
+from ollama_api import DEFAULT_BASE_URL, StageRequest, send_request
+from provenance import Gpu, gpu_inventory
+from settings import REPO_ROOT, read_env_file, resolve_repo_path, resolve_setting
+from stats import rate
+
+DEFAULT_PROFILE = "baseline-cpu"
+DEFAULT_TARGET_LATENCY = 60.0
+CONTEXT_FILL = 0.75  # Share of num_ctx used by the prompt; the rest is left for the answer.
+COOLDOWN_FACTOR = 0.5  # Seconds of cooldown per second of observed model load.
+GPU_SWITCH_MIN_COOLDOWN = 5.0  # The previous GPU's clocks and memory settle even when its model was warm.
+MARKERS = 6
+FILLER_UNIT = " lorem"
+PROBE_UNITS = 256
+NUM_PREDICT = 24
+
+
+@dataclass(frozen=True)
+class ProfileEntry:
+    model: str
+    tokens_default: int
+    tokens_safe: int
+    timeout_default: float
+    timeout_safe: float
+    contexts: Tuple[int, ...]
+
+
+PROFILES: Dict[str, Tuple[ProfileEntry, ...]] = {
+    "baseline-cpu": (
+        ProfileEntry(
+            model="baseline",
+            tokens_default=4000,
+            tokens_safe=3000,
+            timeout_default=180,
+            timeout_safe=150,
+            contexts=(2048, 4096, 8192),
+        ),
+    ),
+}
+
+
+@dataclass
+class Cell:
+    """One planned run of the sweep."""
+
+    model: str
+    num_ctx: int
+    tokens: int
+    timeout: float
+    device: str
+    options: Dict[str, Any]
+    gpu: Gpu | None = None
+
+
+def parse_contexts(raw: str) -> List[int]:
+    try:
+        contexts = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid num_ctx list {raw!r}") from exc
+    if not contexts or any(value < 256 for value in contexts):
+        raise argparse.ArgumentTypeError("num_ctx values must be at least 256")
+    return sorted(set(contexts))
+
+
+def build_plan(
+    entries: Sequence[ProfileEntry], safe: bool, gpus: Sequence[Gpu], contexts: Sequence[int] | None = None
+) -> List[Cell]:
+    """Expand profile entries into cells: per device, per model, ascending ``num_ctx``."""
+
+    devices: List[Gpu | None] = list(gpus) or [None]
+    plan: List[Cell] = []
+    for gpu in devices:
+        for entry in entries:
+            limit = entry.tokens_safe if safe else entry.tokens_default
+            timeout = entry.timeout_safe if safe else entry.timeout_default
+            for num_ctx in contexts or entry.contexts:
+                options: Dict[str, Any] = {"num_ctx": num_ctx, "num_predict": NUM_PREDICT, "temperature": 0}
+                if gpu is None:
+                    options["num_gpu"] = 0
+                    device = "CPU"
+                else:
+                    options.update(num_gpu=1, main_gpu=gpu.index)
+                    device = f"GPU {gpu.index}"
+                tokens = min(int(num_ctx * CONTEXT_FILL), limit)
+                plan.append(Cell(entry.model, num_ctx, tokens, timeout, device, options, gpu))
+    return plan
+
+
+class TokenCalibration:
+    """Linear fit of ``prompt_eval_count`` against the number of filler units in a prompt."""
+
+    def __init__(self, overhead: float = 64.0, per_unit: float = 1.0) -> None:
+        self.overhead = overhead
+        self.per_unit = per_unit
+        self.points: List[Tuple[int, int]] = []
+
+    @property
+    def calibrated(self) -> bool:
+        return len({units for units, _ in self.points}) >= 2
+
+    def observe(self, units: int, tokens: int) -> None:
+        self.points.append((units, tokens))
+        xs = [float(units) for units, _ in self.points]
+        ys = [float(tokens) for _, tokens in self.points]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        spread = sum((x - mean_x) ** 2 for x in xs)
+        if spread > 0:
+            self.per_unit = max(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread, 1e-6)
+        self.overhead = mean_y - self.per_unit * mean_x
+
+    def units_for(self, tokens: int) -> int:
+        return max(round((tokens - self.overhead) / self.per_unit), 0)
+
+
+@dataclass
+class RecallPrompt:
+    text: str
+    expected: str
+    units: int
+
+
+def recall_prompt(units: int, rng: random.Random, markers: int = MARKERS) -> RecallPrompt:
+    """Labelled sections with secret keys, ``units`` filler units spread between them, and a question."""
+
+    alphabet = string.ascii_letters + string.digits
+    keys = ["".join(rng.choices(alphabet, k=12)) for _ in range(markers)]
+    asked = rng.randrange(markers)
+    nonce = "".join(rng.choices(alphabet, k=16))
+    lines = [
+        f"Run {nonce}. You will be given {markers} labeled sections [S1..S{markers}]. Each section contains a secret "
+        "KEY: <XXXX>. Later you will be asked for one key by label. Reply only with the exact key string (no extra text)."
+    ]
+    for index, key in enumerate(keys):
+        share = units // markers + (1 if index < units % markers else 0)
+        lines.append(f"[S{index + 1}] KEY: <{key}>{FILLER_UNIT * share}")
+    lines.append(f"Question: What is the KEY in [S{asked + 1}]? Answer with only the key.")
+    return RecallPrompt("\n".join(lines), keys[asked], units)
+
+
+def normalise_answer(answer: str) -> str:
+    text = answer.strip()
+    if text.startswith("<") and text.endswith(">") and len(text) > 2:
+        text = text[1:-1].strip()
+    return text
+
+
+def generate(base_url: str, model: str, prompt: str, options: Mapping[str, Any], timeout: float) -> Dict[str, Any]:
+    return send_request(StageRequest(model, base_url, prompt=prompt, options=dict(options)), timeout)
+
+
+def resident_memory(base_url: str, model: str) -> Tuple[int | None, int | None]:
+    """Return ``(size, size_vram)`` in bytes of ``model`` as reported by ``/api/ps``."""
+
+    names = {model, f"{model}:latest"}
+    for entry in loaded_models(base_url, 5) or []:
+        if entry.get("name") in names or entry.get("model") in names:
+            return entry.get("size"), entry.get("size_vram")
+    return None, None
+
+
+@dataclass
+class CellResult:
+    model: str
+    num_ctx: int
+    target_tokens: int
+    device: str
+    status: str  # "ok", "error" or "plan-only"
+    prompt_tokens: int | None = None
+    latency_s: float | None = None
+    load_s: float | None = None
+    prefill_tps: float | None = None
+    memory_bytes: int | None = None
+    vram_bytes: int | None = None
+    recall: bool | None = None
+    cooldown_s: float = 0.0
+    notes: str = ""
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "error" or self.recall is False
+
+
+def run_cell(
+    base_url: str, cell: Cell, calibration: TokenCalibration, rng: random.Random
+) -> CellResult:
+    prompt = recall_prompt(calibration.units_for(cell.tokens), rng)
+    started = time.perf_counter()
+    try:
+        payload = generate(base_url, cell.model, prompt.text, cell.options, cell.timeout)
+    except (HttpError, RuntimeError, OSError, ValueError) as exc:
+        return CellResult(cell.model, cell.num_ctx, cell.tokens, cell.device, "error", notes=str(exc))
+    latency = time.perf_counter() - started
+    if "error" in payload:
+        return CellResult(cell.model, cell.num_ctx, cell.tokens, cell.device, "error", latency_s=latency, notes=str(payload["error"]))
+    prompt_tokens = payload.get("prompt_eval_count")
+    if isinstance(prompt_tokens, int):
+        calibration.observe(prompt.units, prompt_tokens)
+    answer = normalise_answer(str(payload.get("response") or ""))
+    memory, vram = resident_memory(base_url, cell.model)
+    load_ns = payload.get("load_duration")
+    return CellResult(
+        cell.model,
+        cell.num_ctx,
+        cell.tokens,
+        cell.device,
+        "ok",
+        prompt_tokens=prompt_tokens if isinstance(prompt_tokens, int) else None,
+        latency_s=latency,
+        load_s=load_ns / 1e9 if isinstance(load_ns, (int, float)) else None,
+        prefill_tps=rate(prompt_tokens, payload.get("prompt_eval_duration")),
+        memory_bytes=memory,
+        vram_bytes=vram,
+        recall=answer == prompt.expected,
+        notes="" if answer == prompt.expected else f"expected {prompt.expected}, got {answer[:40]!r}",
+    )
+
+
+def calibrate(base_url: str, cell: Cell, calibration: TokenCalibration, rng: random.Random) -> None:
+    """Fit the token model for ``cell.model`` with two short probes (the first also loads the model)."""
+
+    options = dict(cell.options, num_predict=1)
+    for units in (0, PROBE_UNITS):
+        prompt = recall_prompt(units, rng)
+        try:
+            payload = generate(base_url, cell.model, prompt.text, options, cell.timeout)
+        except (HttpError, RuntimeError, OSError, ValueError):
+            return
+        count = payload.get("prompt_eval_count")
+        if isinstance(count, int):
+            calibration.observe(units, count)
+
+
+def cooldown_seconds(load_s: float | None, cap: float, minimum: float = 0.0) -> float:
+    """Wait in proportion to the model load just observed, at least ``minimum``; warm runs need no pause."""
+
+    if cap <= 0:
+        return 0.0
+    return min(cap, max(minimum, COOLDOWN_FACTOR * (load_s or 0.0)))
+
+
+def run_sweep(
+    base_url: str,
+    plan: Sequence[Cell],
+    plan_only: bool,
+    inter_run_delay: float,
+    gpu_cooldown: float,
+    rng: random.Random,
+    sleep: Callable[[float], None] = time.sleep,
+) -> List[CellResult]:
+    results: List[CellResult] = []
+    calibrations: Dict[str, TokenCalibration] = {}
+    for position, cell in enumerate(plan):
+        print(f"Testing {cell.model} @ num_ctx {cell.num_ctx}, {cell.tokens} prompt tokens (timeout {cell.timeout:.0f}s) [{cell.device}]")
+        if plan_only:
+            results.append(
+                CellResult(cell.model, cell.num_ctx, cell.tokens, cell.device, "plan-only", notes="plan-only execution (no Ollama call)")
+            )
+            continue
+        calibration = calibrations.get(cell.model)
+        if calibration is None:
+            calibration = calibrations[cell.model] = TokenCalibration()
+            calibrate(base_url, cell, calibration, rng)
+        result = run_cell(base_url, cell, calibration, rng)
+        upcoming = plan[position + 1] if position + 1 < len(plan) else None
+        if upcoming is not None:
+            switching_gpu = upcoming.gpu is not None and cell.gpu is not None and upcoming.gpu.index != cell.gpu.index
+            if switching_gpu:
+                result.cooldown_s = cooldown_seconds(result.load_s, gpu_cooldown, GPU_SWITCH_MIN_COOLDOWN)
+            else:
+                result.cooldown_s = cooldown_seconds(result.load_s, inter_run_delay)
+        results.append(result)
+        print(f"  {describe(result)}")
+        if result.cooldown_s > 0:
+            sleep(result.cooldown_s)
+    return results
+
+
+def describe(result: CellResult) -> str:
+    if result.status != "ok":
+        return f"{result.status}: {result.notes}"
+    prefill = "n/a" if result.prefill_tps is None else f"{result.prefill_tps:.0f} tok/s"
+    return (
+        f"{result.prompt_tokens} tokens, latency {result.latency_s:.2f}s, load {result.load_s or 0:.2f}s, "
+        f"prefill {prefill}, recall {'ok' if result.recall else 'missed'}, cooldown {result.cooldown_s:.1f}s"
+    )
+
+
+def largest_within(results: Sequence[CellResult], target_latency: float) -> Dict[Tuple[str, str], CellResult | None]:
+    """Per ``(model, device)``, the largest ``num_ctx`` that answered within ``target_latency`` seconds."""
+
+    best: Dict[Tuple[str, str], CellResult | None] = {}
+    for result in results:
+        key = (result.model, result.device)
+        best.setdefault(key, None)
+        if result.status != "ok" or result.latency_s is None or result.latency_s > target_latency:
+            continue
+        current = best[key]
+        if current is None or result.num_ctx > current.num_ctx:
+            best[key] = result
+    return best
+
+
+def _cell(value: float | int | None, digits: int = 2, scale: float = 1.0) -> str:
+    return "n/a" if value is None else f"{value / scale:.{digits}f}"
+
+
+def format_table(results: Sequence[CellResult], profile: str) -> List[str]:
+    lines = [
+        "| Model | num_ctx | Tokens (target/actual) | OK | Latency (s) | Load (s) | Prefill tok/s | Memory (GiB) | Device | Profile | Notes |",
+        "|-------|---------|------------------------|----|-------------|----------|---------------|--------------|--------|---------|-------|",
+    ]
+    for result in results:
+        ok = "plan-only" if result.status == "plan-only" else str(not result.failed)
+        lines.append(
+            f"| {result.model} | {result.num_ctx} | {result.target_tokens}/{result.prompt_tokens or 'n/a'} | {ok} | "
+            f"{_cell(result.latency_s)} | {_cell(result.load_s)} | {_cell(result.prefill_tps, 0)} | "
+            f"{_cell(result.memory_bytes, 2, 1024 ** 3)} | {result.device} | {profile} | {result.notes} |"
+        )
+    return lines
+
+
+def format_verdicts(results: Sequence[CellResult], target_latency: float) -> List[str]:
+    lines = []
+    for (model, device), result in largest_within(results, target_latency).items():
+        if result is None:
+            lines.append(f"- {model} [{device}]: no context answered within {target_latency:.1f}s")
+        else:
+            lines.append(
+                f"- {model} [{device}]: largest context within {target_latency:.1f}s is num_ctx {result.num_ctx} "
+                f"({result.latency_s:.2f}s)"
+            )
+    return lines
+
+
+def write_report(
+    results: Sequence[CellResult], profile: str, target_latency: float, plan_only: bool, directory: Path
+) -> Path:
+    """Write ``CONTEXT_RESULTS_<timestamp>.md`` plus the raw results as JSON next to it."""
+
+    stamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+    directory.mkdir(parents=True, exist_ok=True)
+    report_path = directory / f"CONTEXT_RESULTS_{stamp}.md"
+    markdown = [f"# Context Sweep Results ({stamp})", "", *format_table(results, profile)]
+    if not plan_only:
+        markdown += ["", f"## Largest context within {target_latency:.1f}s", "", *format_verdicts(results, target_latency)]
+    report_path.write_text("\n".join(markdown) + "\n", encoding="utf-8")
+    summary = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "profile": profile,
+        "plan_only": plan_only,
+        "target_latency_s": target_latency,
+        "results": [asdict(result) for result in results],
+    }
+    report_path.with_suffix(".json").write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    return report_path
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sweep num_ctx and measure prefill, memory and latency per context size.")
+    parser.add_argument("--profile", help=f"Sweep profile (default: CONTEXT_SWEEP_PROFILE or {DEFAULT_PROFILE}).")
+    parser.add_argument("--list-profiles", action="store_true", help="Print the built-in profiles and exit.")
+    parser.add_argument("--safe", action="store_true", help="Use the profile's smaller token budgets and timeouts.")
+    parser.add_argument("--cpu-only", action="store_true", help="Run on the CPU even when NVIDIA GPUs are present.")
+    parser.add_argument("--plan-only", action="store_true", help="Print and report the plan without contacting Ollama.")
+    parser.add_argument("--num-ctx", type=parse_contexts, help="Comma-separated num_ctx values (default: the profile's).")
+    parser.add_argument(
+        "--target-latency",
+        type=float,
+        help=f"Latency budget in seconds for the largest-context verdict (default: CONTEXT_SWEEP_TARGET_LATENCY or {DEFAULT_TARGET_LATENCY:.0f}).",
+    )
+    parser.add_argument(
+        "--inter-run-delay",
+        type=float,
+        default=5.0,
+        help="Longest cooldown after a run that loaded the model (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--gpu-cooldown",
+        type=float,
+        default=15.0,
+        help=f"Longest cooldown before moving to another GPU, at least {GPU_SWITCH_MIN_COOLDOWN:g}s unless 0 (default: %(default)s).",
+    )
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Ollama endpoint (default: %(default)s).")
+    parser.add_argument("--write-report", action="store_true", help="Write docs/CONTEXT_RESULTS_<timestamp>.md (and .json).")
+    parser.add_argument("--report-dir", default="docs", help="Directory for --write-report (default: %(default)s).")
+    parser.add_argument("--seed", type=int, help="Seed for keys and nonces, for reproducible prompts.")
+    parser.add_argument(
+        "--env-file",
+        type=Path,
+        default=REPO_ROOT / ".env",
+        help="Environment file consulted for unset settings (default: repository .env).",
+    )
+    return parser.parse_args(argv)
+
+
+def format_profiles() -> List[str]:
+    lines = []
+    for name in sorted(PROFILES):
+        default = " (default)" if name == DEFAULT_PROFILE else ""
+        lines.append(f"{name}{default}")
+        for entry in PROFILES[name]:
+            contexts = ",".join(str(value) for value in entry.contexts)
+            lines.append(f"  {entry.model}: num_ctx {contexts}; {entry.tokens_default} tokens ({entry.tokens_safe} with --safe)")
+    return lines
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.list_profiles:
+        print("\n".join(format_profiles()))
+        return 0
+    env_file = read_env_file(args.env_file)
+    profile = resolve_setting(args.profile, "CONTEXT_SWEEP_PROFILE", env_file) or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        print(f"Error: unknown profile '{profile}'. Available profiles: {', '.join(sorted(PROFILES))}", file=sys.stderr)
+        return 1
+    target = args.target_latency
+    if target is None:
+        target = float(resolve_setting(None, "CONTEXT_SWEEP_TARGET_LATENCY", env_file) or DEFAULT_TARGET_LATENCY)
+
+    gpus: List[Gpu] = []
+    if not args.cpu_only:
+        gpus = gpu_inventory()
+        if gpus:
+            print("Detected {} GPU(s): {}".format(len(gpus), "; ".join(f"[{gpu.index}] {gpu.name}" for gpu in gpus)))
+        else:
+            print("Warning: no NVIDIA GPUs detected. Falling back to CPU-only execution.", file=sys.stderr)
+    print(f"Context sweep profile: {profile} (safe mode: {args.safe}; cpu only: {not gpus})")
+    if args.plan_only:
+        print("Warning: plan-only mode enabled; skipping Ollama evaluation and recording the test plan only.", file=sys.stderr)
+
+    plan = build_plan(PROFILES[profile], args.safe, gpus, args.num_ctx)
+    rng = random.Random(args.seed)
+    results = run_sweep(args.base_url.rstrip("/"), plan, args.plan_only, args.inter_run_delay, args.gpu_cooldown, rng)
+
+    print()
+    print("\n".join(format_table(results, profile)))
+    if not args.plan_only:
+        print()
+        print("\n".join(format_verdicts(results, target)))
+    if args.write_report:
+        report_path = write_report(results, profile, target, args.plan_only, resolve_repo_path(args.report_dir))
+        print(f"Wrote report: {report_path}")
+    return 1 if any(result.failed for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""Indexed store of benchmark evidence with cross-run regression checks.
+
+``bench_ollama.py`` and ``load_ollama.py`` leave one directory per run below
+``$EVIDENCE_ROOT/benchmarks``; comparing tok/s across many runs would mean
+re-reading every ``summary.json``.  This module ingests those files
+incrementally (a run is only re-read when its ``summary.json`` changed) into a
+single SQLite file, ``$EVIDENCE_ROOT/index.sqlite3``:
+
+* ``runs`` – one row per run, keyed by model, host fingerprint, Modelfile
+  parameters and git commit (recorded by the benchmarks as ``provenance``;
+  older runs are indexed with an unknown host and commit);
+* ``aggregates`` – per concurrency level (bench) or offered rate (load):
+  p50 decode and prefill tok/s, p50/p95 latency, p95 TTFT and request rate;
+* ``samples`` – the individual requests, which ``prune`` drops while keeping
+  the run and its aggregates, so trends survive clean-ups.
+
+A series is one model on one host with one set of Modelfile parameters at one
+level.  ``check`` compares the newest run of every series with the median of
+the runs before it and exits 1 when decode or prefill throughput dropped, or
+p95 latency rose, by more than ``--threshold`` percent::
+
+    python scripts/evidence_store.py ingest
+    python scripts/evidence_store.py trend --model llama3.1 --level 1
+    python scripts/evidence_store.py check --threshold 10 --window 5
+    python scripts/evidence_store.py prune --keep 5 --delete-files
+
+``runs``, ``trend`` and ``check`` ingest new evidence first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from settings import DEFAULT_EVIDENCE_ROOT, REPO_ROOT, read_env_file, resolve_repo_path, resolve_setting
+from stats import distribution, median, rate
+
+DB_NAME = "index.sqlite3"
+UNKNOWN = "unknown"
+RUN_NAME = re.compile(r"^(bench|load)-.+-(\d{8}-\d{6})$")
+# metric -> (column, True when higher is better)
+METRICS: Dict[str, Tuple[str, bool]] = {
+    "decode_tps": ("decode_tps", True),
+    "prefill_tps": ("prefill_tps", True),
+    "latency_p95": ("latency_p95", False),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    host TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    git_commit TEXT,
+    generated_at TEXT NOT NULL,
+    started REAL NOT NULL,
+    ingested REAL NOT NULL,
+    pruned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_series ON runs (kind, model, host, params_key, started);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    facts TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    level REAL NOT NULL,
+    requests INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    decode_tps REAL,
+    prefill_tps REAL,
+    latency_p50 REAL,
+    latency_p95 REAL,
+    ttft_p95 REAL,
+    throughput_rps REAL,
+    PRIMARY KEY (run_id, level)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    level REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    wall_s REAL,
+    ttft_s REAL,
+    prefill_tps REAL,
+    decode_tps REAL
+);
+CREATE INDEX IF NOT EXISTS samples_run ON samples (run_id);
+"""
+
+
+def parameters_key(parameters: Mapping[str, Any]) -> str:
+    if not parameters:
+        return "-"
+    return hashlib.sha256(json.dumps(parameters, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class Level:
+    level: float
+    requests: int
+    errors: int
+    decode_tps: float | None = None
+    prefill_tps: float | None = None
+    latency_p50: float | None = None
+    latency_p95: float | None = None
+    ttft_p95: float | None = None
+    throughput_rps: float | None = None
+    # (ok, wall_s, ttft_s, prefill_tps, decode_tps)
+    samples: List[Tuple[bool, float | None, float | None, float | None, float | None]] = field(default_factory=list)
+
+
+@dataclass
+class ParsedRun:
+    kind: str
+    model: str
+    generated_at: str
+    started: float
+    provenance: Dict[str, Any]
+    levels: List[Level]
+
+
+def _pick(summary: Mapping[str, Any] | None, key: str) -> float | None:
+    return summary.get(key) if summary else None
+
+
+def _started(run_dir: Path, generated_at: Any, fallback: float) -> Tuple[str, float]:
+    if isinstance(generated_at, str):
+        try:
+            stamp = datetime.fromisoformat(generated_at)
+        except ValueError:
+            pass
+        else:
+            if stamp.tzinfo is None:
+                stamp = stamp.replace(tzinfo=timezone.utc)
+            return generated_at, stamp.timestamp()
+    match = RUN_NAME.match(run_dir.name)
+    if match:
+        stamp = datetime.strptime(match.group(2), "%Y%m%d-%H%M%S")
+        return stamp.isoformat(timespec="seconds"), stamp.timestamp()
+    return datetime.fromtimestamp(fallback, timezone.utc).isoformat(timespec="seconds"), fallback
+
+
+def parse_run(summary_path: Path) -> ParsedRun | None:
+    """Read one run's ``summary.json``; ``None`` when it is not benchmark evidence.
+
+    Understands ``bench_ollama.py`` (``levels``), ``load_ollama.py`` (``steps``)
+    and the earlier PowerShell benchmark (``results``, one request at a time).
+    """
+
+    report = json.loads(summary_path.read_text(encoding="utf-8-sig"))
+    if not isinstance(report, dict) or not report.get("model"):
+        return None
+    generated_at, started = _started(summary_path.parent, report.get("generated_at"), summary_path.stat().st_mtime)
+    levels: List[Level] = []
+    if isinstance(report.get("levels"), list):
+        kind = "bench"
+        for entry in report["levels"]:
+            levels.append(
+                Level(
+                    level=float(entry["concurrency"]),
+                    requests=int(entry.get("requests") or 0),
+                    errors=int(entry.get("errors") or 0),
+                    decode_tps=_pick(entry.get("decode_tps"), "p50"),
+                    prefill_tps=_pick(entry.get("prefill_tps"), "p50"),
+                    latency_p50=_pick(entry.get("latency_s"), "p50"),
+                    latency_p95=_pick(entry.get("latency_s"), "p95"),
+                    ttft_p95=_pick(entry.get("ttft_s"), "p95"),
+                    throughput_rps=entry.get("throughput_rps"),
+                    samples=[
+                        (bool(s.get("ok")), s.get("wall_s"), s.get("ttft_s"), s.get("prefill_tps"), s.get("decode_tps"))
+                        for s in entry.get("samples") or []
+                    ],
+                )
+            )
+    elif isinstance(report.get("steps"), list):
+        kind = "load"
+        for entry in report["steps"]:
+            levels.append(
+                Level(
+                    level=float(entry["offered_rps"]),
+                    requests=int(entry.get("sent") or 0),
+                    errors=int(entry.get("errors") or 0),
+                    latency_p50=_pick(entry.get("latency_s"), "p50"),
+                    latency_p95=_pick(entry.get("latency_s"), "p95"),
+                    ttft_p95=_pick(entry.get("ttft_s"), "p95"),
+                    throughput_rps=entry.get("achieved_rps"),
+                )
+            )
+    elif isinstance(report.get("results"), list):
+        kind = "bench"
+        samples = [
+            (
+                result.get("ExitCode") == 0,
+                result["WallMs"] / 1000 if isinstance(result.get("WallMs"), (int, float)) else None,
+                None,
+                rate(result.get("PromptEvalCount"), result.get("PromptEvalDurationNs")),
+                rate(result.get("EvalCount"), result.get("EvalDurationNs")),
+            )
+            for result in report["results"]
+            if isinstance(result, dict)
+        ]
+        ok = [sample for sample in samples if sample[0]]
+        latency = distribution([sample[1] for sample in ok if sample[1] is not None])
+        levels.append(
+            Level(
+                level=1.0,
+                requests=len(samples),
+                errors=len(samples) - len(ok),
+                decode_tps=_pick(distribution([sample[4] for sample in ok if sample[4] is not None]), "p50"),
+                prefill_tps=_pick(distribution([sample[3] for sample in ok if sample[3] is not None]), "p50"),
+                latency_p50=_pick(latency, "p50"),
+                latency_p95=_pick(latency, "p95"),
+                samples=samples,
+            )
+        )
+    else:
+        return None
+    return ParsedRun(kind, str(report["model"]), generated_at, started, dict(report.get("provenance") or {}), levels)
+
+
+def discover(evidence_root: Path) -> Iterable[Path]:
+    yield from sorted((evidence_root / "benchmarks").glob("*/summary.json"))
+
+
+@dataclass
+class IngestResult:
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        text = f"Indexed {self.added} new and {self.updated} changed run(s); {self.unchanged} unchanged"
+        return text + (f"; skipped {len(self.skipped)}: {', '.join(self.skipped)}" if self.skipped else "")
+
+
+@dataclass
+class Finding:
+    """The newest run of a series against its rolling baseline for one metric."""
+
+    model: str
+    host: str
+    params_key: str
+    level: float
+    metric: str
+    baseline: float
+    latest: float
+    baseline_runs: int
+    commit: str | None
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        return (self.latest - self.baseline) / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        higher_is_better = METRICS[self.metric][1]
+        return self.change < -self.threshold if higher_is_better else self.change > self.threshold
+
+    def describe(self) -> str:
+        verdict = "REGRESSION" if self.regressed else "ok"
+        return (
+            f"{verdict:<10} {self.model} @ {self.host} params={self.params_key} level={self.level:g} {self.metric}: "
+            f"{self.latest:.3f} vs baseline {self.baseline:.3f} ({self.change * 100:+.1f}%, median of {self.baseline_runs}) "
+            f"commit={(self.commit or UNKNOWN)[:10]}"
+        )
+
+
+class EvidenceStore:
+    """SQLite index of benchmark runs below an evidence root."""
+
+    def __init__(self, evidence_root: Path, db_path: Path | None = None) -> None:
+        self.root = evidence_root
+        self.path = db_path or evidence_root / DB_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(SCHEMA)
+
+    def ingest(self) -> IngestResult:
+        result = IngestResult()
+        known = {path: (run_id, mtime) for run_id, path, mtime in self._db.execute("SELECT id, path, mtime_ns FROM runs")}
+        for summary_path in discover(self.root):
+            relative = summary_path.parent.relative_to(self.root).as_posix()
+            mtime = summary_path.stat().st_mtime_ns
+            previous = known.get(relative)
+            if previous and previous[1] == mtime:
+                result.unchanged += 1
+                continue
+            try:
+                parsed = parse_run(summary_path)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                result.skipped.append(f"{relative} ({exc})")
+                continue
+            if parsed is None:
+                result.skipped.append(relative)
+                continue
+            with self._db:
+                if previous:
+                    self._db.execute("DELETE FROM runs WHERE id = ?", (previous[0],))
+                self._insert(relative, mtime, parsed)
+            if previous:
+                result.updated += 1
+            else:
+                result.added += 1
+        return result
+
+    def _insert(self, relative: str, mtime: int, run: ParsedRun) -> None:
+        origin = run.provenance
+        host = origin.get("host") or UNKNOWN
+        parameters = origin.get("parameters") or {}
+        if origin.get("host_facts"):
+            self._db.execute(
+                "INSERT OR REPLACE INTO hosts (host, facts) VALUES (?, ?)", (host, json.dumps(origin["host_facts"], sort_keys=True))
+            )
+        run_id = self._db.execute(
+            "INSERT INTO runs (path, mtime_ns, kind, model, host, params_key, params, git_commit, generated_at, started, ingested) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                relative,
+                mtime,
+                run.kind,
+                run.model,
+                host,
+                parameters_key(parameters),
+                json.dumps(parameters, sort_keys=True),
+                origin.get("git_commit"),
+                run.generated_at,
+                run.started,
+                time.time(),
+            ),
+        ).lastrowid
+        for level in run.levels:
+            self._db.execute(
+                "INSERT OR REPLACE INTO aggregates (run_id, level, requests, errors, decode_tps, prefill_tps, latency_p50, "
+                "latency_p95, ttft_p95, throughput_rps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    level.level,
+                    level.requests,
+                    level.errors,
+                    level.decode_tps,
+                    level.prefill_tps,
+                    level.latency_p50,
+                    level.latency_p95,
+                    level.ttft_p95,
+                    level.throughput_rps,
+                ),
+            )
+            self._db.executemany(
+                "INSERT INTO samples (run_id, level, ok, wall_s, ttft_s, prefill_tps, decode_tps) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, level.level, int(sample[0]), *sample[1:]) for sample in level.samples],
+            )
+
+    def runs(self, model: str | None = None, host: str | None = None, limit: int | None = None) -> List[sqlite3.Row]:
+        where, params = _filters(model=model, host=host)
+        query = (
+            "SELECT r.*, (SELECT COUNT(*) FROM samples s WHERE s.run_id = r.id) AS sample_count FROM runs r"
+            f"{where} ORDER BY started DESC" + (" LIMIT ?" if limit else "")
+        )
+        return self._query(query, [*params, *([limit] if limit else [])])
+
+    def trend(
+        self, model: str, kind: str = "bench", level: float | None = None, host: str | None = None, limit: int | None = None
+    ) -> List[sqlite3.Row]:
+        """Aggregates of ``model`` over time, oldest first (the newest ``limit`` runs)."""
+
+        where, params = _filters(model=model, host=host, kind=kind, level=level)
+        query = (
+            "SELECT * FROM (SELECT r.generated_at, r.started, r.git_commit, r.host, r.params_key, r.pruned, a.* "
+            f"FROM runs r JOIN aggregates a ON a.run_id = r.id{where} ORDER BY r.started DESC, a.level"
+            + (" LIMIT ?" if limit else "")
+            + ") ORDER BY started, level"
+        )
+        return self._query(query, [*params, *([limit] if limit else [])])
+
+    def check(
+        self, threshold: float, window: int, min_baseline: int, model: str | None = None, host: str | None = None
+    ) -> List[Finding]:
+        """Compare the newest run of every series with the median of up to ``window`` runs before it."""
+
+        where, params = _filters(model=model, host=host)
+        rows = self._query(
+            "SELECT r.kind, r.model, r.host, r.params_key, r.git_commit, r.started, a.* FROM runs r "
+            f"JOIN aggregates a ON a.run_id = r.id{where} ORDER BY r.started DESC",
+            params,
+        )
+        series: Dict[Tuple[str, str, str, str, float], List[sqlite3.Row]] = {}
+        for row in rows:
+            series.setdefault((row["kind"], row["model"], row["host"], row["params_key"], row["level"]), []).append(row)
+        findings: List[Finding] = []
+        for (_, model_name, host_name, params_key, level), history in sorted(series.items()):
+            latest, earlier = history[0], history[1 : 1 + window]
+            for metric, (column, _) in METRICS.items():
+                values = [row[column] for row in earlier if row[column] is not None]
+                if latest[column] is None or len(values) < min_baseline:
+                    continue
+                baseline = median(values)
+                if not baseline:
+                    continue
+                findings.append(
+                    Finding(
+                        model_name, host_name, params_key, level, metric, baseline, latest[column], len(values),
+                        latest["git_commit"], threshold,
+                    )
+                )
+        return findings
+
+    def prune(self, keep: int, older_than: float | None = None, delete_files: bool = False) -> Tuple[int, int]:
+        """Drop the samples (and optionally the run directories) of all but the newest ``keep`` runs per series.
+
+        Runs and their aggregates stay, so trends and baselines are unaffected.
+        Returns the number of runs pruned and directories removed.
+        """
+
+        rows = self._query("SELECT id, path, kind, model, host, params_key, started FROM runs WHERE pruned = 0 ORDER BY started DESC")
+        seen: Dict[Tuple[str, str, str, str], int] = {}
+        victims: List[sqlite3.Row] = []
+        for row in rows:
+            key = (row["kind"], row["model"], row["host"], row["params_key"])
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > keep and (older_than is None or row["started"] < older_than):
+                victims.append(row)
+        removed = 0
+        with self._db:
+            for row in victims:
+                self._db.execute("DELETE FROM samples WHERE run_id = ?", (row["id"],))
+                self._db.execute("UPDATE runs SET pruned = 1 WHERE id = ?", (row["id"],))
+        if delete_files:
+            for row in victims:
+                run_dir = self.root / row["path"]
+                if run_dir.is_dir():
+                    shutil.rmtree(run_dir)
+                    removed += 1
+        if victims:
+            self._db.execute("VACUUM")
+        return len(victims), removed
+
+    def host_label(self, host: str) -> str:
+        row = self._db.execute("SELECT facts FROM hosts WHERE host = ?", (host,)).fetchone()
+        node = json.loads(row[0]).get("node") if row else None
+        return f"{host} ({node})" if node else host
+
+    def _query(self, query: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        self._db.row_factory = sqlite3.Row
+        try:
+            return list(self._db.execute(query, params))
+        finally:
+            self._db.row_factory = None
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _filters(**values: Any) -> Tuple[str, List[Any]]:
+    columns = {"model": "r.model", "host": "r.host", "kind": "r.kind", "level": "a.level"}
+    clauses = [f"{columns[name]} = ?" for name, value in values.items() if value is not None]
+    params = [value for value in values.values() if value is not None]
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+def _cell(value: float | None, digits: int) -> str:
+    return "n/a" if value is None else f"{value:.{digits}f}"
+
+
+def format_trend(rows: Sequence[sqlite3.Row]) -> List[str]:
+    lines = [
+        "| Run | Commit | Host | Params | Level | Decode tok/s p50 | Prefill tok/s p50 | Latency p95 (s) | Δ decode |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    previous: Dict[Tuple[str, str, float], float] = {}
+    for row in rows:
+        key = (row["host"], row["params_key"], row["level"])
+        delta = "n/a"
+        if row["decode_tps"] is not None and previous.get(key):
+            delta = f"{(row['decode_tps'] - previous[key]) / previous[key] * 100:+.1f}%"
+        if row["decode_tps"] is not None:
+            previous[key] = row["decode_tps"]
+        lines.append(
+            f"| {row['generated_at']} | {(row['git_commit'] or UNKNOWN)[:10]} | {row['host']} | {row['params_key']} | "
+            f"{row['level']:g} | {_cell(row['decode_tps'], 1)} | {_cell(row['prefill_tps'], 1)} | "
+            f"{_cell(row['latency_p95'], 3)} | {delta} |"
+        )
+    return lines
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Index benchmark evidence in SQLite and detect regressions across runs.")
+    parser.add_argument("--root", help="Evidence directory (default: EVIDENCE_ROOT or docs/evidence).")
+    parser.add_argument("--db", type=Path, help=f"Index file (default: <root>/{DB_NAME}).")
+    parser.add_argument(
+        "--env-file",
+        type=Path,
+        default=REPO_ROOT / ".env",
+        help="Environment file consulted for unset settings (default: repository .env).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("ingest", help="Index new or changed runs.")
+    runs = subparsers.add_parser("runs", help="List indexed runs, newest first.")
+    runs.add_argument("--model")
+    runs.add_argument("--host", help="Host fingerprint.")
+    runs.add_argument("--limit", type=int, default=20)
+    trend = subparsers.add_parser("trend", help="Print a model's aggregates over time as a Markdown table.")
+    trend.add_argument("--model", required=True)
+    trend.add_argument("--kind", choices=("bench", "load"), default="bench")
+    trend.add_argument("--level", type=float, help="Only this concurrency level (bench) or offered rate (load).")
+    trend.add_argument("--host", help="Host fingerprint.")
+    trend.add_argument("--limit", type=int, help="Only the newest N rows.")
+    check = subparsers.add_parser("check", help="Exit 1 when the newest run regressed against its rolling baseline.")
+    check.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent (default: %(default)s).")
+    check.add_argument("--window", type=int, default=5, help="Earlier runs in the baseline median (default: %(default)s).")
+    check.add_argument(
+        "--min-baseline", type=int, default=3, help="Runs a series needs before it is checked (default: %(default)s)."
+    )
+    check.add_argument("--model")
+    check.add_argument("--host", help="Host fingerprint.")
+    prune = subparsers.add_parser("prune", help="Drop per-request samples of old runs; aggregates are kept.")
+    prune.add_argument("--keep", type=int, default=5, help="Runs per series that keep their samples (default: %(default)s).")
+    prune.add_argument("--older-than-days", type=float, help="Only prune runs older than this.")
+    prune.add_argument("--delete-files", action="store_true", help="Also delete the pruned run directories.")
+    args = parser.parse_args(argv)
+    if args.command == "check" and (args.threshold < 0 or args.window < 1 or args.min_baseline < 1):
+        parser.error("--threshold must be >= 0 and --window/--min-baseline at least 1")
+    if args.command == "prune" and args.keep < 0:
+        parser.error("--keep must be >= 0")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    env_file = read_env_file(args.env_file)
+    evidence_root = resolve_repo_path(resolve_setting(args.root, "EVIDENCE_ROOT", env_file) or DEFAULT_EVIDENCE_ROOT)
+    store = EvidenceStore(evidence_root, args.db)
+    try:
+        if args.command != "prune":
+            print(store.ingest().summary())
+        if args.command == "runs":
+            for row in store.runs(args.model, args.host, args.limit):
+                print(
+                    f"{row['generated_at']}  {row['kind']:<5} {row['model']:<24} host={store.host_label(row['host'])} "
+                    f"params={row['params_key']} commit={(row['git_commit'] or UNKNOWN)[:10]} "
+                    f"samples={row['sample_count']}{' (pruned)' if row['pruned'] else ''}  {row['path']}"
+                )
+        elif args.command == "trend":
+            rows = store.trend(args.model, args.kind, args.level, args.host, args.limit)
+            if not rows:
+                print(f"No {args.kind} runs indexed for {args.model}.")
+                return 1
+            print("\n".join(format_trend(rows)))
+        elif args.command == "check":
+            findings = store.check(args.threshold / 100, args.window, args.min_baseline, args.model, args.host)
+            if not findings:
+                print(f"No series has {args.min_baseline} earlier run(s) to compare against yet.")
+            for finding in findings:
+                print(finding.describe())
+            regressions = sum(finding.regressed for finding in findings)
+            print(f"{regressions} regression(s) beyond {args.threshold:g}% in {len(findings)} comparison(s).")
+            return 1 if regressions else 0
+        elif args.command == "prune":
+            cutoff = time.time() - args.older_than_days * 86400 if args.older_than_days is not None else None
+            pruned, removed = store.prune(args.keep, cutoff, args.delete_files)
+            print(f"Pruned samples of {pruned} run(s), removed {removed} run director{'y' if removed == 1 else 'ies'}; aggregates kept.")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Shared keep-alive HTTP client used by the Python helpers in ``scripts/``.
+
+``urllib.request.urlopen`` opens a fresh TCP connection for every call, so each
+chain step and every health poll pays a new handshake.  :class:`ConnectionPool`
+keeps idle ``http.client`` connections per ``scheme://host:port``, caps how many
+connections a single host may hold, and closes connections that sat idle for
+longer than ``idle_timeout`` seconds.  Most callers use the process-wide pool
+returned by :func:`default_pool`; CLIs that run more requests per host at
+once than :data:`DEFAULT_MAX_PER_HOST` size it first with
+:func:`configure_default_pool`.
+
+Run the module directly to compare per-request overhead against a local stub
+server::
+
+    python scripts/http_pool.py --requests 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_PER_HOST = 8
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+# Errors raised when a reused keep-alive socket turns out to be closed by the server.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+HostKey = Tuple[str, str, int]
+
+
+class HttpError(Exception):
+    """Base class for failures surfaced by :class:`ConnectionPool`."""
+
+
+class HttpStatusError(HttpError):
+    """The server answered with a status code of 400 or above."""
+
+    def __init__(self, url: str, status: int, reason: str, body: bytes) -> None:
+        super().__init__(f"{url} returned HTTP {status} {reason}".rstrip())
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+class HttpConnectionError(HttpError):
+    """The server could not be reached or dropped the connection."""
+
+    def __init__(self, url: str, reason: object) -> None:
+        super().__init__(f"Failed to reach {url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class RequestCancelled(HttpError):
+    """The request was aborted through its :class:`Cancellation`."""
+
+    def __init__(self, url: str, reason: str) -> None:
+        super().__init__(f"Request to {url} cancelled: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class Cancellation:
+    """Lets another thread abort an in-flight request.
+
+    Cancelling shuts the request's socket down, which wakes a reader blocked
+    on the response and tells the server (Ollama stops generating once the
+    client disconnects).  The connection is discarded, never reused.
+    """
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self.reason = ""
+        self._socket: socket.socket | None = None
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            self.reason = reason
+            sock = self._socket
+        if sock is not None:
+            _shutdown(sock)
+
+    def _attach(self, sock: socket.socket | None) -> bool:
+        """Register the socket in use; returns ``False`` if the request is already cancelled."""
+
+        with self._lock:
+            self._socket = sock
+            return not self.cancelled
+
+    def _detach(self) -> None:
+        with self._lock:
+            self._socket = None
+
+
+def _shutdown(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+@dataclass
+class Response:
+    """Fully buffered HTTP response."""
+
+    status: int
+    reason: str
+    headers: Mapping[str, str]
+    body: bytes
+
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+
+@dataclass
+class PoolStats:
+    created: int = 0
+    reused: int = 0
+    evicted: int = 0
+    discarded: int = 0
+
+
+def split_url(url: str) -> Tuple[HostKey, str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    if scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported URL scheme in {url!r}")
+    if not parts.hostname:
+        raise ValueError(f"URL is missing a host: {url!r}")
+    port = parts.port or (443 if scheme == "https" else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    return (scheme, parts.hostname, port), target
+
+
+class _KeepAliveConnection(http.client.HTTPConnection):
+    def connect(self) -> None:
+        super().connect()
+        # Headers and body go out in separate writes; Nagle would hold the second one back.
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _KeepAliveHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self) -> None:
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class _HostSlots:
+    """Idle connections and the concurrency limit for a single host."""
+
+    def __init__(self, limit: int) -> None:
+        self.idle: Deque[Tuple[http.client.HTTPConnection, float]] = deque()
+        self.limit = threading.BoundedSemaphore(limit)
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections keyed by scheme, host and port."""
+
+    def __init__(self, max_per_host: int = DEFAULT_MAX_PER_HOST, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.stats = PoolStats()
+        self._hosts: Dict[HostKey, _HostSlots] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _slots(self, key: HostKey) -> _HostSlots:
+        with self._lock:
+            slots = self._hosts.get(key)
+            if slots is None:
+                slots = self._hosts[key] = _HostSlots(self.max_per_host)
+            return slots
+
+    def _checkout(self, key: HostKey, slots: _HostSlots, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            while slots.idle:
+                conn, released_at = slots.idle.pop()
+                if now - released_at <= self.idle_timeout:
+                    self.stats.reused += 1
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    conn.timeout = timeout
+                    return conn, True
+                conn.close()
+                self.stats.evicted += 1
+            self.stats.created += 1
+        scheme, host, port = key
+        factory = _KeepAliveHTTPSConnection if scheme == "https" else _KeepAliveConnection
+        return factory(host, port, timeout=timeout), False
+
+    def _release(self, key: HostKey, conn: http.client.HTTPConnection) -> None:
+        slots = self._slots(key)
+        now = time.monotonic()
+        with self._lock:
+            slots.idle.append((conn, now))
+            while len(slots.idle) > self.max_per_host:
+                stale, _ = slots.idle.popleft()
+                stale.close()
+                self.stats.evicted += 1
+            sweep = now - self._last_sweep > self.idle_timeout
+            if sweep:
+                self._last_sweep = now
+        if sweep:
+            # Checkout only expires connections of the host it serves; this closes the other hosts' too.
+            self.evict_idle()
+
+    def _discard(self, conn: http.client.HTTPConnection) -> None:
+        conn.close()
+        with self._lock:
+            self.stats.discarded += 1
+
+    def evict_idle(self) -> int:
+        """Close every connection that exceeded ``idle_timeout``; return how many were closed."""
+
+        now = time.monotonic()
+        closed = 0
+        with self._lock:
+            for slots in self._hosts.values():
+                keep: Deque[Tuple[http.client.HTTPConnection, float]] = deque()
+                for conn, released_at in slots.idle:
+                    if now - released_at > self.idle_timeout:
+                        conn.close()
+                        closed += 1
+                    else:
+                        keep.append((conn, released_at))
+                slots.idle = keep
+            self.stats.evicted += closed
+        return closed
+
+    def close(self) -> None:
+        with self._lock:
+            for slots in self._hosts.values():
+                while slots.idle:
+                    conn, _ = slots.idle.pop()
+                    conn.close()
+            self._hosts.clear()
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: float = 30.0,
+        cancel: Cancellation | None = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Yield the raw response so callers can consume it incrementally.
+
+        The connection returns to the pool only when the body was read to the
+        end; responses abandoned early are closed so the server stops sending.
+        Status codes >= 400 raise :class:`HttpStatusError` before yielding.
+        Any failure after ``cancel`` fired surfaces as :class:`RequestCancelled`.
+        """
+
+        key, target = split_url(url)
+        slots = self._slots(key)
+        if not slots.limit.acquire(timeout=timeout):
+            raise HttpConnectionError(url, f"no free connection slot within {timeout}s")
+        try:
+            response, conn = self._send(key, slots, target, url, method, body, headers, timeout, cancel)
+            if response.status >= 400:
+                detail = response.read()
+                self._finish(key, conn, response)
+                raise HttpStatusError(url, response.status, response.reason, detail)
+            completed = False
+            try:
+                yield response
+                completed = True
+            except Exception as exc:
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelled(url, cancel.reason) from exc
+                raise
+            finally:
+                if cancel is not None:
+                    cancel._detach()
+                if completed and (cancel is None or not cancel.cancelled):
+                    self._finish(key, conn, response)
+                else:
+                    self._discard(conn)
+        finally:
+            slots.limit.release()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: float = 30.0,
+        cancel: Cancellation | None = None,
+    ) -> Response:
+        with self.stream(method, url, body=body, headers=headers, timeout=timeout, cancel=cancel) as response:
+            try:
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                raise HttpConnectionError(url, exc) from exc
+            return Response(response.status, response.reason, dict(response.getheaders()), payload)
+
+    def _send(
+        self,
+        key: HostKey,
+        slots: _HostSlots,
+        target: str,
+        url: str,
+        method: str,
+        body: Optional[bytes],
+        headers: Optional[Mapping[str, str]],
+        timeout: float,
+        cancel: Cancellation | None = None,
+    ) -> Tuple[http.client.HTTPResponse, http.client.HTTPConnection]:
+        while True:
+            conn, reused = self._checkout(key, slots, timeout)
+            try:
+                if cancel is not None:
+                    if conn.sock is None:
+                        conn.connect()
+                    if not cancel._attach(conn.sock):
+                        self._discard(conn)
+                        raise RequestCancelled(url, cancel.reason)
+                conn.request(method, target, body=body, headers=dict(headers or {}))
+                return conn.getresponse(), conn
+            except RequestCancelled:
+                raise
+            except (OSError, http.client.HTTPException) as exc:
+                self._discard(conn)
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelled(url, cancel.reason) from exc
+                if reused and isinstance(exc, STALE_CONNECTION_ERRORS):
+                    continue  # The server closed an idle keep-alive socket; retry on a fresh one.
+                raise HttpConnectionError(url, exc) from exc
+
+    def _finish(self, key: HostKey, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        if response.isclosed() and not response.will_close:
+            self._release(key, conn)
+        else:
+            self._discard(conn)
+
+
+_DEFAULT_POOL: ConnectionPool | None = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def default_pool() -> ConnectionPool:
+    """Return the process-wide pool shared by the chain and health-check helpers."""
+
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            _DEFAULT_POOL = ConnectionPool()
+        return _DEFAULT_POOL
+
+
+def configure_default_pool(max_per_host: int) -> ConnectionPool:
+    """Make sure the shared pool allows at least ``max_per_host`` concurrent requests per host.
+
+    A smaller pool is replaced (requests in flight finish on the old one), so
+    callers running ``--concurrency`` requests against one host never wait for
+    a connection slot behind long generations.
+    """
+
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None or _DEFAULT_POOL.max_per_host < max_per_host:
+            previous = _DEFAULT_POOL
+            _DEFAULT_POOL = ConnectionPool(max_per_host=max(max_per_host, DEFAULT_MAX_PER_HOST))
+            if previous is not None:
+                previous.close()
+        return _DEFAULT_POOL
+
+
+def run_benchmark(requests_count: int) -> Dict[str, float]:
+    """Time ``requests_count`` GETs with ``urlopen`` and with the pool against a local stub."""
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib import request as urllib_request
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler.
+            return
+
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming.
+            body = b'{"status":"ok"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/version"
+    pool = ConnectionPool()
+    try:
+        started = time.perf_counter()
+        for _ in range(requests_count):
+            with urllib_request.urlopen(url, timeout=5) as response:  # noqa: S310
+                response.read()
+        urlopen_total = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(requests_count):
+            pool.request("GET", url, timeout=5)
+        pooled_total = time.perf_counter() - started
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+    return {
+        "requests": float(requests_count),
+        "urlopen_us_per_request": urlopen_total / requests_count * 1e6,
+        "pooled_us_per_request": pooled_total / requests_count * 1e6,
+        "connections_created": float(pool.stats.created),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark urlopen against the keep-alive connection pool.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per client (default: %(default)s).")
+    args = parser.parse_args()
+    if args.requests < 1:
+        parser.error("--requests must be at least 1")
+    result = run_benchmark(args.requests)
+    print(f"Requests per client:  {int(result['requests'])}")
+    print(f"urlopen:              {result['urlopen_us_per_request']:.1f} us/request")
+    print(f"keep-alive pool:      {result['pooled_us_per_request']:.1f} us/request")
+    print(f"Pooled connections:   {int(result['connections_created'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Open-loop load generator for finding an Ollama endpoint's saturation point.
+
+``bench_ollama.py`` is closed loop: a worker only sends its next request once
+the previous one returned, so the offered load adapts to the server and
+queueing never shows up.  This tool instead fires requests on a fixed schedule
+(evenly spaced or Poisson arrivals) regardless of how many are still running,
+and ramps the arrival rate step by step::
+
+    python scripts/load_ollama.py --rates 0.25,0.5,1,2,4 --duration 60 --arrival poisson
+
+Every step records achieved throughput, queueing delay, error rate and tail
+latency.  Queueing delay is the time a request spent waiting rather than being
+processed: the client-side dispatch lag plus the part of the wall time Ollama
+did not account for in ``total_duration``.  The knee is the highest offered
+rate the endpoint still kept up with; see :func:`find_knee`.  Prompts are
+drawn round-robin from ``--prompts`` files (plain text, or JSONL in the
+``ollama_chain --batch`` format) and default to ``$OLLAMA_BENCH_PROMPT``.
+Results land next to the benchmarks as ``load-<model>-<timestamp>/``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Sequence
+
+from bench_ollama import Sample, measure, run_directory
+from http_pool import ConnectionPool
+from ollama_api import DEFAULT_BASE_URL
+from ollama_chain import load_batch
+from provenance import provenance
+from settings import DEFAULT_EVIDENCE_ROOT, REPO_ROOT, read_env_file, resolve_repo_path, resolve_setting
+from stats import distribution
+
+DEFAULT_RATES = (0.25, 0.5, 1.0, 2.0, 4.0)
+KEEP_UP_RATIO = 0.9  # Achieved throughput must stay within 10% of the offered rate.
+LATENCY_GROWTH = 2.0  # ... and p95 latency within twice the lightest step's p95.
+MAX_ERROR_RATE = 0.01
+
+
+def parse_rates(raw: str) -> List[float]:
+    try:
+        rates = [float(part) for part in raw.split(",") if part.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid rate list {raw!r}") from exc
+    if not rates or any(value <= 0 for value in rates):
+        raise argparse.ArgumentTypeError("arrival rates must be positive numbers")
+    return sorted(set(rates))
+
+
+def arrival_offsets(rate: float, duration: float, process: str, rng: random.Random) -> List[float]:
+    """Return send times (seconds from the step start) for one step."""
+
+    offsets: List[float] = []
+    if process == "constant":
+        interval = 1.0 / rate
+        offset = 0.0
+        while offset < duration:
+            offsets.append(offset)
+            offset += interval
+        return offsets
+    if process != "poisson":
+        raise ValueError(f"Unknown arrival process '{process}'")
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        offsets.append(offset)
+        offset += rng.expovariate(rate)
+    return offsets
+
+
+def load_prompts(paths: Sequence[Path]) -> List[str]:
+    prompts: List[str] = []
+    for path in paths:
+        if path.suffix.lower() == ".jsonl":
+            prompts.extend(item.conversation.history[0][1] for item in load_batch(path))
+            continue
+        text = path.read_text(encoding="utf-8").strip()
+        if not text:
+            raise ValueError(f"Prompt file {path} is empty.")
+        prompts.append(text)
+    if not prompts:
+        raise ValueError("The prompt pool is empty.")
+    return prompts
+
+
+@dataclass
+class Arrival:
+    """One open-loop request: when it was due, when it was sent and how it went."""
+
+    scheduled_s: float
+    dispatched_s: float
+    sample: Sample
+
+    @property
+    def queue_s(self) -> float:
+        lag = max(self.dispatched_s - self.scheduled_s, 0.0)
+        if self.sample.server_s is None:
+            return lag
+        return lag + max(self.sample.wall_s - self.sample.server_s, 0.0)
+
+
+def run_step(
+    send: Callable[[str], Sample],
+    prompts: Sequence[str],
+    rate: float,
+    duration: float,
+    process: str = "constant",
+    rng: random.Random | None = None,
+    max_in_flight: int = 64,
+) -> Dict[str, Any]:
+    """Offer ``rate`` requests/s for ``duration`` seconds and summarise the step.
+
+    Requests are dispatched on schedule even while earlier ones are running;
+    only ``max_in_flight`` bounds the client, and any wait for a free worker is
+    counted as queueing delay.  The step ends once every request finished.
+    """
+
+    offsets = arrival_offsets(rate, duration, process, rng or random.Random())
+    futures: List[Future[Arrival]] = []
+    started = time.perf_counter()
+
+    def fire(scheduled: float, prompt: str) -> Arrival:
+        dispatched = time.perf_counter() - started
+        return Arrival(scheduled, dispatched, send(prompt))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load") as executor:
+        for index, offset in enumerate(offsets):
+            pause = started + offset - time.perf_counter()
+            if pause > 0:
+                time.sleep(pause)
+            futures.append(executor.submit(fire, offset, prompts[index % len(prompts)]))
+        arrivals = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    return summarise_step(rate, arrivals, max(elapsed, duration))
+
+
+def summarise_step(rate: float, arrivals: Sequence[Arrival], elapsed: float) -> Dict[str, Any]:
+    ok = [arrival for arrival in arrivals if arrival.sample.ok]
+    errors = len(arrivals) - len(ok)
+    return {
+        "offered_rps": rate,
+        "sent": len(arrivals),
+        "completed": len(ok),
+        "errors": errors,
+        "error_rate": round(errors / len(arrivals), 4) if arrivals else 0.0,
+        "elapsed_s": round(elapsed, 4),
+        "achieved_rps": round(len(ok) / elapsed, 4) if elapsed > 0 else 0.0,
+        "latency_s": distribution([arrival.sample.wall_s for arrival in ok]),
+        "ttft_s": distribution([arrival.sample.ttft_s for arrival in ok if arrival.sample.ttft_s is not None]),
+        "queue_s": distribution([arrival.queue_s for arrival in ok]),
+    }
+
+
+def find_knee(steps: Sequence[Mapping[str, Any]]) -> Dict[str, Any] | None:
+    """Return the highest-rate step that still kept up with its offered load.
+
+    A step keeps up when its achieved throughput is at least ``KEEP_UP_RATIO``
+    of the offered rate, its error rate stays under ``MAX_ERROR_RATE`` and its
+    p95 latency stays within ``LATENCY_GROWTH`` times the p95 of the lightest
+    step.  The ramp is assumed monotonic, so the first failing step ends the
+    search.
+    """
+
+    ordered = sorted(steps, key=lambda step: step["offered_rps"])
+    if not ordered or not ordered[0]["latency_s"]:
+        return None
+    baseline_p95 = ordered[0]["latency_s"]["p95"]
+    knee = None
+    for step in ordered:
+        latency = step["latency_s"]
+        keeps_up = (
+            step["achieved_rps"] >= KEEP_UP_RATIO * step["offered_rps"]
+            and step["error_rate"] <= MAX_ERROR_RATE
+            and latency is not None
+            and latency["p95"] <= LATENCY_GROWTH * baseline_p95
+        )
+        if not keeps_up:
+            break
+        knee = step
+    return knee
+
+
+def run_ramp(
+    send: Callable[[str], Sample],
+    prompts: Sequence[str],
+    rates: Sequence[float],
+    duration: float,
+    process: str,
+    seed: int | None = None,
+    max_in_flight: int = 64,
+    stop_error_rate: float = 0.5,
+) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    steps: List[Dict[str, Any]] = []
+    for rate in rates:
+        print(f"Offering {rate:g} req/s for {duration:g}s ({process} arrivals)")
+        step = run_step(send, prompts, rate, duration, process, rng, max_in_flight)
+        print(
+            f"  achieved {step['achieved_rps']:.2f} req/s, errors {step['error_rate']:.1%}, "
+            f"p95 latency {format_seconds(step['latency_s'], 'p95')}, p95 queue {format_seconds(step['queue_s'], 'p95')}"
+        )
+        steps.append(step)
+        if step["error_rate"] >= stop_error_rate:
+            print(f"  stopping the ramp: error rate reached {step['error_rate']:.0%}")
+            break
+    return steps
+
+
+def format_seconds(summary: Mapping[str, float] | None, key: str) -> str:
+    return "n/a" if not summary else f"{summary[key]:.2f}s"
+
+
+def format_table(steps: Sequence[Mapping[str, Any]], knee: Mapping[str, Any] | None) -> List[str]:
+    lines = [
+        "| Offered req/s | Achieved req/s | Errors | Latency p50/p95/p99 | Queue p50/p95/p99 | TTFT p95 |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for step in steps:
+        marker = " (knee)" if knee is not None and step is knee else ""
+        latency, queue = step["latency_s"], step["queue_s"]
+        lines.append(
+            f"| {step['offered_rps']:g}{marker} | {step['achieved_rps']:.2f} | {step['error_rate']:.1%} | "
+            f"{format_seconds(latency, 'p50')} / {format_seconds(latency, 'p95')} / {format_seconds(latency, 'p99')} | "
+            f"{format_seconds(queue, 'p50')} / {format_seconds(queue, 'p95')} / {format_seconds(queue, 'p99')} | "
+            f"{format_seconds(step['ttft_s'], 'p95')} |"
+        )
+    return lines
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ramp an open-loop request rate against an Ollama endpoint.")
+    parser.add_argument("--model", help="Model to load (default: OLLAMA_BENCH_MODEL).")
+    parser.add_argument(
+        "--prompts",
+        action="append",
+        default=[],
+        help="Prompt file (text) or pool (.jsonl); repeatable (default: OLLAMA_BENCH_PROMPT).",
+    )
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Ollama endpoint (default: %(default)s).")
+    parser.add_argument(
+        "--rates",
+        type=parse_rates,
+        default=list(DEFAULT_RATES),
+        help="Comma-separated arrival rates in requests per second (default: 0.25,0.5,1,2,4).",
+    )
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds per rate step (default: %(default)s).")
+    parser.add_argument("--arrival", choices=("constant", "poisson"), default="poisson", help="Arrival process (default: %(default)s).")
+    parser.add_argument("--seed", type=int, help="Seed for Poisson arrivals, for repeatable schedules.")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=64,
+        help="Client-side cap on concurrent requests; waits beyond it count as queueing (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--stop-error-rate",
+        type=float,
+        default=0.5,
+        help="Abort the ramp once a step's error rate reaches this fraction (default: %(default)s).",
+    )
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-read timeout in seconds (default: %(default)s).")
+    parser.add_argument("--output-root", help="Evidence directory (default: EVIDENCE_ROOT or docs/evidence).")
+    parser.add_argument("--env-file", type=Path, default=REPO_ROOT / ".env", help="Environment file consulted for unset settings.")
+    args = parser.parse_args(argv)
+    if args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.max_in_flight < 1:
+        parser.error("--max-in-flight must be at least 1")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    env_file = read_env_file(args.env_file)
+    model = resolve_setting(args.model, "OLLAMA_BENCH_MODEL", env_file)
+    if not model:
+        print("Error: model not specified and OLLAMA_BENCH_MODEL is not configured.", file=sys.stderr)
+        return 1
+    prompt_paths = args.prompts or [resolve_setting(None, "OLLAMA_BENCH_PROMPT", env_file)]
+    if not all(prompt_paths):
+        print("Error: no --prompts given and OLLAMA_BENCH_PROMPT is not configured.", file=sys.stderr)
+        return 1
+    try:
+        prompts = load_prompts([resolve_repo_path(path) for path in prompt_paths])
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    evidence_root = resolve_repo_path(resolve_setting(args.output_root, "EVIDENCE_ROOT", env_file) or DEFAULT_EVIDENCE_ROOT)
+
+    base_url = args.base_url.rstrip("/")
+    pool = ConnectionPool(max_per_host=args.max_in_flight)
+    counter = iter(range(sys.maxsize))
+    counter_lock = threading.Lock()
+
+    def send(prompt: str) -> Sample:
+        with counter_lock:
+            index = next(counter)
+        return measure(base_url, model, prompt, args.timeout, pool, index=index)
+
+    print(f"Load test of '{model}' on {base_url} with {len(prompts)} prompt(s).")
+    try:
+        steps = run_ramp(
+            send, prompts, args.rates, args.duration, args.arrival, args.seed, args.max_in_flight, args.stop_error_rate
+        )
+    finally:
+        pool.close()
+    knee = find_knee(steps)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model": model,
+        "base_url": base_url,
+        "arrival": args.arrival,
+        "duration_s": args.duration,
+        "prompts": len(prompts),
+        "steps": steps,
+        "knee": knee,
+        "saturation_rps": max((step["achieved_rps"] for step in steps), default=0.0),
+        "provenance": provenance(base_url, model),
+    }
+    run_dir = run_directory(evidence_root, "load", model)
+    (run_dir / "summary.json").write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    table = format_table(steps, knee)
+    (run_dir / "report.md").write_text(
+        "\n".join(["# Ollama load test", "", f"- Model: {model}", f"- Endpoint: {base_url}", "", *table]) + "\n",
+        encoding="utf-8",
+    )
+    print()
+    print("\n".join(table))
+    if knee is None:
+        print("\nKnee: the endpoint did not keep up even at the lowest offered rate.")
+    else:
+        print(f"\nKnee: {knee['offered_rps']:g} req/s offered, {knee['achieved_rps']:.2f} req/s achieved.")
+    print(f"Peak achieved throughput: {report['saturation_rps']:.2f} req/s")
+    print(f"Load test artifacts saved to {run_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Search Modelfile ``PARAMETER`` values for the best throughput on this host.
+
+``modelfiles/baseline.Modelfile`` ships conservative ``num_thread`` and
+``num_ctx`` values.  This tool measures combinations of ``num_thread``,
+``num_batch`` and ``num_ctx`` against a running Ollama endpoint with the
+bench prompt (``$OLLAMA_BENCH_PROMPT``) and keeps the fastest one::
+
+    python scripts/modelfile_tune.py --num-thread 4,8,16 --num-batch 128,256,512
+
+Candidates are sent as request ``options``, which override the Modelfile, so
+no model has to be created per candidate.  Each visit of a candidate starts
+with one untimed request that absorbs the reload the new options cause; the
+timed requests then yield prefill and decode tok/s from Ollama's metrics.  A
+candidate's cost is the modelled time of one bench request,
+``prompt_tokens / prefill + num_predict / decode``, so both rates count.
+
+``--strategy halving`` (default) measures every candidate once, keeps the
+best third, doubles the repetitions and repeats until one is left; ``grid``
+measures every candidate ``--repeats`` times.  Candidates whose context is
+too small for the bench prompt are dropped.
+
+Samples are cached in ``.cache/modelfile_tune/<fingerprint>.json``.  The
+fingerprint covers the hardware, the endpoint and its Ollama version; inside
+it samples are keyed by model digest, prompt, ``num_predict`` and the
+parameters, so a repeat run only measures what changed.  The winner is
+written as ``modelfiles/tuned/<name>.<fingerprint>.Modelfile`` (a
+subdirectory, so the repository keeps exactly one baseline Modelfile) with
+the JSON report of the search next to it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+from context_sweep import generate
+from http_pool import HttpError
+from ollama_api import DEFAULT_BASE_URL
+from provenance import PARAMETER_LINE, host_fingerprint, modelfile_parameters, ollama_facts
+from settings import REPO_ROOT, read_env_file, resolve_repo_path, resolve_setting
+from stats import median, rate
+
+DEFAULT_MODELFILE = "modelfiles/baseline.Modelfile"
+DEFAULT_OUTPUT_DIR = "modelfiles/tuned"
+DEFAULT_CACHE_DIR = ".cache/modelfile_tune"
+TUNED_PARAMETERS = ("num_thread", "num_batch", "num_ctx")
+DEFAULT_NUM_BATCH = (128, 256, 512)
+HALVING_KEEP = 3  # Successive halving keeps the best 1/HALVING_KEEP of each round.
+
+def parse_values(raw: str) -> List[int]:
+    try:
+        values = sorted({int(part) for part in raw.split(",") if part.strip()})
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid value list {raw!r}") from exc
+    if not values or values[0] < 1:
+        raise argparse.ArgumentTypeError("values must be positive integers")
+    return values
+
+
+def render_modelfile(text: str, values: Mapping[str, int], header: Sequence[str] = ()) -> str:
+    """Rewrite the ``PARAMETER`` lines for ``values`` and append the ones that are missing."""
+
+    pending = dict(values)
+    lines: List[str] = [f"# {line}" for line in header]
+    for line in text.splitlines():
+        match = PARAMETER_LINE.match(line)
+        if match and match.group(1) in pending:
+            lines.append(f"PARAMETER {match.group(1)} {pending.pop(match.group(1))}")
+        else:
+            lines.append(line)
+    lines.extend(f"PARAMETER {name} {value}" for name, value in pending.items())
+    return "\n".join(lines) + "\n"
+
+
+def default_threads(cpus: int | None, baseline: int | None) -> List[int]:
+    cpus = cpus or 4
+    values = {max(1, cpus // 4), max(1, cpus // 2), cpus}
+    if baseline:
+        values.add(baseline)
+    return sorted(values)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    num_thread: int
+    num_batch: int
+    num_ctx: int
+
+    @property
+    def values(self) -> Dict[str, int]:
+        return {"num_thread": self.num_thread, "num_batch": self.num_batch, "num_ctx": self.num_ctx}
+
+    @property
+    def label(self) -> str:
+        return f"thread={self.num_thread} batch={self.num_batch} ctx={self.num_ctx}"
+
+
+@dataclass
+class Score:
+    """Median rates of a candidate and the modelled seconds of one bench request."""
+
+    candidate: Candidate
+    samples: int
+    prefill_tps: float | None
+    decode_tps: float | None
+    prompt_tokens: int | None
+    cost_s: float | None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **self.candidate.values,
+            "samples": self.samples,
+            "prefill_tps": None if self.prefill_tps is None else round(self.prefill_tps, 2),
+            "decode_tps": None if self.decode_tps is None else round(self.decode_tps, 2),
+            "cost_s": None if self.cost_s is None else round(self.cost_s, 4),
+        }
+
+
+class SampleCache:
+    """Measured samples per candidate for one host fingerprint, saved atomically."""
+
+    def __init__(self, path: Path, facts: Mapping[str, Any], scope: Mapping[str, Any], fresh: bool = False) -> None:
+        self.path = path
+        self.facts = dict(facts)
+        self.scope = json.dumps(scope, sort_keys=True)
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        if not fresh:
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if isinstance(data, dict) and isinstance(data.get("samples"), dict):
+                self.entries = {str(key): list(value) for key, value in data["samples"].items() if isinstance(value, list)}
+
+    def key(self, candidate: Candidate) -> str:
+        return hashlib.sha256(f"{self.scope}|{candidate.label}".encode("utf-8")).hexdigest()[:16]
+
+    def samples(self, candidate: Candidate) -> List[Dict[str, Any]]:
+        return self.entries.get(self.key(candidate), [])
+
+    def add(self, candidate: Candidate, sample: Mapping[str, Any]) -> None:
+        self.entries.setdefault(self.key(candidate), []).append(dict(sample))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        payload = {"host": self.facts, "samples": self.entries}
+        temporary.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(temporary, self.path)
+
+
+@dataclass
+class Tuner:
+    """Measures candidates against one endpoint, reusing cached samples."""
+
+    base_url: str
+    model: str
+    prompt: str
+    num_predict: int
+    timeout: float
+    cache: SampleCache
+    measured: int = 0
+    reused: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+
+    def request(self, candidate: Candidate) -> Dict[str, Any]:
+        options = {**candidate.values, "num_predict": self.num_predict}
+        return generate(self.base_url, self.model, self.prompt, options, self.timeout)
+
+    def ensure(self, candidate: Candidate, repeats: int) -> None:
+        """Make sure ``candidate`` has ``repeats`` samples, measuring only the missing ones."""
+
+        missing = repeats - len(self.cache.samples(candidate))
+        if missing <= 0:
+            self.reused += 1
+            return
+        print(f"  {candidate.label}: measuring {missing} request(s)")
+        try:
+            self.request(candidate)  # Untimed: absorbs the reload caused by the new options.
+            for _ in range(missing):
+                server = self.request(candidate)
+                self.cache.add(
+                    candidate,
+                    {
+                        "prompt_tokens": server.get("prompt_eval_count"),
+                        "prefill_tps": rate(server.get("prompt_eval_count"), server.get("prompt_eval_duration")),
+                        "decode_tps": rate(server.get("eval_count"), server.get("eval_duration")),
+                        "measured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    },
+                )
+                self.measured += 1
+        except (HttpError, RuntimeError, OSError, ValueError) as exc:
+            self.failures[candidate.label] = str(exc)
+
+    def score(self, candidate: Candidate) -> Score:
+        samples = self.cache.samples(candidate)
+        prefill = median([s["prefill_tps"] for s in samples if isinstance(s.get("prefill_tps"), (int, float))])
+        decode = median([s["decode_tps"] for s in samples if isinstance(s.get("decode_tps"), (int, float))])
+        tokens = max((s["prompt_tokens"] for s in samples if isinstance(s.get("prompt_tokens"), int)), default=None)
+        cost = None
+        if decode and prefill and tokens is not None:
+            cost = tokens / prefill + self.num_predict / decode
+        return Score(candidate, len(samples), prefill, decode, tokens, cost)
+
+
+def ranked(tuner: Tuner, candidates: Iterable[Candidate]) -> List[Score]:
+    """Scores of ``candidates`` that fit the bench prompt, cheapest first."""
+
+    scores = []
+    for candidate in candidates:
+        score = tuner.score(candidate)
+        if candidate.label in tuner.failures or score.cost_s is None:
+            continue
+        if score.prompt_tokens is not None and candidate.num_ctx < score.prompt_tokens + tuner.num_predict:
+            continue
+        scores.append(score)
+    return sorted(scores, key=lambda score: score.cost_s or math.inf)
+
+
+def search(tuner: Tuner, candidates: Sequence[Candidate], strategy: str, repeats: int) -> Tuple[List[Score], List[Dict[str, Any]]]:
+    """Run the search and return the final ranking plus one entry per round."""
+
+    rounds: List[Dict[str, Any]] = []
+    alive = list(candidates)
+    budget = 1 if strategy == "halving" else repeats
+    while True:
+        print(f"Round {len(rounds) + 1}: {len(alive)} candidate(s), {budget} request(s) each")
+        for candidate in alive:
+            tuner.ensure(candidate, budget)
+        scores = ranked(tuner, alive)
+        rounds.append({"candidates": len(alive), "repeats": budget, "ranking": [score.as_dict() for score in scores]})
+        if strategy != "halving" or len(scores) <= 1:
+            return scores, rounds
+        alive = [score.candidate for score in scores[: max(1, math.ceil(len(scores) / HALVING_KEEP))]]
+        budget *= 2
+
+
+def write_outputs(
+    modelfile: Path,
+    text: str,
+    best: Score,
+    baseline: Score | None,
+    report: Dict[str, Any],
+    output_dir: Path,
+    fingerprint: str,
+) -> Tuple[Path, Path]:
+    header = [
+        f"Tuned by scripts/modelfile_tune.py on {report['generated_at']} for host {fingerprint}.",
+        f"{best.candidate.label}: prefill {best.prefill_tps:.1f} tok/s, decode {best.decode_tps:.1f} tok/s.",
+    ]
+    if baseline is not None and baseline.cost_s and best.cost_s:
+        header.append(f"Bench request {baseline.cost_s / best.cost_s:.2f}x faster than the baseline parameters.")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = modelfile.name[: -len(".Modelfile")] if modelfile.name.endswith(".Modelfile") else modelfile.stem
+    tuned = output_dir / f"{stem}.{fingerprint}.Modelfile"
+    tuned.write_text(render_modelfile(text, best.candidate.values, header), encoding="utf-8")
+    report_path = output_dir / f"{stem}.{fingerprint}.json"
+    report_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return tuned, report_path
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Search Modelfile num_thread/num_batch/num_ctx for the best throughput.")
+    parser.add_argument("--modelfile", default=DEFAULT_MODELFILE, help="Baseline Modelfile (default: %(default)s).")
+    parser.add_argument("--model", help="Model to measure (default: OLLAMA_BENCH_MODEL, then the Modelfile's FROM).")
+    parser.add_argument("--prompt-file", help="Prompt file relative to the repository (default: OLLAMA_BENCH_PROMPT).")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Ollama endpoint (default: %(default)s).")
+    parser.add_argument("--num-thread", type=parse_values, help="num_thread values (default: a quarter, half and all CPUs plus the baseline).")
+    parser.add_argument("--num-batch", type=parse_values, default=list(DEFAULT_NUM_BATCH), help="num_batch values (default: 128,256,512).")
+    parser.add_argument("--num-ctx", type=parse_values, help="num_ctx values (default: half the baseline and the baseline).")
+    parser.add_argument("--min-ctx", type=int, default=0, help="Never pick a context below this many tokens (default: %(default)s).")
+    parser.add_argument("--num-predict", type=int, default=128, help="Tokens generated per request (default: %(default)s).")
+    parser.add_argument("--strategy", choices=("halving", "grid"), default="halving", help="Search strategy (default: %(default)s).")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed requests per candidate with --strategy grid (default: %(default)s).")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout in seconds (default: %(default)s).")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory for the tuned Modelfile and report (default: %(default)s).")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Sample cache directory (default: %(default)s).")
+    parser.add_argument("--fresh", action="store_true", help="Ignore cached samples and measure everything again.")
+    parser.add_argument(
+        "--env-file",
+        type=Path,
+        default=REPO_ROOT / ".env",
+        help="Environment file consulted for unset settings (default: repository .env).",
+    )
+    args = parser.parse_args(argv)
+    if args.repeats < 1 or args.num_predict < 1:
+        parser.error("--repeats and --num-predict must be at least 1")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    env_file = read_env_file(args.env_file)
+    modelfile = resolve_repo_path(args.modelfile)
+    if not modelfile.is_file():
+        print(f"Error: Modelfile not found at {modelfile}", file=sys.stderr)
+        return 1
+    text = modelfile.read_text(encoding="utf-8")
+    base, parameters = modelfile_parameters(text)
+    model = resolve_setting(args.model, "OLLAMA_BENCH_MODEL", env_file) or base
+    if not model:
+        print("Error: no model given and the Modelfile has no FROM line.", file=sys.stderr)
+        return 1
+    prompt_setting = resolve_setting(args.prompt_file, "OLLAMA_BENCH_PROMPT", env_file)
+    if not prompt_setting or not resolve_repo_path(prompt_setting).is_file():
+        print("Error: bench prompt not found; pass --prompt-file or configure OLLAMA_BENCH_PROMPT.", file=sys.stderr)
+        return 1
+    prompt = resolve_repo_path(prompt_setting).read_text(encoding="utf-8")
+
+    baseline_values = {name: int(parameters[name]) for name in TUNED_PARAMETERS if parameters.get(name, "").isdigit()}
+    baseline_ctx = baseline_values.get("num_ctx")
+    threads = args.num_thread or default_threads(os.cpu_count(), baseline_values.get("num_thread"))
+    contexts = args.num_ctx or sorted({baseline_ctx // 2, baseline_ctx} if baseline_ctx else {4096})
+    contexts = [ctx for ctx in contexts if ctx >= args.min_ctx]
+    if not contexts:
+        print(f"Error: no num_ctx value is at least --min-ctx {args.min_ctx}.", file=sys.stderr)
+        return 1
+    candidates = [Candidate(t, b, c) for t in threads for b in args.num_batch for c in contexts]
+    baseline = None
+    if set(baseline_values) == set(TUNED_PARAMETERS):
+        baseline = Candidate(**baseline_values)
+        if baseline not in candidates and baseline.num_ctx >= args.min_ctx:
+            candidates.append(baseline)
+
+    base_url = args.base_url.rstrip("/")
+    version, digest = ollama_facts(base_url, model)
+    fingerprint, facts = host_fingerprint(base_url, version)
+    scope = {
+        "model": model,
+        "digest": digest,
+        "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        "num_predict": args.num_predict,
+    }
+    cache = SampleCache(resolve_repo_path(args.cache_dir) / f"{fingerprint}.json", facts, scope, fresh=args.fresh)
+    tuner = Tuner(base_url, model, prompt, args.num_predict, args.timeout, cache)
+    print(f"Tuning '{model}' on {base_url} (host {fingerprint}): {len(candidates)} candidate(s), strategy {args.strategy}.")
+    started = time.perf_counter()
+    try:
+        scores, rounds = search(tuner, candidates, args.strategy, args.repeats)
+    finally:
+        cache.save()
+    if not scores:
+        print("Error: no candidate produced usable measurements.", file=sys.stderr)
+        for label, error in tuner.failures.items():
+            print(f"  {label}: {error}", file=sys.stderr)
+        return 1
+
+    best = scores[0]
+    baseline_score = tuner.score(baseline) if baseline is not None else None
+    if baseline_score is not None and baseline_score.cost_s is None:
+        baseline_score = None
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "modelfile": str(modelfile),
+        "model": model,
+        "model_digest": digest,
+        "base_url": base_url,
+        "host": {"fingerprint": fingerprint, **facts},
+        "strategy": args.strategy,
+        "num_predict": args.num_predict,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "requests_measured": tuner.measured,
+        "candidates_reused": tuner.reused,
+        "failures": tuner.failures,
+        "baseline": None if baseline_score is None else baseline_score.as_dict(),
+        "best": best.as_dict(),
+        "rounds": rounds,
+    }
+    tuned, report_path = write_outputs(modelfile, text, best, baseline_score, report, resolve_repo_path(args.output_dir), fingerprint)
+    print(f"Best: {best.candidate.label} (prefill {best.prefill_tps:.1f} tok/s, decode {best.decode_tps:.1f} tok/s)")
+    print(f"Measured {tuner.measured} request(s), reused cached samples {tuner.reused} time(s).")
+    print(f"Tuned Modelfile written to {tuned}; search report at {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
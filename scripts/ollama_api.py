@@ -0,0 +1,265 @@
+"""Requests to Ollama's ``/api/generate`` and ``/api/chat`` shared by the chain, benchmarks and sweeps.
+
+:class:`StageRequest` describes one generation; :func:`send_request` sends it
+buffered and :func:`stream_request` streamed, with time-to-first-token and
+inter-token figures in :class:`StreamStats`.  Both go through the shared
+:func:`http_pool.default_pool` and route endpoints that name several replicas
+through :func:`chain_router.default_router`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chain_cache import cache_key
+from chain_router import ReplicaUnavailable, default_router, split_endpoints
+from http_pool import Cancellation, ConnectionPool, HttpConnectionError, HttpStatusError, default_pool
+
+DEFAULT_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@dataclass
+class StageRequest:
+    """Everything needed to send one stage to Ollama.
+
+    ``messages`` switches the request from ``/api/generate`` to ``/api/chat``.
+    """
+
+    model: str
+    endpoint: str
+    prompt: str = ""
+    messages: List[Dict[str, str]] | None = None
+    keep_alive: str | int | None = None
+    options: Dict[str, Any] | None = None
+    format: Any = None  # Ollama structured-output ``format`` ("json" or a JSON schema).
+
+    @property
+    def api(self) -> str:
+        return "generate" if self.messages is None else "chat"
+
+    @property
+    def url(self) -> str:
+        return f"{self.endpoint}/api/{self.api}"
+
+    @property
+    def replicas(self) -> List[str]:
+        return split_endpoints(self.endpoint)
+
+    def body(self, stream: bool) -> bytes:
+        payload: Dict[str, Any] = {"model": self.model, "stream": stream}
+        if self.messages is None:
+            payload["prompt"] = self.prompt
+        else:
+            payload["messages"] = self.messages
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.options:
+            payload["options"] = self.options
+        if self.format is not None:
+            payload["format"] = self.format
+        return json.dumps(payload).encode("utf-8")
+
+    def cache_key(self) -> str:
+        # Options and format change the answer, so they are part of the key; keep_alive is not.
+        shape = {**(self.options or {}), **({"format": self.format} if self.format is not None else {})}
+        if self.messages is None:
+            return cache_key(self.model, self.endpoint, self.prompt, shape)
+        material = json.dumps(self.messages, ensure_ascii=False, separators=(",", ":"))
+        return cache_key(self.model, self.endpoint, material, {"api": "chat", **({"options": shape} if shape else {})})
+
+
+def response_text(payload: Dict[str, Any]) -> str | None:
+    """Extract the generated text from a ``/api/generate`` or ``/api/chat`` payload or chunk."""
+
+    text = payload.get("response")
+    if isinstance(text, str):
+        return text
+    message = payload.get("message")
+    if isinstance(message, dict) and isinstance(message.get("content"), str):
+        return message["content"]
+    return None
+
+
+def payload_load_seconds(payload: Dict[str, Any]) -> float:
+    return float(payload.get("load_duration") or 0) / 1e9
+
+
+def send_request(stage: StageRequest, timeout: float, cancel: Cancellation | None = None) -> Dict[str, Any]:
+    """POST ``stage`` without streaming; chat replies gain a ``response`` key mirroring the message text.
+
+    A stage whose endpoint names several replicas is routed by the shared
+    :class:`chain_router.Router`, which fails over when a replica is unreachable.
+    ``cancel`` aborts the request with :class:`http_pool.RequestCancelled`.
+    """
+
+    replicas = stage.replicas
+    if len(replicas) > 1:
+        return default_router().call(
+            replicas, stage.model, lambda endpoint: _send_once(replace(stage, endpoint=endpoint), timeout, cancel), payload_load_seconds
+        )
+    return _send_once(stage, timeout, cancel)
+
+
+def _send_once(stage: StageRequest, timeout: float, cancel: Cancellation | None = None) -> Dict[str, Any]:
+    model, endpoint = stage.model, stage.endpoint
+    pool = default_pool()
+    try:
+        body = pool.request("POST", stage.url, body=stage.body(stream=False), headers=JSON_HEADERS, timeout=timeout, cancel=cancel).text()
+    except HttpStatusError as exc:  # pragma: no cover - network errors are surfaced to the caller.
+        detail = exc.body.decode("utf-8", errors="ignore")
+        raise RuntimeError(f"{model} on {endpoint} returned HTTP {exc.status}: {detail}") from exc
+    except HttpConnectionError as exc:
+        raise ReplicaUnavailable(f"Failed to reach {endpoint}: {exc.reason}") from exc
+
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError as exc:  # pragma: no cover - unexpected Ollama response.
+        raise RuntimeError(f"Could not decode Ollama response: {body}") from exc
+
+    result = response_text(payload)
+    if result is None:
+        raise RuntimeError(f"Ollama response is missing text output: {payload}")
+    payload["response"] = result
+    return payload
+
+
+@dataclass
+class StreamStats:
+    """Latency figures gathered while consuming a streamed generation.
+
+    Only running aggregates are kept so memory stays constant regardless of how
+    many tokens the model produces.  ``server`` holds the metrics Ollama sends
+    with its final chunk.
+    """
+
+    started: float
+    first_token_at: float | None = None
+    finished_at: float | None = None
+    chunks: int = 0
+    gap_total: float = 0.0
+    gap_max: float = 0.0
+    last_token_at: float | None = field(default=None, repr=False)
+    server: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def record_chunk(self, now: float) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = now
+        elif self.last_token_at is not None:
+            gap = now - self.last_token_at
+            self.gap_total += gap
+            self.gap_max = max(self.gap_max, gap)
+        self.last_token_at = now
+        self.chunks += 1
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def mean_inter_token(self) -> float | None:
+        if self.chunks < 2:
+            return None
+        return self.gap_total / (self.chunks - 1)
+
+    @property
+    def elapsed(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started
+
+    def summary(self) -> str:
+        def fmt(value: float | None, scale: float = 1.0, unit: str = "s") -> str:
+            return "n/a" if value is None else f"{value * scale:.2f}{unit}"
+
+        return (
+            f"ttft={fmt(self.time_to_first_token)} "
+            f"inter-token mean={fmt(self.mean_inter_token, 1000.0, 'ms')} "
+            f"max={fmt(self.gap_max if self.chunks > 1 else None, 1000.0, 'ms')} "
+            f"chunks={self.chunks} total={fmt(self.elapsed)}"
+        )
+
+
+def stream_request(
+    stage: StageRequest,
+    timeout: float,
+    on_token: Optional[Callable[[str], None]] = None,
+    pool: ConnectionPool | None = None,
+    cancel: Cancellation | None = None,
+) -> Tuple[str, StreamStats]:
+    """Stream ``stage`` and return the unstripped text together with its latency figures.
+
+    Ollama emits one JSON object per line.  The call returns as soon as the
+    chunk flagged ``done`` arrives so the next stage can start immediately.
+    ``timeout`` applies to every socket read, i.e. it bounds the idle time
+    between chunks rather than the whole generation.  ``pool`` defaults to the
+    shared :func:`default_pool`.  Replica pools fail over only while no token
+    has been forwarded yet.  ``cancel`` lets another thread abort the request,
+    which then raises :class:`http_pool.RequestCancelled`.
+    """
+
+    replicas = stage.replicas
+    if len(replicas) > 1:
+        return default_router().call(
+            replicas,
+            stage.model,
+            lambda endpoint: _stream_once(replace(stage, endpoint=endpoint), timeout, on_token, pool, cancel),
+            lambda result: float(result[1].server.get("load_duration") or 0) / 1e9,
+        )
+    return _stream_once(stage, timeout, on_token, pool, cancel)
+
+
+def _stream_once(
+    stage: StageRequest,
+    timeout: float,
+    on_token: Optional[Callable[[str], None]],
+    pool: ConnectionPool | None,
+    cancel: Cancellation | None = None,
+) -> Tuple[str, StreamStats]:
+    model, endpoint = stage.model, stage.endpoint
+    parts: List[str] = []
+    stats = StreamStats(started=time.perf_counter())
+    try:
+        with (pool or default_pool()).stream(
+            "POST", stage.url, body=stage.body(stream=True), headers=JSON_HEADERS, timeout=timeout, cancel=cancel
+        ) as response:
+            for raw_line in response:
+                line = raw_line.strip()
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError as exc:  # pragma: no cover - unexpected Ollama response.
+                    raise RuntimeError(f"Could not decode Ollama stream chunk: {line!r}") from exc
+                if "error" in chunk:
+                    raise RuntimeError(f"{model} on {endpoint} reported an error: {chunk['error']}")
+                fragment = response_text(chunk)
+                if fragment:
+                    stats.record_chunk(time.perf_counter())
+                    parts.append(fragment)
+                    if on_token is not None:
+                        on_token(fragment)
+                if chunk.get("done"):
+                    stats.server = {name: value for name, value in chunk.items() if name not in ("response", "message", "context")}
+                    response.read()  # Consume the chunked terminator so the connection can be reused.
+                    break
+            else:
+                raise RuntimeError(f"{model} on {endpoint} closed the stream before completion")
+    except HttpStatusError as exc:  # pragma: no cover - network errors are surfaced to the caller.
+        detail = exc.body.decode("utf-8", errors="ignore")
+        raise RuntimeError(f"{model} on {endpoint} returned HTTP {exc.status}: {detail}") from exc
+    except HttpConnectionError as exc:
+        raise ReplicaUnavailable(f"Failed to reach {endpoint}: {exc.reason}") from exc
+    except OSError as exc:  # pragma: no cover - read timeouts and resets while streaming.
+        if not parts:
+            raise ReplicaUnavailable(f"{model} on {endpoint} dropped the connection: {exc}") from exc
+        raise RuntimeError(f"{model} on {endpoint} stream interrupted: {exc}") from exc
+
+    stats.finished_at = time.perf_counter()
+    return "".join(parts), stats
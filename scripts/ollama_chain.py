@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
-"""Run a chain-of-experts style workflow across multiple Ollama endpoints sequentially.
+"""Run a chain-of-experts style workflow across one or more Ollama endpoints.
 
-This helper keeps only a single model loaded at a time.  Provide the initial
-prompt via ``--prompt`` or ``--prompt-file`` and list the desired models with
-``--step``.  Each step accepts ``model`` or ``model@endpoint``; append ``#`` and
-instructions to specialise a stage, for example::
+Each ``--step`` (``model[{options}][@endpoint][#directive]``) sends the user
+prompt plus the replies of the earlier steps to its model, one step after the
+other; models stay loaded for their ``keep_alive`` unless ``--unload`` frees
+them::
 
     python scripts/ollama_chain.py \
         --prompt "Entwirf eine REST-API für Kundenverwaltung." \
@@ -12,9 +12,9 @@ instructions to specialise a stage, for example::
         --step "qwen2.5-coder:7b@http://localhost:11436#Prüfe den Code auf Bugs" \
         --step "llama3.1:8b#Erstelle die Dokumentation"
 
-When no endpoint is provided the script falls back to ``$OLLAMA_BASE_URL`` or
-``http://localhost:11434``.  Results are printed to stdout and can optionally be
-written to a Markdown transcript with ``--transcript``.
+``--batch`` and ``--pipeline`` run prompt sets and DAGs instead of one linear
+chain.  ``docs/OLLAMA_CHAIN.md`` describes every option; the ``chain_*``
+modules next to this file implement them.
 """
 
 from __future__ import annotations
@@ -22,14 +22,36 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
 import sys
-from dataclasses import dataclass
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import List, Sequence, Tuple
-from urllib import error, request
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
 
-DEFAULT_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+from chain_cache import DEFAULT_MAX_MB, ResponseCache, open_cache
+from chain_dag import NodeResult, PipelineNode, load_pipeline, schedule, timing_report
+from chain_deadline import DeadlineBudget, DeadlineExceeded, StageWatch
+from chain_hedge import HedgeOutcome, HedgeReport, TtftHistory, parse_hedge_after, run_hedged
+from chain_history import HistoryWindow, Summariser, estimate_tokens, summary_prompt
+from chain_journal import StageJournal, render_transcript
+from chain_metrics import MetricsCollector, StageMetrics
+from chain_options import describe_options, parse_keep_alive, parse_option_block, split_option_block
+from chain_output import OutputFilter, Projection, project
+from chain_prefetch import LoadReport, Prefetcher
+from chain_router import POLICIES, configure_router, split_endpoints
+from http_pool import Cancellation, RequestCancelled, configure_default_pool, default_pool
+from ollama_api import DEFAULT_BASE_URL, StageRequest, StreamStats, send_request, stream_request
+
+PROBE_HEADROOM = 2  # Connection slots per host beyond --concurrency for router probes and prefetches.
 DEFAULT_DIRECTIVE = "Review the previous response and continue the task."  # Applied to steps >= 2 unless overridden.
+CHAT_CONTINUE = "Continue the task."  # Chat turn used when a later stage has no directive at all.
+PREFETCH_KEEP_ALIVE = "30m"  # Preloaded models must survive a long previous stage; --unload releases them.
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_EVIDENCE_ROOT = "docs/evidence"
+DEFAULT_TTFT_HISTORY = ".cache/ollama_chain/ttft_history.json"
 
 
 @dataclass
@@ -39,14 +61,23 @@ class Step:
     model: str
     endpoint: str
     directive: str | None = None
+    options: Dict[str, Any] = field(default_factory=dict)  # Ollama ``options`` for this stage.
+    keep_alive: str | int | None = None  # Overrides --keep-alive for this stage.
+    output: OutputFilter | None = None  # What later stages see of this stage's reply.
 
     def normalised_endpoint(self) -> str:
-        endpoint = self.endpoint.strip()
-        if not endpoint:
-            endpoint = DEFAULT_BASE_URL
-        if "//" not in endpoint:
-            endpoint = f"http://{endpoint}"
-        return endpoint.rstrip("/")
+        """Return the endpoint, or a comma-separated replica pool, with schemes filled in."""
+
+        return ",".join(self.endpoints)
+
+    @property
+    def endpoints(self) -> List[str]:
+        normalised = []
+        for endpoint in split_endpoints(self.endpoint) or [DEFAULT_BASE_URL]:
+            if "//" not in endpoint:
+                endpoint = f"http://{endpoint}"
+            normalised.append(endpoint.rstrip("/"))
+        return list(dict.fromkeys(normalised))
 
     @property
     def display_name(self) -> str:
@@ -54,13 +85,27 @@ class Step:
 
 
 def parse_step(raw: str, default_endpoint: str) -> Step:
-    """Parse ``model[@endpoint][#directive]`` tokens into a :class:`Step`."""
+    """Parse ``model[{options}][@endpoint[,endpoint...]][#directive]`` tokens into a :class:`Step`."""
 
     directive: str | None = None
     core = raw.strip()
     if not core:
         raise ValueError("Step definition may not be empty")
 
+    options: Dict[str, Any] = {}
+    keep_alive: str | int | None = None
+    output: OutputFilter | None = None
+    first = re.search(r"[{@#]", core)
+    if first is not None and first.group() == "{":
+        try:
+            head, block, rest = split_option_block(core)
+            options, keep_alive, output = parse_option_block(block or "")
+        except ValueError as exc:
+            raise ValueError(f"Invalid step definition '{raw}': {exc}") from None
+        if rest.strip() and rest.lstrip()[0] not in "@#":
+            raise ValueError(f"Invalid step definition '{raw}': unexpected '{rest.strip()}' after the options block")
+        core = head + rest.lstrip()
+
     if "#" in core:
         core, directive = core.split("#", maxsplit=1)
         directive = directive.strip() or None
@@ -75,7 +120,7 @@ def parse_step(raw: str, default_endpoint: str) -> Step:
     if not model:
         raise ValueError(f"Invalid step definition '{raw}': missing model name")
 
-    return Step(model=model, endpoint=endpoint, directive=directive)
+    return Step(model=model, endpoint=endpoint, directive=directive, options=options, keep_alive=keep_alive, output=output)
 
 
 def load_prompt(prompt: str | None, prompt_file: str | None) -> str:
@@ -104,28 +149,220 @@ def format_history(entries: Sequence[Tuple[str, str]]) -> str:
     return "\n\n".join(sections)
 
 
-def call_ollama(endpoint: str, model: str, prompt: str, timeout: float) -> str:
-    payload = json.dumps({"model": model, "prompt": prompt, "stream": False}).encode("utf-8")
-    url = f"{endpoint}/api/generate"
-    req = request.Request(url, data=payload, headers={"Content-Type": "application/json"})
-    try:
-        with request.urlopen(req, timeout=timeout) as response:
-            body = response.read().decode("utf-8")
-    except error.HTTPError as exc:  # pragma: no cover - network errors are surfaced to the caller.
-        detail = exc.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(f"{model} on {endpoint} returned HTTP {exc.code}: {detail}") from exc
-    except error.URLError as exc:  # pragma: no cover - network errors are surfaced to the caller.
-        raise RuntimeError(f"Failed to reach {endpoint}: {exc.reason}") from exc
+def resolve_directive(step: Step, index: int, default_directive: str) -> str | None:
+    """Return the task text for ``step``; the default only applies from the second stage on."""
 
-    try:
-        payload = json.loads(body)
-    except json.JSONDecodeError as exc:  # pragma: no cover - unexpected Ollama response.
-        raise RuntimeError(f"Could not decode Ollama response: {body}") from exc
+    if step.directive is not None:
+        return step.directive
+    if index > 1:
+        return default_directive.strip() or None
+    return None
+
+
+def build_stage_prompt(history: Sequence[Tuple[str, str]], step: Step, directive: str | None) -> str:
+    stage_prompt = format_history(history)
+    if directive:
+        stage_prompt = f"{stage_prompt}\n\n### Task for {step.display_name}\n{directive.strip()}"
+    return stage_prompt
+
+
+def chat_task_message(step: Step, index: int, directive: str | None) -> Dict[str, str] | None:
+    if directive:
+        return {"role": "user", "content": f"### Task for {step.display_name}\n{directive.strip()}"}
+    if index > 1:
+        return {"role": "user", "content": CHAT_CONTINUE}
+    return None
+
+
+def cached_generate(
+    cache: ResponseCache | None, stage: StageRequest, timeout: float, cancel: Cancellation | None = None
+) -> Tuple[Dict[str, Any], bool]:
+    """Return ``(payload, from_cache)``, consulting and filling ``cache`` when given."""
 
-    result = payload.get("response")
-    if not isinstance(result, str):
-        raise RuntimeError(f"Ollama response is missing text output: {payload}")
-    return result.strip()
+    if cache is None:
+        return send_request(stage, timeout, cancel), False
+    key = stage.cache_key()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+    payload = send_request(stage, timeout, cancel)
+    cache.put(key, stage.model, stage.endpoint, cacheable(payload))
+    return payload, False
+
+
+def timed_generate(
+    cache: ResponseCache | None, stage: StageRequest, timeout: float, label: str, collector: MetricsCollector
+) -> Tuple[Dict[str, Any], bool]:
+    """:func:`cached_generate` that also records the stage's metrics in ``collector``."""
+
+    started = time.perf_counter()
+    payload, from_cache = cached_generate(cache, stage, timeout)
+    wall = time.perf_counter() - started
+    collector.add(StageMetrics.from_payload(label, stage.model, stage.endpoint, payload, wall, cached=from_cache, options=stage.options))
+    return payload, from_cache
+
+
+def write_metrics(args: argparse.Namespace, collector: MetricsCollector) -> None:
+    if not (args.metrics or args.metrics_dir):
+        return
+    collector.finish()
+    if args.metrics_dir:
+        directory = Path(args.metrics_dir)
+    else:
+        evidence_root = Path(os.environ.get("EVIDENCE_ROOT") or DEFAULT_EVIDENCE_ROOT)
+        directory = (evidence_root if evidence_root.is_absolute() else REPO_ROOT / evidence_root) / "metrics"
+    json_path, prom_path = collector.write(directory)
+    totals = collector.totals()
+    print(
+        f"\nMetrics: {totals['stages']} stage(s), run wall {totals['run_wall_s']:.2f}s, "
+        f"server {totals['server_s']:.2f}s, load {totals['load_s']:.2f}s"
+    )
+    print(f"Metrics written to {json_path.resolve()} and {prom_path.resolve()}")
+
+
+def cacheable(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # The token context array is large and only useful for the raw /api/generate continuation API.
+    return {name: value for name, value in payload.items() if name != "context"}
+
+
+def prefill_summary(payload: Dict[str, Any]) -> str | None:
+    """Describe Ollama's prompt evaluation (prefill) figures, if the payload carries them."""
+
+    count = payload.get("prompt_eval_count")
+    if count is None:
+        return None
+    seconds = float(payload.get("prompt_eval_duration") or 0) / 1e9
+    rate = f", {count / seconds:.0f} tok/s" if seconds > 0 else ""
+    return f"prefill: {count} prompt token(s) in {seconds:.2f}s{rate}"
+
+
+@dataclass
+class Conversation:
+    """History of one chain run, rendered either as a flat prompt or as chat messages.
+
+    ``history`` keeps the stripped text later stages see in ``/api/generate``
+    prompts, after each step's output filter; ``transcript`` keeps the full
+    replies.  ``messages`` is append-only and keeps each (unfiltered) reply
+    byte-for-byte, so every chat request starts with exactly the previous
+    request plus its reply and Ollama can reuse the prompt cache for that
+    prefix.  An optional :class:`HistoryWindow` compacts older sections once
+    the budget is exceeded.
+    """
+
+    history: List[Tuple[str, str]]
+    messages: List[Dict[str, str]]
+    window: HistoryWindow | None = None
+    message_index: List[int] = field(default_factory=lambda: [0])
+    transcript: List[Tuple[str, str]] = field(default_factory=list)
+
+    @classmethod
+    def start(cls, prompt: str, window: HistoryWindow | None = None) -> "Conversation":
+        return cls([("User Prompt", prompt)], [{"role": "user", "content": prompt}], window, transcript=[("User Prompt", prompt)])
+
+    def stage_request(
+        self, step: Step, index: int, directive: str | None, api: str, keep_alive: str | int | None
+    ) -> StageRequest:
+        """Build the request for ``step``; in chat mode its task turn joins the conversation."""
+
+        endpoint = step.normalised_endpoint()
+        options = dict(step.options) or None
+        output_format = step.output.request_format() if step.output is not None else None
+        if step.keep_alive is not None:
+            keep_alive = step.keep_alive
+        if api == "chat":
+            task = chat_task_message(step, index, directive)
+            if task is not None:
+                self.messages.append(task)
+            return StageRequest(
+                step.model, endpoint, messages=self._chat_view(), keep_alive=keep_alive, options=options, format=output_format
+            )
+        history: Sequence[Tuple[str, str]] = self.history
+        if self.window is not None:
+            reserve = estimate_tokens(directive or "") + estimate_tokens(step.display_name)
+            history = self.window.fit(self.history, reserve)
+        prompt = build_stage_prompt(history, step, directive)
+        return StageRequest(step.model, endpoint, prompt=prompt, keep_alive=keep_alive, options=options, format=output_format)
+
+    def _chat_view(self) -> List[Dict[str, str]]:
+        messages = list(self.messages)
+        if self.window is None:
+            return messages
+        history_slots = set(self.message_index)
+        reserve = sum(estimate_tokens(m["content"]) for i, m in enumerate(messages) if i not in history_slots)
+        self.window.fit(self.history, reserve)
+        for history_index, (_, text) in self.window.compacted.items():
+            messages[self.message_index[history_index]] = {"role": "assistant", "content": text}
+        return messages
+
+    def replay(self, step: Step, index: int, directive: str | None, label: str, raw_text: str) -> None:
+        """Add an already finished stage, including its chat task turn, without sending anything."""
+
+        task = chat_task_message(step, index, directive)
+        if task is not None:
+            self.messages.append(task)
+        self.record(label, raw_text, step.output)
+
+    def record(self, label: str, raw_text: str, output: OutputFilter | None = None, heading: str | None = None) -> Projection:
+        """Add a finished reply; later stages see only what ``output`` extracts from it.
+
+        ``heading`` names the reply in the transcript when it differs from the history ``label``.
+        """
+
+        text = raw_text.strip()
+        extract, projection = project(label, text, output)
+        self.transcript.append((heading or label, text))
+        self.history.append((label, extract))
+        self.message_index.append(len(self.messages))
+        filtered = output is not None and projection.matched
+        self.messages.append({"role": "assistant", "content": extract if filtered else raw_text})
+        return projection
+
+
+def make_window(
+    args: argparse.Namespace, cache: ResponseCache | None, summaries: Dict[str, str], deadline: DeadlineBudget | None = None
+) -> HistoryWindow | None:
+    if not args.history_budget:
+        return None
+    summariser: Summariser | None = None
+    if args.summarizer:
+        summary_step = parse_step(args.summarizer, args.base_url)
+        keep_alive = parse_keep_alive(args.keep_alive)
+
+        def summariser(label: str, text: str) -> str:
+            stage = StageRequest(
+                summary_step.model,
+                summary_step.normalised_endpoint(),
+                prompt=summary_prompt(label, text),
+                keep_alive=keep_alive,
+            )
+            if deadline is None:
+                payload, _ = cached_generate(cache, stage, args.timeout)
+                return str(payload["response"])
+            # The summary belongs to the stage it makes room for, so it runs within what is left of the deadline.
+            # DeadlineExceeded is a RuntimeError, on which the window trims the section instead.
+            summary_label = f"Summary of {label}"
+            allotted = deadline.remaining()
+            with deadline.watch(summary_label, allotted) as watch:
+                try:
+                    payload, _ = cached_generate(cache, stage, args.timeout, watch.attach())
+                except RequestCancelled as exc:
+                    deadline.record(summary_label, allotted, watch.elapsed, str(watch.reason))
+                    raise DeadlineExceeded(f"{summary_label} cancelled after {watch.elapsed:.2f}s: {watch.describe()}") from exc
+            deadline.record(summary_label, allotted, watch.elapsed, "ok")
+            return str(payload["response"])
+
+    return HistoryWindow(
+        args.history_budget,
+        summariser=summariser,
+        keep_recent=args.history_keep,
+        trim_tokens=args.trim_tokens,
+        summaries=summaries,
+    )
+
+
+def print_token(fragment: str) -> None:
+    sys.stdout.write(fragment)
+    sys.stdout.flush()
 
 
 def write_transcript(entries: Sequence[Tuple[str, str]], output_path: Path) -> None:
@@ -142,16 +379,33 @@ def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Run multiple Ollama models sequentially using a shared prompt history.")
     parser.add_argument("--prompt", help="Initial prompt passed to the first model.")
     parser.add_argument("--prompt-file", help="Read the initial prompt from a file.")
+    parser.add_argument(
+        "--batch",
+        help="Run every prompt from a JSONL file through the chain stage by stage instead of a single prompt.",
+    )
+    parser.add_argument(
+        "--batch-output",
+        help="JSONL file that receives one record per batch prompt (default: <batch>.out.jsonl).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum in-flight batch or pipeline requests per endpoint or replica (default: %(default)s).",
+    )
     parser.add_argument(
         "--step",
         dest="steps",
         action="append",
-        required=True,
         help=(
             "Add a pipeline stage defined as model[@endpoint][#directive]. "
             "Repeat --step for each expert in the chain."
         ),
     )
+    parser.add_argument(
+        "--pipeline",
+        help="JSON or TOML file describing a DAG of steps with declared inputs; replaces --step.",
+    )
     parser.add_argument(
         "--base-url",
         default=DEFAULT_BASE_URL,
@@ -161,7 +415,31 @@ def build_parser() -> argparse.ArgumentParser:
         "--timeout",
         type=float,
         default=120.0,
-        help="HTTP timeout in seconds for each Ollama request (default: %(default)s).",
+        help="HTTP timeout in seconds for each socket read of an Ollama request (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Wall-clock budget for the whole chain. Each stage gets an even share of what is left when it starts "
+            "and is cancelled (its connection closed) when it runs over. Stages are streamed when set."
+        ),
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Cancel a stage when no token arrived for this long after its first token (streams every stage).",
+    )
+    parser.add_argument(
+        "--on-deadline",
+        choices=("fail", "keep-partial"),
+        default="fail",
+        help=(
+            "What a cancelled stage does: fail the chain, or pass the reply received so far to later stages "
+            "and continue (default: %(default)s)."
+        ),
     )
     parser.add_argument(
         "--default-directive",
@@ -175,34 +453,732 @@ def build_parser() -> argparse.ArgumentParser:
         "--transcript",
         help="Optional path to write the full conversation transcript as Markdown.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream tokens to stdout as they arrive and report per-stage first-token and inter-token latency.",
+    )
+    parser.add_argument(
+        "--api",
+        choices=("generate", "chat"),
+        default="generate",
+        help=(
+            "Ollama API used per stage. 'chat' sends an append-only message list so consecutive stages on the "
+            "same model and endpoint reuse the server's prompt cache (default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--keep-alive",
+        help="keep_alive forwarded with every request, e.g. 10m or -1 to keep models resident.",
+    )
+    parser.add_argument(
+        "--history-budget",
+        type=int,
+        help=(
+            "Estimated token budget for the history handed to each stage. Older sections beyond it are "
+            "summarised or trimmed (default: unlimited)."
+        ),
+    )
+    parser.add_argument(
+        "--summarizer",
+        help="model[@endpoint] that condenses older sections once --history-budget is exceeded (default: trim).",
+    )
+    parser.add_argument(
+        "--history-keep",
+        type=int,
+        default=1,
+        help="Number of most recent responses always passed verbatim (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--trim-tokens",
+        type=int,
+        default=256,
+        help="Size older sections are trimmed to when no --summarizer is set (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Preload the next stage's model in the background whenever it runs on a different endpoint.",
+    )
+    parser.add_argument(
+        "--unload",
+        choices=("keep", "after-last-use"),
+        default="keep",
+        help="Unload policy for models the chain has finished with (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Append every finished stage to this JSONL journal (fsync'd) so an interrupted run can be resumed.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="JOURNAL",
+        help=(
+            "Continue from a journal written by --journal: stages whose inputs are unchanged are taken from it, "
+            "new stages are appended to it."
+        ),
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=(
+            "Report per-stage load, prefill, decode and wall-vs-server times and write them as JSON plus a "
+            "Prometheus textfile (ollama_chain.prom) below $EVIDENCE_ROOT/metrics."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        help="Directory for the --metrics output, e.g. the node exporter textfile directory (implies --metrics).",
+    )
+    parser.add_argument(
+        "--route-policy",
+        choices=POLICIES,
+        default="ewma",
+        help=(
+            "How steps with several endpoints (model@http://a,http://b) pick a replica: lowest expected latency "
+            "or fewest requests in flight (default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Replicas tried before a request to an endpoint pool fails (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        metavar="SECONDS|pNN",
+        help=(
+            "Send a duplicate request to another replica of the step's pool or a --hedge-to target when no first "
+            "token arrived after SECONDS, or after the given percentile of past runs (e.g. p95); the first to "
+            "answer wins and the other is cancelled. Hedged stages are always streamed."
+        ),
+    )
+    parser.add_argument(
+        "--hedge-to",
+        action="append",
+        metavar="MODEL[@ENDPOINT]",
+        help="Fallback model/endpoint used as hedge or race candidate after the step's own replicas (repeatable).",
+    )
+    parser.add_argument(
+        "--race",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Start N candidates (replicas, then --hedge-to targets) at once and keep the first to finish (default: off).",
+    )
+    parser.add_argument(
+        "--hedge-history",
+        help=f"File with the time-to-first-token samples --hedge-after pNN learns from (default: {DEFAULT_TTFT_HISTORY}).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Enable the on-disk response cache in this directory (default: $OLLAMA_CHAIN_CACHE_DIR if set).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the response cache even when --cache-dir or $OLLAMA_CHAIN_CACHE_DIR is set.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_MAX_MB,
+        help="Size cap for the response cache before least recently used entries are evicted (default: %(default)s).",
+    )
     return parser
 
 
+def parse_steps(args: argparse.Namespace) -> List[Step]:
+    if not args.steps:
+        raise ValueError("At least one --step is required (or describe the stages with --pipeline).")
+    return [parse_step(raw, args.base_url) for raw in args.steps]
+
+
 def run_pipeline(args: argparse.Namespace) -> None:
     prompt = load_prompt(args.prompt, args.prompt_file)
-    steps = [parse_step(raw, args.base_url) for raw in args.steps]
-    history: List[Tuple[str, str]] = [("User Prompt", prompt)]
+    steps = parse_steps(args)
+    cache = open_cache(args.cache_dir, args.no_cache, args.cache_max_mb)
+    try:
+        execute_chain(args, prompt, steps, cache)
+    finally:
+        if cache is not None:
+            print(f"\n{cache.summary()}")
+            cache.close()
 
-    for index, step in enumerate(steps, start=1):
-        directive = step.directive
-        if directive is None and (index > 1 or args.default_directive.strip()):
-            directive = args.default_directive.strip() or None
-            if index == 1 and step.directive is None:
-                # Do not force a default directive on the very first stage unless explicitly provided.
-                directive = step.directive
 
-        stage_prompt = format_history(history)
-        if directive:
-            stage_prompt = f"{stage_prompt}\n\n### Task for {step.display_name}\n{directive.strip()}"
+@dataclass
+class ChainReport:
+    """Per-stage measurements printed once the chain has finished."""
 
-        endpoint = step.normalised_endpoint()
-        print(f"\n[Step {index}] Running {step.display_name} via {endpoint}...")
-        response = call_ollama(endpoint, step.model, stage_prompt, timeout=args.timeout)
+    timings: List[Tuple[str, StreamStats]] = field(default_factory=list)
+    prefill: List[Tuple[str, str]] = field(default_factory=list)
+    loads: List[Tuple[str, LoadReport]] = field(default_factory=list)
+    hedges: HedgeReport = field(default_factory=HedgeReport)
+    projections: List[Tuple[str, Projection, int]] = field(default_factory=list)  # (label, projection, later stages)
+
+    def print_summary(self, api: str, window: HistoryWindow | None) -> None:
+        if self.timings:
+            print("\n=== Stream latency ===")
+            for label, stats in self.timings:
+                print(f"{label}: {stats.summary()}")
+
+        if self.prefill:
+            print(f"\n=== Prefill ({api}) ===")
+            for label, summary in self.prefill:
+                print(f"{label}: {summary}")
+
+        if self.loads:
+            hidden = sum(report.hidden for _, report in self.loads)
+            exposed = sum(report.exposed for _, report in self.loads)
+            print(f"\n=== Model loads (hidden {hidden:.2f}s, exposed {exposed:.2f}s) ===")
+            for label, report in self.loads:
+                print(f"{label}: {report.summary()}")
+
+        if self.hedges.outcomes:
+            print("\n=== Hedging ===")
+            for line in self.hedges.lines():
+                print(line)
+
+        if self.projections:
+            saved = sum(projection.saved_tokens * later for _, projection, later in self.projections)
+            print(f"\n=== Output filters (~{saved} input token(s) saved) ===")
+            for label, projection, later in self.projections:
+                print(f"{label}: {projection.summary(later)}")
+
+        if window is not None:
+            print(
+                f"\nHistory window: {len(window.compacted)} section(s) compacted, "
+                f"{len(window.summaries)} summar{'y' if len(window.summaries) == 1 else 'ies'} generated, "
+                f"~{window.tokens_saved} token(s) saved per later stage"
+            )
+
+
+@dataclass
+class ChainRun:
+    """State shared by the stages of a single (non-batch) chain run."""
+
+    args: argparse.Namespace
+    steps: Sequence[Step]
+    conversation: Conversation
+    cache: ResponseCache | None
+    keep_alive: str | int | None
+    prefetcher: Prefetcher | None = None
+    journal: StageJournal | None = None
+    ttft_history: TtftHistory | None = None  # Set when stages are hedged or raced.
+    hedge_after: Tuple[float | None, float | None] = (None, None)  # (seconds, learned percentile)
+    deadline: DeadlineBudget | None = None  # Set by --deadline or --idle-timeout.
+    report: ChainReport = field(default_factory=ChainReport)
+    metrics: MetricsCollector = field(default_factory=lambda: MetricsCollector("chain"))
+
+
+def execute_chain(args: argparse.Namespace, prompt: str, steps: Sequence[Step], cache: ResponseCache | None) -> None:
+    if (args.deadline is not None and args.deadline <= 0) or (args.idle_timeout is not None and args.idle_timeout <= 0):
+        raise ValueError("--deadline and --idle-timeout must be positive.")
+    deadline = None
+    if args.deadline is not None or args.idle_timeout is not None:
+        deadline = DeadlineBudget(args.deadline, args.idle_timeout)
+    window = make_window(args, cache, {}, deadline)
+    keep_alive = parse_keep_alive(args.keep_alive)
+    run = ChainRun(args, steps, Conversation.start(prompt, window), cache, keep_alive, deadline=deadline)
+    if args.prefetch or args.unload == "after-last-use":
+        run.prefetcher = Prefetcher(keep_alive if keep_alive is not None else PREFETCH_KEEP_ALIVE, args.timeout)
+    last_use = {(step.normalised_endpoint(), step.model): index for index, step in enumerate(steps, start=1)}
+    if args.resume and args.journal and Path(args.resume) != Path(args.journal):
+        raise ValueError("--resume continues the journal it reads; drop --journal or point both at the same file.")
+    if args.resume or args.journal:
+        run.journal = StageJournal(Path(args.resume or args.journal), prompt, resume=bool(args.resume))
+    if args.race < 1:
+        raise ValueError("--race must be at least 1.")
+    if args.hedge_after is not None and args.race > 1:
+        raise ValueError("--hedge-after and --race are alternatives; use one of them.")
+    if args.hedge_to and args.hedge_after is None and args.race < 2:
+        raise ValueError("--hedge-to names hedge targets; enable hedging with --hedge-after or --race.")
+    if args.hedge_after is not None or args.race > 1:
+        if args.hedge_after is not None:
+            run.hedge_after = parse_hedge_after(args.hedge_after)
+        run.ttft_history = TtftHistory(Path(args.hedge_history) if args.hedge_history else REPO_ROOT / DEFAULT_TTFT_HISTORY)
+
+    try:
+        for index, step in enumerate(steps, start=1):
+            run_stage(run, index, step)
+            endpoint = step.normalised_endpoint()
+            if run.prefetcher is not None and args.unload == "after-last-use" and last_use[(endpoint, step.model)] == index:
+                run.prefetcher.release(endpoint, step.model)
+    finally:
+        if run.prefetcher is not None:
+            run.prefetcher.close()
+        if run.journal is not None:
+            run.journal.close()
+            print(f"\n{run.journal.summary()}")
+        if run.ttft_history is not None:
+            run.ttft_history.save()
+        if run.deadline is not None:
+            print("\n=== Deadline ===")
+            for line in run.deadline.lines():
+                print(line)
+            run.metrics.deadline = run.deadline.as_dict()
+        write_metrics(args, run.metrics)
+
+    run.report.print_summary(args.api, window)
+
+    if args.transcript:
+        output_path = Path(args.transcript)
+        if run.journal is not None:
+            render_transcript(run.journal.path, output_path, run.journal.run_id)
+        else:
+            write_transcript(run.conversation.transcript, output_path)
+        print(f"\nTranscript saved to {output_path.resolve()}")
+
+
+def run_stage(run: ChainRun, index: int, step: Step) -> None:
+    args, cache, prefetcher, report = run.args, run.cache, run.prefetcher, run.report
+    conversation = run.conversation
+    window = conversation.window
+    directive = resolve_directive(step, index, args.default_directive)
+    stage = conversation.stage_request(step, index, directive, args.api, run.keep_alive)
+    label = f"Step {index} ({step.display_name})"
+
+    load = LoadReport()
+    if prefetcher is not None:
+        # Waiting for the preload is part of the stage, so it may take at most the stage's share of the deadline.
+        wait = run.deadline.share(len(run.steps) - index + 1) if run.deadline is not None else None
+        load = prefetcher.collect(stage.endpoint, step.model, wait)
+        if args.prefetch and index < len(run.steps):
+            upcoming = run.steps[index]
+            upcoming_endpoint = upcoming.normalised_endpoint()
+            if upcoming_endpoint != stage.endpoint:
+                prefetcher.schedule(upcoming_endpoint, upcoming.model)
+
+    print(f"\n[Step {index}] Running {step.display_name} via {stage.endpoint}...")
+    if step.options or step.keep_alive is not None or step.output is not None:
+        print(f"[Step {index}] options: {describe_options(step.options, step.keep_alive, step.output)}")
+    if window is not None and window.compacted:
+        state = "over budget" if window.over_budget else "within budget"
+        print(
+            f"[Step {index}] history window: ~{window.last_estimate} token(s) for a {window.budget} budget "
+            f"({state}); {len(window.compacted)} section(s) compacted, ~{window.tokens_saved} token(s) saved"
+        )
+    allotted = run.deadline.share(len(run.steps) - index + 1) if run.deadline is not None else None
+    key = stage.cache_key() if cache is not None or run.journal is not None else None
+    if run.journal is not None and key is not None:
+        resumed = run.journal.lookup(key)
+        if resumed is not None:
+            print("--- Response (resumed from journal) ---")
+            print(resumed.strip())
+            conversation.record(step.display_name, resumed, step.output, heading=label)
+            run.journal.record_reuse(index, label, key)
+            if run.deadline is not None:
+                run.deadline.record(label, allotted, 0.0, "resumed")
+            return
+        if key in run.journal.partial:
+            print(f"[Step {index}] the journal only holds a partial reply for this stage; generating it again")
+    started = time.time()
+    clock = time.perf_counter()
+    ttft: float | None = None
+    served = stage
+    cancelled: StageWatch | None = None
+    cached = cache.get(key) if cache is not None and key is not None else None
+    if cached is not None:
+        raw = str(cached["response"])
+        print("--- Response (cached) ---")
+        print(raw.strip())
+    else:
+        watch = run.deadline.watch(label, allotted) if run.deadline is not None else None
+        try:
+            with watch or nullcontext():
+                raw, payload, served, ttft = generate_stage(run, stage, key, index, label, watch)
+        except RequestCancelled as exc:
+            if watch is None or watch.reason is None:
+                raise
+            if args.stream:
+                print()
+            raw = watch.text
+            if args.on_deadline == "fail" or not raw.strip():
+                run.deadline.record(label, allotted, watch.elapsed, watch.reason)
+                raise DeadlineExceeded(f"{label} cancelled after {watch.elapsed:.2f}s: {watch.describe()}") from exc
+            cancelled = watch
+            payload = {"done_reason": watch.reason}
+            if not args.stream:
+                print(f"--- Response (partial, {watch.describe()}) ---")
+                print(raw.strip())
+            print(f"[Step {index}] cancelled after {watch.elapsed:.2f}s ({watch.describe()}); passing on the partial reply")
+    if cached is None:
+        summary = prefill_summary(payload)
+        if summary is not None:
+            print(f"[Step {index}] {summary}")
+            report.prefill.append((label, summary))
+    wall = time.perf_counter() - clock
+    if run.deadline is not None:
+        outcome = "cached" if cached is not None else cancelled.reason if cancelled is not None else "ok"
+        run.deadline.record(label, allotted, wall, str(outcome), len(raw.strip()) if cancelled is not None else 0)
+    metrics = StageMetrics.from_payload(
+        label,
+        served.model,
+        served.endpoint,
+        payload if cached is None else {},
+        wall,
+        ttft,
+        cached=cached is not None,
+        options=stage.options,
+    )
+    run.metrics.add(metrics)
+    if args.metrics or args.metrics_dir:
+        print(f"[Step {index}] {metrics.summary()}")
+    # Transcripts name stages "Step N (model)" as the journal does; later prompts keep the model name.
+    heading = f"{label} (partial)" if cancelled is not None else label
+    projection = conversation.record(step.display_name, raw, step.output, heading=heading)
+    if step.output is not None:
+        later = len(run.steps) - index
+        print(f"[Step {index}] {projection.summary(later)}")
+        report.projections.append((label, projection, later))
+    if run.journal is not None and key is not None:
+        server = {"cached": True} if cached is not None else cacheable(payload)
+        server.pop("response", None)
+        server.pop("message", None)
+        if stage.options:
+            server["options"] = stage.options
+        run.journal.record_stage(
+            index, label, served.model, served.endpoint, key, raw, started, time.time(), server, partial=cancelled is not None
+        )
+    if args.prefetch:
+        if cached is None:
+            load.exposed += float(payload.get("load_duration") or 0) / 1e9
+        print(f"[Step {index}] {load.summary()}")
+        report.loads.append((label, load))
+
+
+def generate_stage(
+    run: ChainRun, stage: StageRequest, key: str | None, index: int, label: str, watch: StageWatch | None
+) -> Tuple[str, Dict[str, Any], StageRequest, float | None]:
+    """Send ``stage`` (hedged, streamed or buffered) and return ``(raw, payload, served, ttft)``.
+
+    With a ``watch`` the stage is always streamed, so the watch can see tokens
+    arrive and cancel the connection; it is only printed live with ``--stream``.
+    Complete replies are added to the response cache.
+    """
+
+    args, cache, report = run.args, run.cache, run.report
+    step_model = run.steps[index - 1].model
+    ttft: float | None = None
+    served = stage
+    if run.ttft_history is not None:
+        live = args.stream and args.race < 2
+        if live:
+            print("--- Response ---", flush=True)
+        on_token = print_token if live else None
+        raw, stats, served, outcome = hedge_stage(run, stage, index, watch.wrap(on_token) if watch else on_token, watch)
+        ttft = outcome.ttft_s
+        if live:
+            print()
+        else:
+            print("--- Response ---")
+            print(raw.strip())
+        print(f"[Step {index}] {outcome.summary()}")
+        report.hedges.add(label, outcome)
+        if args.stream:
+            print(f"[Step {index}] {stats.summary()}")
+            report.timings.append((label, stats))
+        payload = dict(stats.server, model=served.model, response=raw)
+        # A fallback model's answer must not be served later as the step model's.
+        if cache is not None and key is not None and served.model == step_model:
+            cache.put(key, step_model, stage.endpoint, payload)
+    elif args.stream or watch is not None:
+        if args.stream:
+            print("--- Response ---", flush=True)
+        on_token = print_token if args.stream else None
+        cancel = watch.attach() if watch is not None else None
+        raw, stats = stream_request(stage, args.timeout, watch.wrap(on_token) if watch else on_token, cancel=cancel)
+        ttft = stats.time_to_first_token
+        if args.stream:
+            print()
+            print(f"[Step {index}] {stats.summary()}")
+            report.timings.append((label, stats))
+        else:
+            print("--- Response ---")
+            print(raw.strip())
+        payload = dict(stats.server, model=step_model, response=raw)
+        if cache is not None and key is not None:
+            cache.put(key, step_model, stage.endpoint, payload)
+    else:
+        payload = send_request(stage, args.timeout)
+        if cache is not None and key is not None:
+            cache.put(key, step_model, stage.endpoint, cacheable(payload))
+        raw = payload["response"]
+        print("--- Response ---")
+        print(raw.strip())
+    return raw, payload, served, ttft
+
+
+def hedge_candidates(stage: StageRequest, targets: Sequence[str]) -> List[StageRequest]:
+    """The stage on each replica of its pool, in order, followed by the ``--hedge-to`` fallbacks.
+
+    A target is ``model`` (same endpoint as the primary) or ``model@endpoint``.
+    """
+
+    replicas = stage.replicas
+    candidates = [replace(stage, endpoint=endpoint) for endpoint in replicas]
+    for raw in targets:
+        target = parse_step(raw, replicas[0])
+        candidates.append(replace(stage, model=target.model, endpoint=target.normalised_endpoint()))
+    return list({(candidate.model, candidate.endpoint): candidate for candidate in candidates}.values())
+
+
+def hedge_stage(
+    run: ChainRun,
+    stage: StageRequest,
+    index: int,
+    on_token: Optional[Callable[[str], None]],
+    watch: StageWatch | None = None,
+) -> Tuple[str, StreamStats, StageRequest, HedgeOutcome]:
+    """Stream ``stage`` hedged (``--hedge-after``) or raced (``--race``) and learn from its TTFT.
+
+    Every candidate's cancellation is attached to ``watch``, so a deadline
+    closes all of them.
+    """
+
+    args, history = run.args, run.ttft_history
+    assert history is not None
+    candidates = hedge_candidates(stage, args.hedge_to or [])
+    race = args.race > 1
+    if race:
+        candidates = candidates[: args.race]
+    keys = [f"{candidate.model}@{candidate.endpoint}" for candidate in candidates]
+    delay, learned = run.hedge_after
+    if len(candidates) < 2:
+        print(f"[Step {index}] hedge: no other replica or --hedge-to target for {keys[0]}, running unhedged")
+    elif learned is not None:
+        delay = history.percentile(keys[0], learned)
+        if delay is None:
+            print(f"[Step {index}] hedge: {history.count(keys[0])} TTFT sample(s) for {keys[0]}, not hedging until more are known")
+
+    def launcher(candidate: StageRequest) -> Callable[..., Tuple[str, StreamStats]]:
+        return lambda forward, cancel: stream_request(
+            candidate, args.timeout, forward, cancel=watch.attach(cancel) if watch is not None else cancel
+        )
+
+    outcome = run_hedged([launcher(candidate) for candidate in candidates], keys, delay, on_token, race=race)
+    raw, stats = outcome.result
+    if outcome.hedge_won and outcome.ttft_s is not None and not race:
+        expected = history.expected_beyond(keys[0], outcome.ttft_s)
+        outcome.saved_s = max(expected - outcome.ttft_s, 0.0) if expected is not None else 0.0
+    if stats.time_to_first_token is not None:
+        history.record(keys[outcome.winner], stats.time_to_first_token)
+    for loser, waited in outcome.waited.items():
+        history.record(keys[loser], waited)
+    return raw, stats, candidates[outcome.winner], outcome
+
+
+@dataclass
+class BatchItem:
+    """One prompt travelling through the chain in batch mode."""
+
+    index: int
+    item_id: str
+    conversation: Conversation
+    error: str | None = None
+
+    def record(self) -> Dict[str, Any]:
+        history = self.conversation.transcript
+        return {
+            "id": self.item_id,
+            "prompt": history[0][1],
+            "responses": [{"model": label, "response": text} for label, text in history[1:]],
+            "error": self.error,
+        }
+
+
+def load_batch(path: Path) -> List[BatchItem]:
+    items: List[BatchItem] = []
+    with path.open(encoding="utf-8") as handle:
+        for line_number, raw in enumerate(handle, start=1):
+            if not raw.strip():
+                continue
+            try:
+                entry = json.loads(raw)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({exc.msg})") from exc
+            if isinstance(entry, str):
+                prompt, item_id = entry, None
+            elif isinstance(entry, dict):
+                prompt, item_id = entry.get("prompt"), entry.get("id")
+            else:
+                prompt, item_id = None, None
+            if not isinstance(prompt, str) or not prompt.strip():
+                raise ValueError(f"{path}:{line_number}: expected a prompt string or an object with 'prompt'")
+            index = len(items) + 1
+            item_key = str(item_id) if item_id is not None else str(index)
+            items.append(BatchItem(index, item_key, Conversation.start(prompt.strip())))
+    if not items:
+        raise ValueError(f"Batch file {path} contains no prompts.")
+    return items
+
+
+def estimate_naive_load_seconds(
+    steps: Sequence[Step], prompt_count: int, cold_loads: Dict[Tuple[str, str], float]
+) -> float:
+    """Model-load time a prompt-by-prompt run would pay, assuming one resident model per endpoint."""
+
+    resident: Dict[str, str] = {}
+    total = 0.0
+    for _ in range(prompt_count):
+        for step in steps:
+            endpoint = step.normalised_endpoint()
+            if resident.get(endpoint) != step.model:
+                total += cold_loads.get((endpoint, step.model), 0.0)
+                resident[endpoint] = step.model
+    return total
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    if args.prompt or args.prompt_file:
+        raise ValueError("--batch replaces --prompt/--prompt-file; put the prompts into the JSONL file.")
+    if args.stream or args.transcript:
+        raise ValueError("--stream and --transcript are not available in --batch mode; use --batch-output.")
+    if args.prefetch or args.unload != "keep":
+        raise ValueError("--prefetch and --unload apply to single chain runs; batch mode loads each model once per stage.")
+    if args.journal or args.resume:
+        raise ValueError("--journal and --resume apply to single chain runs; batch mode already writes --batch-output incrementally.")
+    if args.hedge_after is not None or args.race > 1 or args.hedge_to:
+        raise ValueError("--hedge-after, --hedge-to and --race apply to single chain runs.")
+    if args.deadline is not None or args.idle_timeout is not None:
+        raise ValueError("--deadline and --idle-timeout apply to single chain runs.")
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be at least 1.")
+
+    batch_path = Path(args.batch)
+    output_path = Path(args.batch_output) if args.batch_output else batch_path.with_suffix(".out.jsonl")
+    items = load_batch(batch_path)
+    steps = parse_steps(args)
+    cache = open_cache(args.cache_dir, args.no_cache, args.cache_max_mb)
+    summaries: Dict[str, str] = {}  # Shared so identical sections across prompts are summarised once.
+    for item in items:
+        item.conversation.window = make_window(args, cache, summaries)
+    keep_alive = parse_keep_alive(args.keep_alive)
+    cold_loads: Dict[Tuple[str, str], float] = {}
+    load_total = 0.0
+    collector = MetricsCollector("batch")
+
+    def run_item(item: BatchItem, index: int, step: Step, endpoint: str) -> float:
+        directive = resolve_directive(step, index, args.default_directive)
+        stage = item.conversation.stage_request(step, index, directive, args.api, keep_alive)
+        label = f"{item.item_id}: Step {index} ({step.display_name})"
+        try:
+            payload, from_cache = timed_generate(cache, stage, args.timeout, label, collector)
+        except RuntimeError as exc:
+            item.error = f"step {index} ({step.display_name}): {exc}"
+            return 0.0
+        item.conversation.record(step.display_name, payload["response"], step.output)
+        if from_cache:
+            return 0.0
+        return float(payload.get("load_duration") or 0) / 1e9
+
+    started = time.perf_counter()
+    try:
+        with output_path.open("w", encoding="utf-8") as output:
+            for index, step in enumerate(steps, start=1):
+                endpoint = step.normalised_endpoint()
+                pending = [item for item in items if item.error is None]
+                print(f"\n[Step {index}] Running {step.display_name} via {endpoint} for {len(pending)} prompt(s)...")
+                stage_started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrency * len(step.endpoints)) as executor:
+                    futures = {executor.submit(run_item, item, index, step, endpoint): item for item in pending}
+                    for future in as_completed(futures):
+                        item = futures[future]
+                        load_seconds = future.result()
+                        load_total += load_seconds
+                        key = (endpoint, step.model)
+                        cold_loads[key] = max(cold_loads.get(key, 0.0), load_seconds)
+                        if item.error is not None or index == len(steps):
+                            write_batch_record(output, item)
+                print(f"[Step {index}] finished in {time.perf_counter() - stage_started:.2f}s")
+    finally:
+        if cache is not None:
+            print(f"\n{cache.summary()}")
+            cache.close()
+        write_metrics(args, collector)
+
+    failures = sum(1 for item in items if item.error is not None)
+    naive = estimate_naive_load_seconds(steps, len(items), cold_loads)
+    print(f"\nBatch finished: {len(items) - failures} ok, {failures} failed in {time.perf_counter() - started:.2f}s")
+    print(
+        f"Model load time: {load_total:.2f}s stage-by-stage vs ~{naive:.2f}s prompt-by-prompt "
+        f"(saved ~{max(naive - load_total, 0.0):.2f}s)"
+    )
+    print(f"Results written to {output_path.resolve()}")
+
+
+def write_batch_record(output: TextIO, item: BatchItem) -> None:
+    output.write(json.dumps(item.record(), ensure_ascii=False) + "\n")
+    output.flush()
+
+
+def run_dag(args: argparse.Namespace) -> None:
+    if args.steps or args.batch:
+        raise ValueError("--pipeline replaces --step and cannot be combined with --batch.")
+    if args.stream or args.prefetch or args.unload != "keep" or args.journal or args.resume:
+        raise ValueError("--stream, --prefetch, --unload, --journal and --resume apply to linear --step chains only.")
+    if args.hedge_after is not None or args.race > 1 or args.hedge_to:
+        raise ValueError("--hedge-after, --hedge-to and --race apply to linear --step chains only.")
+    if args.deadline is not None or args.idle_timeout is not None:
+        raise ValueError("--deadline and --idle-timeout apply to linear --step chains only.")
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be at least 1.")
+
+    pipeline = load_pipeline(Path(args.pipeline), parse_step, args.base_url)
+    if args.prompt or args.prompt_file or not pipeline.prompt:
+        prompt = load_prompt(args.prompt, args.prompt_file)
+    else:
+        prompt = pipeline.prompt
+    cache = open_cache(args.cache_dir, args.no_cache, args.cache_max_mb)
+    keep_alive = parse_keep_alive(args.keep_alive)
+    summaries: Dict[str, str] = {}
+    collector = MetricsCollector("pipeline")
+
+    def stage_index(node: PipelineNode) -> int:
+        # Nodes without inputs behave like the first stage of a chain, everything else like a later one.
+        return 2 if node.inputs else 1
+
+    def run_node(node: PipelineNode, outputs: Dict[str, str]) -> str:
+        conversation = Conversation.start(prompt, make_window(args, cache, summaries))
+        for name in pipeline.ancestors[node.id]:
+            parent = pipeline.node(name)
+            index = stage_index(parent)
+            directive = resolve_directive(parent.step, index, args.default_directive)
+            conversation.replay(parent.step, index, directive, name, outputs[name])
+        index = stage_index(node)
+        directive = resolve_directive(node.step, index, args.default_directive)
+        stage = conversation.stage_request(node.step, index, directive, args.api, keep_alive)
+        payload, _ = timed_generate(cache, stage, args.timeout, node.id, collector)
+        return str(payload["response"])
+
+    def on_finish(result: NodeResult) -> None:
+        node = pipeline.node(result.node_id)
+        print(f"\n[{result.node_id}] {node.step.model} via {result.endpoint} finished in {result.duration:.2f}s")
         print("--- Response ---")
-        print(response)
-        history.append((step.display_name, response))
+        print(result.output.strip())
+        if node.step.output is not None:
+            _, projection = project(node.id, result.output.strip(), node.step.output)
+            later = sum(node.id in ancestors for ancestors in pipeline.ancestors.values())
+            print(f"[{result.node_id}] {projection.summary(later)}")
+
+    print(f"Running pipeline {args.pipeline} with {len(pipeline.nodes)} node(s), up to {args.concurrency} per endpoint...")
+    started = time.perf_counter()
+    try:
+        results = schedule(pipeline, run_node, max_per_endpoint=args.concurrency, on_finish=on_finish)
+    finally:
+        if cache is not None:
+            print(f"\n{cache.summary()}")
+            cache.close()
+        write_metrics(args, collector)
+    wall = time.perf_counter() - started
+
+    print("\n=== Pipeline timing ===")
+    for line in timing_report(pipeline, results, wall):
+        print(line)
 
     if args.transcript:
+        history = [("User Prompt", prompt)] + [(node.id, results[node.id].output) for node in pipeline.nodes]
         output_path = Path(args.transcript)
         write_transcript(history, output_path)
         print(f"\nTranscript saved to {output_path.resolve()}")
@@ -212,7 +1188,21 @@ def main(argv: Sequence[str] | None = None) -> int:
     parser = build_parser()
     try:
         args = parser.parse_args(argv)
-        run_pipeline(args)
+        # Batch and pipeline runs send up to --concurrency requests per host; leave room for probes and prefetches.
+        configure_default_pool(args.concurrency + PROBE_HEADROOM)
+        router = configure_router(args.route_policy, args.max_attempts)
+        try:
+            if args.pipeline:
+                run_dag(args)
+            elif args.batch:
+                run_batch(args)
+            else:
+                run_pipeline(args)
+        finally:
+            if router.replicas:
+                print("\n=== Replica routing ===")
+                for line in router.summary_lines():
+                    print(line)
         return 0
     except Exception as exc:  # pragma: no cover - CLI surface for runtime errors.
         print(f"Error: {exc}", file=sys.stderr)
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""Record real Ollama exchanges and replay them offline with realistic timing.
+
+``record`` runs a proxy in front of a live Ollama: every ``/api/generate`` and
+``/api/chat`` exchange passes through unchanged and is appended to a cassette
+(JSON) together with the offset at which each streamed chunk arrived::
+
+    python scripts/ollama_standin.py record --upstream http://localhost:11434 --cassette .cache/ollama.cassette.json
+
+``replay`` serves the cassette without Ollama.  Requests are matched by path,
+model and prompt (falling back to the latest exchange of the same model, then
+to a synthesised reply), and chunks are sent with the recorded gaps, so
+time-to-first-token and decode speed look like the recorded run::
+
+    python scripts/ollama_standin.py replay --cassette .cache/ollama.cassette.json --token-rate 40 --load-delay 2 --concurrency 1
+
+Timing knobs: ``--speed`` scales recorded gaps (0 sends as fast as
+possible), ``--token-rate`` replaces the recorded decode gaps, and
+``--load-delay`` models a cold load instead of the recorded one.  The first
+request for a model pays the delay, an empty prompt preloads it, and
+``keep_alive: 0`` unloads it.  ``--concurrency`` caps how many generations
+run at once (like ``OLLAMA_NUM_PARALLEL``) and queues the rest.  ``--fault``
+injects failures with a probability: ``error=0.1`` answers HTTP 500,
+``disconnect=0.1`` drops the connection halfway through the reply, and
+``stall=0.1:5`` waits five seconds before the first token.  ``--seed`` makes
+the fault sequence repeatable.
+
+The final chunk reports the durations that were actually replayed, not the
+recorded ones, so client-side and server-side metrics agree.  Tests use
+:class:`StandIn` directly through the ``ollama_standin`` fixture.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from http_pool import ConnectionPool, HttpError, HttpStatusError
+
+DEFAULT_PORT = 11435
+RECORDED_PATHS = ("/api/generate", "/api/chat")
+FAULT_KINDS = ("error", "disconnect", "stall")
+SYNTHETIC_TOKEN = " lorem"
+SYNTHETIC_RATE = 50.0  # tok/s for synthesised replies without --token-rate.
+
+
+@dataclass(frozen=True)
+class Fault:
+    kind: str
+    probability: float
+    seconds: float = 0.0
+
+
+def parse_fault(raw: str) -> Fault:
+    """Parse ``kind=probability[:seconds]``, e.g. ``stall=0.2:3``."""
+
+    kind, _, rest = raw.partition("=")
+    probability, _, seconds = rest.partition(":")
+    try:
+        fault = Fault(kind.strip(), float(probability), float(seconds) if seconds else 0.0)
+    except ValueError:
+        raise ValueError(f"Invalid fault '{raw}': expected kind=probability[:seconds]") from None
+    if fault.kind not in FAULT_KINDS:
+        raise ValueError(f"Invalid fault '{raw}': kind must be one of {', '.join(FAULT_KINDS)}")
+    if not 0 <= fault.probability <= 1 or fault.seconds < 0:
+        raise ValueError(f"Invalid fault '{raw}': probability must be within 0-1 and seconds non-negative")
+    if fault.kind == "stall" and not fault.seconds:
+        raise ValueError(f"Invalid fault '{raw}': stall needs a duration, e.g. stall=0.1:5")
+    return fault
+
+
+def request_key(path: str, request: Dict[str, Any]) -> str:
+    material = {"path": path, "model": request.get("model"), "prompt": request.get("prompt"), "messages": request.get("messages")}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def chunk_text(payload: Dict[str, Any]) -> str:
+    message = payload.get("message")
+    if isinstance(message, dict):
+        return str(message.get("content") or "")
+    return str(payload.get("response") or "")
+
+
+@dataclass
+class Exchange:
+    """One recorded request with the chunks of its reply and their arrival offsets."""
+
+    path: str
+    request: Dict[str, Any]
+    status: int
+    chunks: List[Tuple[float, Dict[str, Any]]]
+
+    @property
+    def model(self) -> Any:
+        return self.request.get("model")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "request": self.request,
+            "status": self.status,
+            "chunks": [{"t": round(offset, 6), "data": data} for offset, data in self.chunks],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Exchange":
+        chunks = [(float(chunk["t"]), dict(chunk["data"])) for chunk in data.get("chunks", [])]
+        return cls(str(data["path"]), dict(data["request"]), int(data.get("status", 200)), chunks)
+
+
+class Cassette:
+    """Recorded exchanges, looked up by request and saved atomically."""
+
+    def __init__(self, exchanges: Sequence[Exchange] = (), upstream: str | None = None) -> None:
+        self.exchanges = list(exchanges)
+        self.upstream = upstream
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls([Exchange.from_dict(entry) for entry in data.get("exchanges", [])], data.get("upstream"))
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            payload = {
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "upstream": self.upstream,
+                "exchanges": [exchange.as_dict() for exchange in self.exchanges],
+            }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        os.replace(temporary, path)
+
+    def add(self, exchange: Exchange) -> None:
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def models(self) -> List[str]:
+        with self._lock:
+            return sorted({str(exchange.model) for exchange in self.exchanges if exchange.model})
+
+    def match(self, path: str, request: Dict[str, Any]) -> Exchange | None:
+        """Exact request first, then the latest exchange of the same path and model."""
+
+        key = request_key(path, request)
+        with self._lock:
+            candidates = [exchange for exchange in self.exchanges if exchange.path == path]
+        for exchange in reversed(candidates):
+            if request_key(exchange.path, exchange.request) == key:
+                return exchange
+        for exchange in reversed(candidates):
+            if exchange.model == request.get("model"):
+                return exchange
+        return None
+
+
+@dataclass
+class ReplayConfig:
+    speed: float = 1.0
+    token_rate: float | None = None
+    load_delay: float = 0.0
+    concurrency: int = 0  # 0 means unlimited.
+    faults: List[Fault] = field(default_factory=list)
+    seed: int | None = None
+    synthetic_tokens: int = 16
+
+
+@dataclass
+class ReplayPlan:
+    """What a replayed reply looks like: fragments, pacing and the final metrics."""
+
+    fragments: List[str]
+    prefill_s: float
+    gaps: List[float]  # Pause before each fragment after the first.
+    final: Dict[str, Any]
+
+
+def plan_reply(exchange: Exchange | None, request: Dict[str, Any], config: ReplayConfig) -> ReplayPlan:
+    if exchange is None:
+        count = config.synthetic_tokens
+        gap = 1.0 / (config.token_rate or SYNTHETIC_RATE)
+        prompt = request.get("prompt") or json.dumps(request.get("messages") or "")
+        final = {"prompt_eval_count": max(len(str(prompt)) // 4, 1), "eval_count": count}
+        return ReplayPlan([SYNTHETIC_TOKEN] * count, 0.0, [gap] * max(count - 1, 0), final)
+    content = [(offset, chunk_text(data)) for offset, data in exchange.chunks if chunk_text(data)]
+    final = dict(exchange.chunks[-1][1]) if exchange.chunks else {}
+    recorded_load = float(final.get("load_duration") or 0) / 1e9
+    first = content[0][0] if content else (exchange.chunks[-1][0] if exchange.chunks else 0.0)
+    prefill = max(first - recorded_load, 0.0) * config.speed
+    if config.token_rate:
+        gaps = [1.0 / config.token_rate] * max(len(content) - 1, 0)
+    else:
+        gaps = [max(later - earlier, 0.0) * config.speed for (earlier, _), (later, _) in zip(content, content[1:])]
+    return ReplayPlan([text for _, text in content], prefill, gaps, final)
+
+
+class StandIn:
+    """A local Ollama stand-in that records from ``upstream`` or replays ``cassette``."""
+
+    def __init__(self, cassette: Cassette, config: ReplayConfig | None = None, upstream: str | None = None, cassette_path: Path | None = None) -> None:
+        self.cassette = cassette
+        self.config = config or ReplayConfig()
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.cassette_path = cassette_path
+        self.resident: set[Any] = set()
+        self.stats: Dict[str, int] = {"requests": 0, "replayed": 0, "synthesised": 0, "recorded": 0, "faults": 0, "in_flight": 0, "peak_in_flight": 0}
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._slots = threading.BoundedSemaphore(self.config.concurrency) if self.config.concurrency > 0 else None
+        self._pool = ConnectionPool()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        handler = type("BoundStandInHandler", (StandInHandler,), {"standin": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._pool.close()
+
+    def count(self, name: str, delta: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += delta
+            if name == "in_flight":
+                self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+
+    def roll_faults(self) -> Dict[str, Fault]:
+        with self._lock:
+            fired = {fault.kind: fault for fault in self.config.faults if self._rng.random() < fault.probability}
+            self.stats["faults"] += len(fired)
+        return fired
+
+    def load(self, model: Any) -> float:
+        """Mark ``model`` resident and return the cold-load delay it costs."""
+
+        with self._lock:
+            if model in self.resident:
+                return 0.0
+            self.resident.add(model)
+        return self.config.load_delay
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    standin: StandIn
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler.
+        return
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _drop(self) -> None:
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming.
+        standin = self.standin
+        if standin.upstream is not None:
+            self._proxy("GET", b"")
+            return
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name, "model": name} for name in standin.cassette.models()]})
+        elif self.path == "/api/ps":
+            with standin._lock:
+                loaded = sorted(str(model) for model in standin.resident)
+            self._send_json(200, {"models": [{"name": name, "model": name} for name in loaded]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "standin"})
+        else:
+            self._send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming.
+        body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        if self.standin.upstream is not None:
+            self._proxy("POST", body)
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+        if self.path not in RECORDED_PATHS:
+            self._send_json(404, {"error": f"{self.path} is not served by the stand-in"})
+            return
+        self._replay(request)
+
+    def _replay(self, request: Dict[str, Any]) -> None:
+        standin, config = self.standin, self.standin.config
+        standin.count("requests")
+        model = request.get("model")
+        chat = self.path == "/api/chat"
+        if request.get("keep_alive") == 0:
+            with standin._lock:
+                standin.resident.discard(model)
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        if request.get("prompt") == "" and not chat:
+            delay = standin.load(model)
+            time.sleep(delay)
+            self._send_json(200, {"model": model, "response": "", "done": True, "load_duration": int(delay * 1e9)})
+            return
+        faults = standin.roll_faults()
+        if "error" in faults:
+            self._send_json(500, {"error": "injected fault"})
+            return
+        exchange = standin.cassette.match(self.path, request)
+        standin.count("replayed" if exchange is not None else "synthesised")
+        plan = plan_reply(exchange, request, config)
+        started = time.perf_counter()
+        if standin._slots is not None:
+            standin._slots.acquire()
+        standin.count("in_flight")
+        try:
+            load = standin.load(model)
+            time.sleep(load + (faults["stall"].seconds if "stall" in faults else 0.0))
+            prefill_started = time.perf_counter()
+            time.sleep(plan.prefill_s)
+            decode_started = time.perf_counter()
+            stream = request.get("stream", True)
+            if stream:
+                self._start_chunked()
+            drop_at = len(plan.fragments) // 2 if "disconnect" in faults else None
+            for index, fragment in enumerate(plan.fragments):
+                if index:
+                    time.sleep(plan.gaps[index - 1])
+                if drop_at is not None and index == drop_at:
+                    self._drop()
+                    return
+                if stream:
+                    self._write_chunk(self._line(chat, model, fragment, {"done": False}))
+            if drop_at is not None:
+                self._drop()
+                return
+            finished = time.perf_counter()
+        finally:
+            standin.count("in_flight", -1)
+            if standin._slots is not None:
+                standin._slots.release()
+        metrics = dict(plan.final)
+        metrics.update(
+            done=True,
+            load_duration=int(load * 1e9),
+            prompt_eval_duration=int((decode_started - prefill_started) * 1e9),
+            eval_count=metrics.get("eval_count") or len(plan.fragments),
+            eval_duration=int((finished - decode_started) * 1e9),
+            total_duration=int((finished - started) * 1e9),
+        )
+        if stream:
+            self._write_chunk(self._line(chat, model, "", metrics))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        payload = json.loads(self._line(chat, model, "".join(plan.fragments), metrics))
+        self._send_json(200, payload)
+
+    @staticmethod
+    def _line(chat: bool, model: Any, text: str, extra: Dict[str, Any]) -> bytes:
+        payload = {name: value for name, value in extra.items() if name not in ("response", "message", "context")}
+        payload["model"] = model
+        if chat:
+            payload["message"] = {"role": "assistant", "content": text}
+        else:
+            payload["response"] = text
+        return json.dumps(payload).encode("utf-8") + b"\n"
+
+    def _proxy(self, method: str, body: bytes) -> None:
+        """Forward to the upstream Ollama and record generate/chat exchanges with chunk offsets.
+
+        An exchange is saved before the reply completes, so a client that saw
+        the end of its response can rely on the cassette containing it.
+        """
+
+        standin = self.standin
+        record = method == "POST" and self.path in RECORDED_PATHS
+        request: Dict[str, Any] = json.loads(body or b"{}") if record else {}
+        chunks: List[Tuple[float, Dict[str, Any]]] = []
+        started = time.perf_counter()
+        headers = {"Content-Type": "application/json"} if body else None
+        try:
+            with standin._pool.stream(method, f"{standin.upstream}{self.path}", body=body or None, headers=headers, timeout=600) as response:
+                if not record or not request.get("stream", True):
+                    payload = response.read()
+                    if record:
+                        self._record(request, response.status, [(time.perf_counter() - started, json.loads(payload))])
+                    self.send_response(response.status)
+                    self.send_header("Content-Type", response.getheader("Content-Type", "application/json"))
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                self._start_chunked(response.status)
+                for line in response:
+                    if not line.strip():
+                        continue
+                    chunks.append((time.perf_counter() - started, json.loads(line)))
+                    self._write_chunk(line if line.endswith(b"\n") else line + b"\n")
+                self._record(request, response.status, chunks)
+                self.wfile.write(b"0\r\n\r\n")
+        except HttpStatusError as exc:
+            self._send_json(exc.status, {"error": exc.body.decode("utf-8", errors="ignore")})
+        except (HttpError, OSError) as exc:
+            self._send_json(502, {"error": f"upstream unavailable: {exc}"})
+
+    def _record(self, request: Dict[str, Any], status: int, chunks: List[Tuple[float, Dict[str, Any]]]) -> None:
+        standin = self.standin
+        standin.cassette.add(Exchange(self.path, request, status, chunks))
+        standin.count("recorded")
+        if standin.cassette_path is not None:
+            standin.cassette.save(standin.cassette_path)
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record Ollama exchanges or replay them offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("record", "replay"):
+        command = commands.add_parser(name, help=f"{name} /api/generate and /api/chat exchanges")
+        command.add_argument("--cassette", type=Path, required=name == "record", help="Cassette JSON file.")
+        command.add_argument("--host", default="127.0.0.1", help="Address to bind (default: %(default)s).")
+        command.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: %(default)s).")
+        if name == "record":
+            command.add_argument("--upstream", default="http://localhost:11434", help="Live Ollama to record (default: %(default)s).")
+            continue
+        command.add_argument("--speed", type=float, default=1.0, help="Scale recorded gaps; 0 replays instantly (default: %(default)s).")
+        command.add_argument("--token-rate", type=float, help="Decode speed in tok/s instead of the recorded gaps.")
+        command.add_argument("--load-delay", type=float, default=0.0, help="Cold-load seconds for a model's first request (default: %(default)s).")
+        command.add_argument("--concurrency", type=int, default=0, help="Generations served at once, 0 for unlimited (default: %(default)s).")
+        command.add_argument("--fault", action="append", default=[], help="Inject faults: error=P, disconnect=P or stall=P:SECONDS (repeatable).")
+        command.add_argument("--seed", type=int, help="Seed for the fault sequence.")
+        command.add_argument("--synthetic-tokens", type=int, default=16, help="Tokens in replies that match no recording (default: %(default)s).")
+    args = parser.parse_args(argv)
+    if args.command == "replay":
+        try:
+            args.fault = [parse_fault(raw) for raw in args.fault]
+        except ValueError as exc:
+            parser.error(str(exc))
+        if args.speed < 0 or args.load_delay < 0 or args.concurrency < 0 or (args.token_rate is not None and args.token_rate <= 0):
+            parser.error("--speed, --load-delay and --concurrency must be non-negative and --token-rate positive")
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.command == "record":
+        cassette = Cassette.load(args.cassette) if args.cassette.is_file() else Cassette(upstream=args.upstream)
+        cassette.upstream = args.upstream
+        standin = StandIn(cassette, upstream=args.upstream, cassette_path=args.cassette)
+    else:
+        cassette = Cassette.load(args.cassette) if args.cassette else Cassette()
+        config = ReplayConfig(args.speed, args.token_rate, args.load_delay, args.concurrency, args.fault, args.seed, args.synthetic_tokens)
+        standin = StandIn(cassette, config)
+    url = standin.start(args.host, args.port)
+    print(f"Ollama stand-in ({args.command}) listening on {url} with {len(cassette.exchanges)} recorded exchange(s).")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.close()
+        if args.command == "record":
+            cassette.save(args.cassette)
+            print(f"Saved {len(cassette.exchanges)} exchange(s) to {args.cassette}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
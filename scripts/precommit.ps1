@@ -174,7 +174,7 @@ if ($settings.Compose) {
     try {
         Invoke-Step "Wait for services" {
             $python = Resolve-Tool -Name 'python' -Alternatives @('py')
-            & $python (Join-Path $repoRoot 'scripts/wait_for_http.py') --retries 24 --delay 5 --timeout 5 `
+            & $python (Join-Path $repoRoot 'scripts/wait_for_http.py') --retries 60 --delay 1 --max-delay 10 --deadline 120 --timeout 5 `
                 'http://localhost:11434/api/version' `
                 'http://localhost:6333/collections' `
                 'http://localhost:3000'
@@ -0,0 +1,148 @@
+"""Where a measurement came from: host, Ollama build, Modelfile and git commit.
+
+``bench_ollama.py`` and ``load_ollama.py`` store :func:`provenance` in every
+``summary.json``, ``evidence_store.py`` keys its index on it and
+``modelfile_tune.py`` caches samples per :func:`host_fingerprint`.  The module
+only depends on :mod:`http_pool` and :mod:`settings`, so any of them can import
+it at the top.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from http_pool import HttpError, default_pool
+from settings import REPO_ROOT
+
+PARAMETER_LINE = re.compile(r"^\s*PARAMETER\s+(\S+)\s+(.+?)\s*$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Gpu:
+    index: int
+    name: str
+    memory_gib: float | None = None
+
+
+def gpu_inventory(run: Callable[..., Any] = subprocess.run) -> List[Gpu]:
+    """List NVIDIA GPUs via ``nvidia-smi``; an empty list means CPU only."""
+
+    try:
+        completed = run(
+            ["nvidia-smi", "--query-gpu=index,name,memory.total", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return []
+    if completed.returncode != 0:
+        return []
+    gpus: List[Gpu] = []
+    for line in completed.stdout.splitlines():
+        parts = [part.strip() for part in line.split(",")]
+        if len(parts) < 2 or not parts[0].isdigit():
+            continue
+        memory = None
+        if len(parts) >= 3 and parts[2].split(" ")[0].isdigit():
+            memory = round(int(parts[2].split(" ")[0]) / 1024, 2)
+        gpus.append(Gpu(int(parts[0]), parts[1], memory))
+    return gpus
+
+
+def modelfile_parameters(text: str) -> Tuple[str | None, Dict[str, str]]:
+    """Return the ``FROM`` model and the ``PARAMETER`` values of a Modelfile."""
+
+    base = None
+    parameters: Dict[str, str] = {}
+    for line in text.splitlines():
+        stripped = line.strip()
+        if base is None and stripped.upper().startswith("FROM "):
+            base = stripped.split(None, 1)[1]
+        match = PARAMETER_LINE.match(line)
+        if match:
+            parameters[match.group(1)] = match.group(2)
+    return base, parameters
+
+
+def ollama_facts(base_url: str, model: str) -> Tuple[str | None, str | None]:
+    """Return the server version and the model digest, either ``None`` when unknown."""
+
+    pool = default_pool()
+    version = digest = None
+    try:
+        version = json.loads(pool.request("GET", f"{base_url}/api/version", timeout=5).text()).get("version")
+    except (HttpError, OSError, ValueError, AttributeError):
+        pass
+    try:
+        listed = json.loads(pool.request("GET", f"{base_url}/api/tags", timeout=5).text()).get("models") or []
+    except (HttpError, OSError, ValueError, AttributeError):
+        listed = []
+    names = {model, f"{model}:latest"}
+    for entry in listed:
+        if isinstance(entry, dict) and (entry.get("name") in names or entry.get("model") in names):
+            digest = entry.get("digest")
+    return version, digest
+
+
+def host_fingerprint(base_url: str, version: str | None) -> Tuple[str, Dict[str, Any]]:
+    """Hash what makes measurements comparable: hardware, endpoint and Ollama version."""
+
+    facts: Dict[str, Any] = {
+        "node": platform.node(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "gpus": [gpu.name for gpu in gpu_inventory()],
+        "endpoint": base_url,
+        "ollama": version,
+    }
+    digest = hashlib.sha256(json.dumps(facts, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return digest, facts
+
+
+def git_commit(root: Path = REPO_ROOT) -> str | None:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if completed.returncode != 0:
+        return None
+    return completed.stdout.strip() or None
+
+
+def modelfile_for(model: str, root: Path = REPO_ROOT) -> Path | None:
+    """The repository Modelfile ``scripts/model.ps1`` builds ``model`` from, if there is one."""
+
+    names = [model, model[: -len(":latest")]] if model.endswith(":latest") else [model]
+    for name in names:
+        path = root / "modelfiles" / f"{name}.Modelfile"
+        if path.is_file():
+            return path
+    return None
+
+
+def provenance(base_url: str, model: str) -> Dict[str, Any]:
+    """What a benchmark run is keyed by in the evidence index; stored in its ``summary.json``."""
+
+    version, digest = ollama_facts(base_url, model)
+    host, facts = host_fingerprint(base_url, version)
+    modelfile = modelfile_for(model)
+    parameters = modelfile_parameters(modelfile.read_text(encoding="utf-8"))[1] if modelfile else {}
+    return {
+        "host": host,
+        "host_facts": facts,
+        "model_digest": digest,
+        "modelfile": str(modelfile.relative_to(REPO_ROOT)) if modelfile else None,
+        "parameters": parameters,
+        "git_commit": git_commit(),
+    }
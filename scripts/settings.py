@@ -0,0 +1,40 @@
+"""Where the measurement scripts read their settings and write their evidence.
+
+A setting comes from the command line, then the process environment, then the
+repository ``.env`` (parsed like the PowerShell helpers do).  Relative paths are
+taken from the repository root.  ``bench_ollama.py``, ``load_ollama.py``,
+``context_sweep.py``, ``modelfile_tune.py`` and ``evidence_store.py`` share these
+helpers; the module has no dependencies of its own.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Mapping
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_EVIDENCE_ROOT = "docs/evidence"
+
+
+def read_env_file(path: Path) -> Dict[str, str]:
+    """Parse ``KEY=value`` lines the same way the PowerShell helpers read ``.env``."""
+
+    values: Dict[str, str] = {}
+    if not path.is_file():
+        return values
+    for line in path.read_text(encoding="utf-8").splitlines():
+        match = re.match(r"^\s*([A-Za-z_][A-Za-z0-9_]*)=(.+)$", line)
+        if match:
+            values[match.group(1)] = match.group(2).strip()
+    return values
+
+
+def resolve_setting(cli_value: str | None, key: str, env_file: Mapping[str, str]) -> str | None:
+    return cli_value or os.environ.get(key) or env_file.get(key)
+
+
+def resolve_repo_path(raw: str) -> Path:
+    path = Path(raw)
+    return path if path.is_absolute() else REPO_ROOT / path
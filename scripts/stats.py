@@ -0,0 +1,48 @@
+"""Summary statistics shared by the benchmarks, the evidence index and hedging.
+
+Percentiles interpolate linearly between ranks; every helper returns ``None``
+for an empty sample instead of raising.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Sequence
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> float | None:
+    """Linear-interpolated percentile (``q`` in 0-100); ``None`` for an empty sample."""
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def median(values: Sequence[float]) -> float | None:
+    return percentile(values, 50)
+
+
+def distribution(values: Sequence[float]) -> Dict[str, float] | None:
+    if not values:
+        return None
+    summary = {f"p{q}": round(percentile(values, q) or 0.0, 4) for q in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values), 4)
+    summary["min"] = round(min(values), 4)
+    summary["max"] = round(max(values), 4)
+    return summary
+
+
+def rate(count: Any, duration_ns: Any) -> float | None:
+    """Tokens per second from an Ollama ``*_count`` and its ``*_duration`` in nanoseconds."""
+
+    if not isinstance(count, (int, float)) or not isinstance(duration_ns, (int, float)) or duration_ns <= 0 or count <= 0:
+        return None
+    return count / (duration_ns / 1e9)
@@ -1,26 +1,75 @@
 #!/usr/bin/env python3
-"""Utility for polling HTTP endpoints until they report healthy."""
+"""Utility for polling HTTP endpoints until they report healthy.
+
+All URLs are polled concurrently with exponential backoff and jitter.  The
+command returns as soon as every endpoint is healthy, or once ``--deadline``
+expires, and prints a JSON report with each URL's time-to-healthy on stdout.
+Progress messages go to stderr so the report can be piped into other tools.
+
+An HTTP 200 from Ollama only means the server is up, not that any model is
+in memory.  With ``--model`` (repeatable) the command also waits until
+``/api/tags`` on ``--ollama-url`` lists every required model, and with
+``--warm`` it then loads them all in parallel (an empty generate with
+``--keep-alive``) so the first real request does not pay a cold load.  Each
+model's ``load_duration`` is part of the report.  The model checks are
+skipped once any URL failed to become healthy::
+
+    python scripts/wait_for_http.py http://localhost:11434/api/version --model llama3.1:8b --warm
+"""
 
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import random
 import sys
 import time
-import urllib.error
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Sequence
+
+from chain_prefetch import load_model
+from chain_router import ReplicaUnavailable
+from http_pool import HttpConnectionError, HttpError, HttpStatusError, default_pool
+
+DEFAULT_OLLAMA_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+
+
+@dataclass
+class PollResult:
+    """Outcome of polling a single URL."""
+
+    url: str
+    healthy: bool
+    attempts: int
+    time_to_healthy: float | None
+    last_error: str | None = None
 
 
-def parse_args() -> argparse.Namespace:
+@dataclass
+class ModelReadiness:
+    """Whether a required model is installed and, with ``--warm``, loaded."""
+
+    model: str
+    present: bool
+    warm: bool | None = None  # None when no warm-up was requested.
+    load_duration_s: float | None = None
+    warm_s: float | None = None
+    error: str | None = None
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
-            "Poll one or more HTTP endpoints until they respond successfully. "
+            "Poll one or more HTTP endpoints concurrently until they respond successfully. "
             "A response status in the 200-399 range is treated as healthy."
         )
     )
     parser.add_argument(
         "urls",
         metavar="URL",
-        nargs="+",
+        nargs="*",
         help="HTTP endpoint(s) to poll",
     )
     parser.add_argument(
@@ -33,7 +82,24 @@ def parse_args() -> argparse.Namespace:
         "--delay",
         type=float,
         default=5.0,
-        help="Seconds to wait between attempts (default: %(default)s)",
+        help="Initial backoff in seconds between attempts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=30.0,
+        help="Upper bound for the exponential backoff in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=2.0,
+        help="Multiplier applied to the delay after each failed attempt (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Overall time budget in seconds shared by all URLs (default: limited by --retries only)",
     )
     parser.add_argument(
         "--timeout",
@@ -41,43 +107,229 @@ def parse_args() -> argparse.Namespace:
         default=5.0,
         help="Per-request timeout in seconds (default: %(default)s)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--model",
+        action="append",
+        default=[],
+        help="Model that must be listed by /api/tags before the command succeeds (repeatable)",
+    )
+    parser.add_argument(
+        "--ollama-url",
+        default=DEFAULT_OLLAMA_URL,
+        help="Ollama endpoint checked for --model (default: $OLLAMA_BASE_URL or %(default)s)",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Load every --model in parallel and return only once all of them are in memory",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default="30m",
+        help="keep_alive sent with the --warm requests so the models stay loaded (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--warm-timeout",
+        type=float,
+        default=600.0,
+        help="Timeout in seconds for loading one model with --warm (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if not args.urls and not args.model:
+        parser.error("give at least one URL or --model")
+    if args.retries < 1:
+        parser.error("--retries must be at least 1")
+    if args.backoff < 1.0:
+        parser.error("--backoff must be at least 1.0")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline must be positive")
+    return args
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
 
 
-def request_ok(url: str, timeout: float) -> bool:
-    request = urllib.request.Request(url)
+def probe(url: str, timeout: float) -> str | None:
+    """Return ``None`` when ``url`` is healthy, otherwise a short failure description."""
+
     try:
-        with urllib.request.urlopen(request, timeout=timeout) as response:  # noqa: S310
-            return 200 <= response.status < 400
-    except urllib.error.HTTPError as exc:
-        print(f"{url} responded with HTTP {exc.code}")
-        return False
-    except urllib.error.URLError as exc:
-        print(f"{url} not reachable: {exc.reason}")
-        return False
+        response = default_pool().request("GET", url, timeout=timeout)
+    except HttpStatusError as exc:
+        return f"responded with HTTP {exc.status}"
+    except HttpConnectionError as exc:
+        return f"not reachable: {exc.reason}"
     except ConnectionError as exc:
-        print(f"{url} connection error: {exc}")
-        return False
+        return f"connection error: {exc}"
+    if 200 <= response.status < 400:
+        return None
+    return f"responded with HTTP {response.status}"
+
+
+def backoff_delay(attempt: int, delay: float, max_delay: float, factor: float, rng: random.Random) -> float:
+    """Exponential backoff with "equal jitter": half fixed, half random."""
 
+    ceiling = min(max_delay, delay * factor ** (attempt - 1))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
 
-def poll_url(url: str, retries: int, delay: float, timeout: float) -> bool:
-    for attempt in range(1, retries + 1):
-        if request_ok(url, timeout):
-            print(f"{url} healthy after {attempt} attempt(s)")
-            return True
+
+def poll_url(
+    url: str,
+    retries: int,
+    delay: float,
+    timeout: float,
+    max_delay: float = 30.0,
+    factor: float = 2.0,
+    deadline: float | None = None,
+    rng: random.Random | None = None,
+    check: Callable[[str, float], str | None] = probe,
+) -> PollResult:
+    """Poll ``url`` until healthy, ``retries`` is exhausted or the monotonic ``deadline`` passes.
+
+    ``check`` returns ``None`` when healthy and a failure description otherwise.
+    """
+
+    rng = rng or random.Random()
+    started = time.monotonic()
+    last_error: str | None = None
+    attempt = 0
+    while attempt < retries:
+        attempt += 1
+        request_timeout = timeout
+        if deadline is not None:
+            request_timeout = min(timeout, max(deadline - time.monotonic(), 0.001))
+        last_error = check(url, request_timeout)
+        if last_error is None:
+            elapsed = time.monotonic() - started
+            log(f"{url} healthy after {attempt} attempt(s) in {elapsed:.2f}s")
+            return PollResult(url, True, attempt, round(elapsed, 3))
+        log(f"{url} {last_error}")
         if attempt == retries:
             break
-        time.sleep(delay)
-    print(f"{url} failed health check after {retries} attempt(s)")
-    return False
+        pause = backoff_delay(attempt, delay, max_delay, factor, rng)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            pause = min(pause, remaining)
+        time.sleep(pause)
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+    log(f"{url} failed health check after {attempt} attempt(s)")
+    return PollResult(url, False, attempt, None, last_error)
+
+
+def poll_all(args: argparse.Namespace, deadline: float | None = None) -> List[PollResult]:
+    urls = list(dict.fromkeys(args.urls))
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        futures = [
+            executor.submit(
+                poll_url,
+                url,
+                args.retries,
+                args.delay,
+                args.timeout,
+                args.max_delay,
+                args.backoff,
+                deadline,
+            )
+            for url in urls
+        ]
+        return [future.result() for future in futures]
+
+
+def model_listed(required: str, available: Sequence[str]) -> bool:
+    """Match Ollama's naming: a model without a tag means ``:latest``."""
+
+    wanted = required if ":" in required else f"{required}:latest"
+    return required in available or wanted in available
+
+
+def missing_models(tags_url: str, models: Sequence[str], timeout: float) -> str | None:
+    """Health check for :func:`poll_url`: ``None`` once ``/api/tags`` lists every model."""
+
+    try:
+        listed = json.loads(default_pool().request("GET", tags_url, timeout=timeout).text()).get("models") or []
+    except HttpStatusError as exc:
+        return f"responded with HTTP {exc.status}"
+    except HttpConnectionError as exc:
+        return f"not reachable: {exc.reason}"
+    except (ConnectionError, ValueError, AttributeError) as exc:
+        return f"unusable response: {exc}"
+    available = [str(entry.get("name") or entry.get("model")) for entry in listed if isinstance(entry, dict)]
+    missing = [model for model in models if not model_listed(model, available)]
+    return f"missing model(s): {', '.join(missing)}" if missing else None
+
+
+def warm_model(base_url: str, model: str, keep_alive: str, timeout: float) -> ModelReadiness:
+    """Load ``model`` via :func:`chain_prefetch.load_model` and report Ollama's ``load_duration``."""
+
+    started = time.monotonic()
+    try:
+        load = round(load_model(base_url, model, keep_alive, timeout), 3)
+    except HttpStatusError as exc:
+        return ModelReadiness(model, True, warm=False, error=f"HTTP {exc.status}: {exc.body.decode('utf-8', errors='ignore')}")
+    except (HttpError, ReplicaUnavailable, OSError, ValueError) as exc:
+        return ModelReadiness(model, True, warm=False, error=str(exc))
+    elapsed = round(time.monotonic() - started, 3)
+    log(f"{model} warm after {elapsed:.2f}s (load_duration {load}s)")
+    return ModelReadiness(model, True, warm=True, load_duration_s=load, warm_s=elapsed)
+
+
+def wait_for_models(args: argparse.Namespace, deadline: float | None = None) -> Dict[str, object]:
+    """Wait for ``/api/tags`` to list every ``--model``, then warm them in parallel if requested."""
+
+    base_url = args.ollama_url.rstrip("/")
+    models = list(dict.fromkeys(args.model))
+    tags = poll_url(
+        f"{base_url}/api/tags",
+        args.retries,
+        args.delay,
+        args.timeout,
+        args.max_delay,
+        args.backoff,
+        deadline,
+        check=lambda url, timeout: missing_models(url, models, timeout),
+    )
+    if not tags.healthy:
+        readiness = [ModelReadiness(model, False, error=tags.last_error) for model in models]
+    elif args.warm:
+        timeout = args.warm_timeout
+        if deadline is not None:
+            timeout = min(timeout, max(deadline - time.monotonic(), 0.001))
+        with ThreadPoolExecutor(max_workers=len(models)) as executor:
+            readiness = list(executor.map(lambda model: warm_model(base_url, model, args.keep_alive, timeout), models))
+    else:
+        readiness = [ModelReadiness(model, True) for model in models]
+    return {
+        "ollama_url": base_url,
+        "ready": all(entry.present and entry.warm is not False for entry in readiness),
+        "tags": asdict(tags),
+        "models": [asdict(entry) for entry in readiness],
+    }
 
 
-def main() -> int:
-    args = parse_args()
-    all_healthy = True
-    for url in args.urls:
-        healthy = poll_url(url=url, retries=args.retries, delay=args.delay, timeout=args.timeout)
-        all_healthy = all_healthy and healthy
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv)
+    started = time.monotonic()
+    deadline = started + args.deadline if args.deadline is not None else None
+    results = poll_all(args, deadline) if args.urls else []
+    urls_healthy = all(result.healthy for result in results)
+    models = None
+    if args.model and urls_healthy:
+        models = wait_for_models(args, deadline)
+    elif args.model:
+        log("Skipping the --model checks because not every URL is healthy.")
+    all_healthy = urls_healthy and (models is None or bool(models["ready"]))
+    report: Dict[str, object] = {
+        "healthy": all_healthy,
+        "elapsed_s": round(time.monotonic() - started, 3),
+        "deadline_s": args.deadline,
+        "urls": [asdict(result) for result in results],
+    }
+    if models is not None:
+        report["readiness"] = models
+    print(json.dumps(report, indent=2))
     return 0 if all_healthy else 1
 
 
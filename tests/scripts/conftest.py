@@ -0,0 +1,175 @@
+"""Shared fixtures for the Python helper scripts under ``scripts/``.
+
+The helpers are standalone CLIs rather than an installed package, so the
+directory is added to ``sys.path`` here.  ``ollama_stub`` starts a tiny local
+HTTP server that mimics the parts of the Ollama API the scripts rely on and
+records the request bodies; ``ollama_standin`` starts the record/replay
+stand-in from ``scripts/ollama_standin.py`` for timing-sensitive tests.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+SCRIPTS_DIR = ROOT / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+class StubState:
+    """Records requests and holds the canned reply served by the stub."""
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, object]] = []
+        self.chunks: List[str] = ["Hallo", " ", "Welt"]
+        self.chunks_by_model: Dict[object, List[str]] = {}
+        self.resident: set[object] = set()
+        self.load_duration_ns = 2_000_000_000
+        self.last_rendered: Dict[object, str] = {}
+        self.response_delay = 0.0  # Seconds each generation takes, to make overlapping requests observable.
+        self.delay_by_model: Dict[object, float] = {}
+        self.reply: Callable[[Dict[str, object]], str] | None = None  # Computes non-streamed replies from the request.
+        self.tags: List[str] = []  # Models listed by /api/tags.
+        self.timing: Callable[[Dict[str, object]], Dict[str, int]] | None = None  # Overrides metrics per request.
+
+    def prompt_eval_count_for(self, model: object, payload: Dict[str, object]) -> int:
+        """Mimic Ollama's prompt cache: only characters past the shared prefix are evaluated."""
+
+        if "messages" in payload:
+            rendered = "".join(f"<{m['role']}>{m['content']}" for m in payload["messages"])  # type: ignore[index,union-attr]
+        else:
+            rendered = str(payload.get("prompt", ""))
+        previous = self.last_rendered.get(model, "")
+        shared = 0
+        for left, right in zip(previous, rendered):
+            if left != right:
+                break
+            shared += 1
+        self.last_rendered[model] = rendered
+        return len(rendered) - shared
+
+    def load_duration_for(self, model: object) -> int:
+        """Report a cold load the first time a model is used after start-up or an unload."""
+
+        if model in self.resident:
+            return 0
+        self.resident.add(model)
+        return self.load_duration_ns
+
+    def chunks_for(self, model: object) -> List[str]:
+        return self.chunks_by_model.get(model, self.chunks)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state: StubState
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler.
+        return
+
+    def _send_json(self, status: int, payload: Dict[str, object]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming.
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name, "model": name} for name in list(self.state.tags)]})
+            return
+        self._send_json(200, {"status": "ok"})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming.
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self.state.requests.append({"path": self.path, "body": payload})
+        model = payload.get("model")
+        if payload.get("keep_alive") == 0:
+            self.state.resident.discard(model)
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        if payload.get("prompt") == "" and "messages" not in payload:
+            load = self.state.load_duration_for(model)
+            self._send_json(200, {"model": model, "response": "", "done": True, "load_duration": load})
+            return
+        time.sleep(self.state.delay_by_model.get(model, self.state.response_delay))
+        metrics = {
+            "done": True,
+            "load_duration": self.state.load_duration_for(model),
+            "prompt_eval_count": self.state.prompt_eval_count_for(model, payload),
+            "prompt_eval_duration": 1_000_000,
+            "eval_count": len(self.state.chunks_for(model)),
+            "eval_duration": 1_000_000 * len(self.state.chunks_for(model)),
+        }
+        if self.state.timing:
+            metrics.update(self.state.timing(payload))
+        metrics["total_duration"] = metrics["load_duration"] + metrics["prompt_eval_duration"] + metrics["eval_duration"]
+        chat = self.path.endswith("/api/chat")
+        if payload.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for fragment in self.state.chunks_for(model):
+                self._write_chunk(dict(self._text(chat, fragment), model=model, done=False))
+            self._write_chunk(dict(self._text(chat, ""), model=model, **metrics))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        text = self.state.reply(payload) if self.state.reply else "".join(self.state.chunks_for(model))
+        self._send_json(200, dict(self._text(chat, text), model=model, **metrics))
+
+    @staticmethod
+    def _text(chat: bool, text: str) -> Dict[str, object]:
+        if chat:
+            return {"message": {"role": "assistant", "content": text}}
+        return {"response": text}
+
+    def _write_chunk(self, payload: Dict[str, object]) -> None:
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def ollama_stub() -> Iterator[tuple[str, StubState]]:
+    state = StubState()
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def ollama_standin() -> Iterator[Callable[..., tuple[str, Any]]]:
+    """Start :class:`ollama_standin.StandIn` servers that are closed after the test."""
+
+    from ollama_standin import Cassette, StandIn
+
+    started: List[StandIn] = []
+
+    def start(cassette: Cassette | None = None, config: Any = None, upstream: str | None = None, cassette_path: Path | None = None) -> tuple[str, StandIn]:
+        standin = StandIn(cassette or Cassette(), config, upstream, cassette_path)
+        started.append(standin)
+        return standin.start(), standin
+
+    try:
+        yield start
+    finally:
+        for standin in started:
+            standin.close()
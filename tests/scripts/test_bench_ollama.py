@@ -0,0 +1,88 @@
+"""Tests for ``scripts/bench_ollama.py``."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import bench_ollama
+
+
+def test_parse_levels_sorts_and_rejects_invalid_values() -> None:
+    assert bench_ollama.parse_levels("8,1,2,2") == [1, 2, 8]
+    with pytest.raises(Exception):
+        bench_ollama.parse_levels("0,2")
+
+
+def test_benchmark_sweeps_levels_against_stub(ollama_stub, tmp_path: Path, monkeypatch, capsys) -> None:
+    url, state = ollama_stub
+    prompt_file = tmp_path / "prompt.txt"
+    prompt_file.write_text("Erkläre Keep-Alive.", encoding="utf-8")
+    env_file = tmp_path / ".env"
+    env_file.write_text(f"OLLAMA_BENCH_MODEL=bench-model\nOLLAMA_BENCH_PROMPT={prompt_file}\n", encoding="utf-8")
+    for key in ("OLLAMA_BENCH_MODEL", "OLLAMA_BENCH_PROMPT", "EVIDENCE_ROOT"):
+        monkeypatch.delenv(key, raising=False)
+
+    exit_code = bench_ollama.main(
+        [
+            "--base-url", url,
+            "--concurrency", "1,4",
+            "--requests", "3",
+            "--warmup",
+            "--env-file", str(env_file),
+            "--output-root", str(tmp_path / "evidence"),
+        ]
+    )
+
+    assert exit_code == 0
+    [run_dir] = (tmp_path / "evidence" / "benchmarks").iterdir()
+    assert run_dir.name.startswith("bench-bench-model-")
+    report = json.loads((run_dir / "summary.json").read_text(encoding="utf-8"))
+    assert report["model"] == "bench-model"
+    assert report["warmup"]["load_s"] == pytest.approx(2.0)
+    assert [level["concurrency"] for level in report["levels"]] == [1, 4]
+    assert [level["requests"] for level in report["levels"]] == [3, 4], "a level sends at least one request per worker"
+    first = report["levels"][0]
+    assert first["errors"] == 0
+    assert set(first["latency_s"]) >= {"p50", "p95", "p99"}
+    assert first["ttft_s"]["p50"] <= first["latency_s"]["p50"]
+    assert first["decode_tps"]["p50"] == pytest.approx(1000.0)
+    assert len(state.requests) == 1 + 3 + 4
+    assert len(report["provenance"]["host"]) == 12, "runs carry the host fingerprint the evidence index keys on"
+    assert "| Concurrency |" in (run_dir / "report.md").read_text(encoding="utf-8")
+    assert "Benchmark artifacts saved to" in capsys.readouterr().out
+
+
+def test_benchmark_fails_when_a_whole_level_fails(ollama_stub, tmp_path: Path, monkeypatch, capsys) -> None:
+    url, _ = ollama_stub
+    prompt_file = tmp_path / "prompt.txt"
+    prompt_file.write_text("Hallo", encoding="utf-8")
+    measure = bench_ollama.measure
+
+    def overloaded(base_url, model, prompt, timeout, pool, concurrency=1, index=0):
+        if concurrency > 1:
+            return bench_ollama.Sample(concurrency, index, ok=False, wall_s=0.0, error="HTTP 503")
+        return measure(base_url, model, prompt, timeout, pool, concurrency, index)
+
+    monkeypatch.setattr(bench_ollama, "measure", overloaded)
+    exit_code = bench_ollama.main(
+        [
+            "--base-url", url,
+            "--model", "m",
+            "--prompt-file", str(prompt_file),
+            "--concurrency", "1,2",
+            "--requests", "2",
+            "--env-file", str(tmp_path / "missing.env"),
+            "--output-root", str(tmp_path / "evidence"),
+        ]
+    )
+
+    assert exit_code == 1, "one level with no successful request fails the run"
+    assert "every request failed at concurrency 2" in capsys.readouterr().err
+
+
+def test_benchmark_requires_model(tmp_path: Path, monkeypatch, capsys) -> None:
+    monkeypatch.delenv("OLLAMA_BENCH_MODEL", raising=False)
+    assert bench_ollama.main(["--env-file", str(tmp_path / "missing.env")]) == 1
+    assert "OLLAMA_BENCH_MODEL" in capsys.readouterr().err
@@ -0,0 +1,61 @@
+"""Tests for the ollama_chain response cache in ``scripts/chain_cache.py``."""
+from __future__ import annotations
+
+import os
+
+import chain_cache
+import ollama_chain
+
+
+def test_cache_key_covers_prompt_and_options() -> None:
+    base = chain_cache.cache_key("m", "http://a", "prompt")
+    assert base == chain_cache.cache_key("m", "http://a", "prompt", {})
+    assert base != chain_cache.cache_key("m", "http://a", "prompt!")
+    assert base != chain_cache.cache_key("m", "http://b", "prompt")
+    assert base != chain_cache.cache_key("m", "http://a", "prompt", {"num_ctx": 4096})
+
+
+def test_lru_eviction_respects_size_cap(tmp_path) -> None:
+    cache = chain_cache.ResponseCache(tmp_path, max_bytes=600)
+    try:
+        for name in ("a", "b", "c"):
+            cache.put(name, "m", "http://x", {"response": os.urandom(200).hex()})
+            if name == "b":
+                assert cache.get("a") is not None  # Touch "a" so "b" becomes the LRU entry.
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.evictions >= 1
+        assert cache.info().size_bytes <= 600
+    finally:
+        cache.close()
+
+
+def test_chain_reuses_cached_stages(ollama_stub, tmp_path, capsys) -> None:
+    url, state = ollama_stub
+    argv = ["--prompt", "Start", "--step", f"a@{url}", "--step", f"b@{url}", "--cache-dir", str(tmp_path)]
+
+    assert ollama_chain.main(argv) == 0
+    assert ollama_chain.main(argv[:-2] + ["--step", f"c@{url}", "--cache-dir", str(tmp_path)]) == 0
+
+    models = [entry["body"]["model"] for entry in state.requests]
+    assert models == ["a", "b", "c"], "earlier stages must come from the cache on the second run"
+    assert "Cache: 2 hit(s), 1 miss(es)" in capsys.readouterr().out
+
+
+def test_no_cache_flag_bypasses_cache(ollama_stub, tmp_path) -> None:
+    url, state = ollama_stub
+    argv = ["--prompt", "Start", "--step", f"a@{url}", "--cache-dir", str(tmp_path), "--no-cache"]
+    assert ollama_chain.main(argv) == 0
+    assert ollama_chain.main(argv) == 0
+    assert len(state.requests) == 2
+
+
+def test_cli_stats_and_purge(tmp_path, capsys) -> None:
+    cache = chain_cache.ResponseCache(tmp_path)
+    cache.put("k", "m", "http://x", {"response": "r"})
+    cache.close()
+
+    assert chain_cache.main(["--cache-dir", str(tmp_path), "stats"]) == 0
+    assert "Entries:         1" in capsys.readouterr().out
+    assert chain_cache.main(["--cache-dir", str(tmp_path), "purge"]) == 0
+    assert "Removed 1 cache entry" in capsys.readouterr().out
@@ -0,0 +1,85 @@
+"""Tests for DAG pipelines in ``scripts/chain_dag.py``."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+
+import chain_dag
+import ollama_chain
+
+
+def node(node_id: str, endpoint: str = "http://a", inputs: list[str] | None = None) -> chain_dag.PipelineNode:
+    return chain_dag.PipelineNode(node_id, ollama_chain.Step("m", endpoint), inputs or [])
+
+
+def test_build_pipeline_rejects_cycles_and_unknown_inputs() -> None:
+    with pytest.raises(ValueError, match="cycle"):
+        chain_dag.build_pipeline([node("a", inputs=["b"]), node("b", inputs=["a"])])
+    with pytest.raises(ValueError, match="unknown"):
+        chain_dag.build_pipeline([node("a", inputs=["missing"])])
+
+
+def test_chained_nodes_see_every_previous_node() -> None:
+    pipeline = chain_dag.build_pipeline([node("step1"), node("step2", inputs=["step1"]), node("step3", inputs=["step2"])])
+    assert pipeline.ancestors == {"step1": [], "step2": ["step1"], "step3": ["step1", "step2"]}
+
+
+def test_schedule_runs_branches_in_parallel_with_endpoint_cap() -> None:
+    pipeline = chain_dag.build_pipeline(
+        [
+            node("root", "http://a"),
+            node("left", "http://b", ["root"]),
+            node("right", "http://c", ["root"]),
+            node("extra", "http://c", ["root"]),
+            node("join", "http://a", ["left", "right", "extra"]),
+        ]
+    )
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def run_node(current: chain_dag.PipelineNode, outputs: dict[str, str]) -> str:
+        with lock:
+            active[current.endpoint] = active.get(current.endpoint, 0) + 1
+            peak[current.endpoint] = max(peak.get(current.endpoint, 0), active[current.endpoint])
+        time.sleep(0.05)
+        with lock:
+            active[current.endpoint] -= 1
+        return "+".join(outputs[name] for name in current.inputs) or current.id
+
+    started = time.perf_counter()
+    results = chain_dag.schedule(pipeline, run_node, max_per_endpoint=1)
+    wall = time.perf_counter() - started
+
+    assert results["join"].output == "root+root+root"
+    assert peak == {"http://a": 1, "http://b": 1, "http://c": 1}
+    assert wall < 0.05 * 5, "left and right must overlap"
+    assert chain_dag.critical_path(pipeline, results)[0] == "root"
+    assert chain_dag.critical_path(pipeline, results)[-1] == "join"
+
+
+def test_chain_runs_pipeline_file_with_fan_in(ollama_stub, tmp_path, capsys) -> None:
+    url, state = ollama_stub
+    definition = {
+        "prompt": "Baue eine API",
+        "nodes": [
+            {"id": "coder", "step": f"coder@{url}#Implementiere"},
+            {"id": "review", "model": "reviewer", "endpoint": url, "directive": "Prüfe", "inputs": ["coder"]},
+            {"id": "docs", "step": f"writer@{url}#Dokumentiere", "inputs": ["coder"]},
+            {"id": "final", "step": f"lead@{url}", "inputs": ["docs", "review"]},
+        ],
+    }
+    pipeline_file = tmp_path / "pipeline.json"
+    pipeline_file.write_text(json.dumps(definition), encoding="utf-8")
+
+    assert ollama_chain.main(["--pipeline", str(pipeline_file), "--concurrency", "2"]) == 0
+
+    final_prompt = next(entry["body"]["prompt"] for entry in state.requests if entry["body"]["model"] == "lead")
+    positions = [final_prompt.index(f"### {name}\n") for name in ("User Prompt", "coder", "review", "docs")]
+    assert positions == sorted(positions), "fan-in inputs are merged in file order"
+    assert "### Task for lead\n" + ollama_chain.DEFAULT_DIRECTIVE in final_prompt
+    output = capsys.readouterr().out
+    assert "Critical path: coder -> " in output and "-> final" in output
@@ -0,0 +1,130 @@
+"""Tests for ``scripts/chain_deadline.py`` and the ``--deadline`` options of ``ollama_chain``."""
+from __future__ import annotations
+
+import json
+import time
+from typing import List
+
+import pytest
+
+import chain_prefetch
+import ollama_chain
+from chain_deadline import DeadlineBudget, DeadlineExceeded, StageWatch
+from chain_journal import StageJournal, read_records
+from ollama_standin import ReplayConfig
+
+
+def test_budget_splits_what_is_left_across_remaining_stages() -> None:
+    now: List[float] = [100.0]
+    budget = DeadlineBudget(60.0, clock=lambda: now[0])
+    assert budget.share(3) == pytest.approx(20.0)
+    now[0] += 5.0  # The first stage finished early ...
+    assert budget.share(2) == pytest.approx(27.5), "... so its slack goes to the later stages"
+    now[0] += 60.0
+    assert budget.share(1) == 0.0
+    with pytest.raises(DeadlineExceeded, match="used up before the stage started"):
+        budget.watch("Step 3", budget.share(1))
+    assert DeadlineBudget(None, idle_s=5.0).share(2) is None
+
+
+def test_watch_cancels_on_budget_and_on_idle_gaps_only_after_the_first_token() -> None:
+    with StageWatch(0.1, None) as watch:
+        cancel = watch.attach()
+        time.sleep(0.3)
+    assert cancel.cancelled and watch.reason == "deadline"
+    assert "budget of 0.10s" in cancel.reason
+
+    with StageWatch(None, 0.1) as watch:
+        cancel = watch.attach()
+        time.sleep(0.25)
+        assert not cancel.cancelled, "the idle limit does not cover model load and prefill"
+        forward = watch.wrap(None)
+        for _ in range(4):
+            forward("x")
+            time.sleep(0.02)
+        time.sleep(0.3)
+    assert cancel.cancelled and watch.reason == "idle" and watch.text == "xxxx"
+    assert watch.attach().cancelled, "requests started after the watch fired are cancelled at once"
+
+    with StageWatch(5.0, 1.0) as watch:
+        cancel = watch.attach()
+    assert not cancel.cancelled and watch.reason is None
+
+
+def test_chain_deadline_cancels_the_stage_and_frees_the_server(ollama_standin, capsys) -> None:
+    url, standin = ollama_standin(config=ReplayConfig(token_rate=20, synthetic_tokens=200))
+
+    started = time.perf_counter()
+    exit_code = ollama_chain.main(["--prompt", "Hallo", "--step", f"m1@{url}", "--step", f"m2@{url}", "--deadline", "1"])
+
+    assert exit_code == 1
+    assert time.perf_counter() - started < 3, "the 10 s generation is cut off at its share of the deadline"
+    captured = capsys.readouterr()
+    assert "Step 1 (m1) cancelled after 0.5" in captured.err and "stage budget of 0.50s used up" in captured.err
+    assert "=== Deadline ===" in captured.out and "Step 1 (m1): 0.5" in captured.out and "(deadline), cancelled" in captured.out
+    for _ in range(50):
+        if standin.stats["in_flight"] == 0:
+            break
+        time.sleep(0.05)
+    assert standin.stats["in_flight"] == 0, "closing the connection ends the generation on the server"
+
+
+def test_keep_partial_passes_the_partial_reply_on(ollama_standin, tmp_path, capsys) -> None:
+    url, _ = ollama_standin(config=ReplayConfig(token_rate=40, synthetic_tokens=400))
+    metrics_dir = tmp_path / "metrics"
+    journal, transcript = tmp_path / "run.jsonl", tmp_path / "run.md"
+
+    exit_code = ollama_chain.main(
+        [
+            "--prompt", "Hallo",
+            "--step", f"m1@{url}",
+            "--step", f"m2@{url}",
+            "--deadline", "1.2",
+            "--on-deadline", "keep-partial",
+            "--metrics-dir", str(metrics_dir),
+            "--journal", str(journal),
+            "--transcript", str(transcript),
+        ]
+    )
+
+    assert exit_code == 0
+    output = capsys.readouterr().out
+    assert "--- Response (partial, stage budget of 0.60s used up) ---" in output
+    assert output.count("passing on the partial reply") == 2
+    [report] = metrics_dir.glob("chain-*.json")
+    deadline = json.loads(report.read_text(encoding="utf-8"))["deadline"]
+    assert deadline["deadline_s"] == 1.2 and deadline["used_s"] < 1.6
+    assert [stage["outcome"] for stage in deadline["stages"]] == ["deadline", "deadline"]
+    assert all(stage["kept_chars"] > 0 for stage in deadline["stages"])
+    assert deadline["stages"][1]["allotted_s"] == pytest.approx(1.2 - deadline["stages"][0]["used_s"], abs=0.05)
+    stages = [record for _, record in read_records(journal) if record["type"] == "stage"]
+    assert [stage.get("partial") for stage in stages] == [True, True]
+    assert "## Step 1 (m1) (partial)" in transcript.read_text(encoding="utf-8")
+    resumed = StageJournal(journal, "Hallo", resume=True)
+    try:
+        assert resumed.lookup(stages[0]["inputs_hash"]) is None, "a resume generates cut-off stages again"
+        assert stages[0]["inputs_hash"] in resumed.partial
+    finally:
+        resumed.close()
+
+
+def test_summaries_and_prefetch_waits_stay_within_the_deadline(ollama_stub, monkeypatch) -> None:
+    url, state = ollama_stub
+    state.delay_by_model["sum"] = 2.0
+    args = ollama_chain.build_parser().parse_args(["--history-budget", "100", "--summarizer", f"sum@{url}"])
+    budget = DeadlineBudget(0.3)
+    window = ollama_chain.make_window(args, None, {}, budget)
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="Summary of Step 1"):
+        window.summariser("Step 1", "lorem " * 500)
+    assert time.perf_counter() - started < 1.5
+    assert [(stage.label, stage.outcome) for stage in budget.stages] == [("Summary of Step 1", "deadline")]
+
+    monkeypatch.setattr(chain_prefetch, "load_model", lambda *args: time.sleep(1.0) or 1.0)
+    prefetcher = chain_prefetch.Prefetcher("5m", 5.0)
+    try:
+        prefetcher.schedule(url, "m2")
+        load = prefetcher.collect(url, "m2", 0.1)
+        assert load.prefetched and load.exposed < 0.5
+    finally:
+        prefetcher.close()
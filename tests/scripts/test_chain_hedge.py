@@ -0,0 +1,99 @@
+"""Tests for hedged and raced stages in ``scripts/chain_hedge.py``."""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import chain_hedge
+import ollama_chain
+from http_pool import Cancellation, RequestCancelled
+
+
+def stalled(forward, cancel: Cancellation):
+    while not cancel.cancelled:
+        time.sleep(0.005)
+    raise RequestCancelled("http://stalled", cancel.reason)
+
+
+def answering(text: str, after: float):
+    def launch(forward, cancel: Cancellation):
+        time.sleep(after)
+        forward(text)
+        return text, None
+
+    return launch
+
+
+def test_parse_hedge_after_and_learned_percentile(tmp_path: Path) -> None:
+    assert chain_hedge.parse_hedge_after("2.5") == (2.5, None)
+    assert chain_hedge.parse_hedge_after("P95") == (None, 95.0)
+    with pytest.raises(ValueError, match="percentile"):
+        chain_hedge.parse_hedge_after("p100")
+
+    history = chain_hedge.TtftHistory(tmp_path / "ttft.json")
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        history.record("m@a", seconds)
+    assert history.percentile("m@a", 95) is None, "too few samples to learn from"
+    history.record("m@a", 2.0)
+    assert history.percentile("m@a", 50) == pytest.approx(0.3)
+    assert history.expected_beyond("m@a", 0.35) == pytest.approx(1.2)
+    history.save()
+    assert chain_hedge.TtftHistory(tmp_path / "ttft.json").count("m@a") == 5
+
+
+def test_hedge_fires_after_delay_and_cancels_the_loser() -> None:
+    tokens: list[str] = []
+    started = time.perf_counter()
+    outcome = chain_hedge.run_hedged([stalled, answering("fast", 0.0)], ["slow", "fast"], 0.05, tokens.append)
+    assert time.perf_counter() - started < 1.0
+    assert outcome.winner == 1 and outcome.hedge_won and outcome.result[0] == "fast"
+    assert tokens == ["fast"]
+    assert outcome.fired_after and outcome.fired_after[0] >= 0.05
+    assert 0 in outcome.waited
+
+    quick = chain_hedge.run_hedged([answering("primary", 0.0), stalled], ["a", "b"], 5.0)
+    assert quick.winner == 0 and not quick.fired and quick.launched == 1
+
+
+def test_failed_primary_triggers_hedge_and_race_keeps_first_finisher() -> None:
+    def broken(forward, cancel):
+        raise RuntimeError("primary down")
+
+    outcome = chain_hedge.run_hedged([broken, answering("backup", 0.0)], ["a", "b"], None)
+    assert outcome.winner == 1
+
+    with pytest.raises(RuntimeError, match="primary down"):
+        chain_hedge.run_hedged([broken], ["a"], None)
+
+    race = chain_hedge.run_hedged([answering("slow", 0.3), answering("fast", 0.0), stalled], ["a", "b", "c"], None, race=True)
+    assert race.winner == 1 and race.launched == 3 and race.fired_after == []
+
+
+def test_chain_hedges_slow_model_to_fallback(ollama_stub, tmp_path: Path, capsys) -> None:
+    base_url, state = ollama_stub
+    state.delay_by_model["slow"] = 3.0
+    state.chunks_by_model["fast"] = ["schnell"]
+    history = tmp_path / "ttft.json"
+
+    started = time.perf_counter()
+    exit_code = ollama_chain.main(
+        [
+            "--prompt", "Hallo",
+            "--step", f"slow@{base_url}",
+            "--hedge-after", "0.2",
+            "--hedge-to", "fast",
+            "--stream",
+            "--hedge-history", str(history),
+        ]
+    )
+    assert exit_code == 0
+    assert time.perf_counter() - started < 2.5, "the stalled primary must not hold up the stage"
+    output = capsys.readouterr().out
+    assert "schnell" in output
+    assert f"fast@{base_url} answered first" in output
+    assert "Hedges fired in 1/1 stage(s) (100%), won 1" in output
+    samples = json.loads(history.read_text(encoding="utf-8"))
+    assert set(samples) == {f"slow@{base_url}", f"fast@{base_url}"}
@@ -0,0 +1,60 @@
+"""Tests for the token-budgeted history window in ``scripts/chain_history.py``."""
+from __future__ import annotations
+
+import chain_history
+import ollama_chain
+
+
+def make_sections(count: int, size: int = 400) -> list[tuple[str, str]]:
+    sections = [("User Prompt", "Start")]
+    sections.extend((f"expert-{n}", f"{n}" * size) for n in range(1, count + 1))
+    return sections
+
+
+def test_fit_leaves_history_untouched_within_budget() -> None:
+    window = chain_history.HistoryWindow(budget=10_000)
+    sections = make_sections(3)
+    assert window.fit(sections) == sections
+    assert not window.compacted
+
+
+def test_fit_summarises_oldest_sections_once() -> None:
+    calls: list[str] = []
+
+    def summariser(label: str, text: str) -> str:
+        calls.append(label)
+        return f"summary of {label}"
+
+    window = chain_history.HistoryWindow(budget=150, summariser=summariser, keep_recent=1)
+    first = window.fit(make_sections(3))
+    assert [label for label, _ in first] == ["User Prompt", "expert-1 (summary)", "expert-2 (summary)", "expert-3"]
+
+    second = window.fit(make_sections(4))
+    assert second[:3] == first[:3], "compacted sections must stay stable across stages"
+    assert calls == ["expert-1", "expert-2", "expert-3"]
+    assert window.tokens_saved > 0
+
+
+def test_fit_trims_without_summariser() -> None:
+    window = chain_history.HistoryWindow(budget=200, trim_tokens=20)
+    view = window.fit(make_sections(3))
+    assert view[1][0] == "expert-1 (trimmed)"
+    assert "trimmed" in view[1][1]
+    assert chain_history.estimate_tokens(view[1][1]) < 40
+
+
+def test_chain_summarises_history_beyond_budget(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    state.chunks = ["Antwort " * 100]
+    state.chunks_by_model["sum"] = ["kurz"]
+    argv = ["--prompt", "Start", "--history-budget", "250", "--summarizer", f"sum@{url}"]
+    for name in ("a", "b", "c", "d"):
+        argv += ["--step", f"{name}@{url}"]
+
+    assert ollama_chain.main(argv) == 0
+
+    models = [entry["body"]["model"] for entry in state.requests]
+    assert models.count("sum") == 2, "each compacted section is summarised exactly once"
+    last_prompt = state.requests[-1]["body"]["prompt"]
+    assert "### a (summary)" in last_prompt and "### b (summary)" in last_prompt
+    assert "History window: 2 section(s) compacted" in capsys.readouterr().out
@@ -0,0 +1,90 @@
+"""Tests for resumable chain runs via ``scripts/chain_journal.py``."""
+from __future__ import annotations
+
+import json
+import socket
+from pathlib import Path
+
+import chain_journal
+import ollama_chain
+
+
+def unused_endpoint() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def records(path: Path) -> list[dict]:
+    return [record for _, record in chain_journal.read_records(path)]
+
+
+def test_resume_skips_completed_stages_and_renders_transcript(ollama_stub, tmp_path: Path, capsys) -> None:
+    url, state = ollama_stub
+    journal = tmp_path / "run.jsonl"
+    transcript = tmp_path / "run.md"
+    steps = ["--step", f"a@{url}", "--step", f"b@{url}#Prüfe"]
+
+    failed = ollama_chain.main(["--prompt", "Baue X", *steps, "--step", f"c@{unused_endpoint()}", "--journal", str(journal)])
+
+    assert failed == 1
+    assert [record["type"] for record in records(journal)] == ["run", "stage", "stage"]
+    assert records(journal)[1]["output"] == "Hallo Welt"
+    assert records(journal)[1]["metrics"]["load_duration"] == 2_000_000_000
+
+    state.requests.clear()
+    resumed = ollama_chain.main(
+        ["--prompt", "Baue X", *steps, "--step", f"c@{url}", "--resume", str(journal), "--transcript", str(transcript)]
+    )
+
+    assert resumed == 0
+    assert [entry["body"]["model"] for entry in state.requests] == ["c"]
+    assert "### b\nHallo Welt" in state.requests[0]["body"]["prompt"]
+    assert "Journal: 2 stage(s) resumed, 1 recorded" in capsys.readouterr().out
+    assert [record["type"] for record in records(journal)][3:] == ["run", "reuse", "reuse", "stage"]
+    assert transcript.read_text(encoding="utf-8") == (
+        "# Ollama Chain Transcript\n\n## User Prompt\n\nBaue X\n\n"
+        "## Step 1 (a)\n\nHallo Welt\n\n## Step 2 (b)\n\nHallo Welt\n\n## Step 3 (c)\n\nHallo Welt"
+    )
+
+
+def test_changed_inputs_invalidate_later_stages(ollama_stub, tmp_path: Path) -> None:
+    url, state = ollama_stub
+    journal = tmp_path / "run.jsonl"
+    assert ollama_chain.main(["--prompt", "P", "--step", f"a@{url}", "--step", f"b@{url}", "--journal", str(journal)]) == 0
+
+    state.requests.clear()
+    exit_code = ollama_chain.main(
+        ["--prompt", "P", "--step", f"a@{url}", "--step", f"b@{url}#Anders", "--step", f"c@{url}", "--resume", str(journal)]
+    )
+
+    assert exit_code == 0
+    assert [entry["body"]["model"] for entry in state.requests] == ["b", "c"]
+
+
+def test_resume_ignores_a_torn_last_record(ollama_stub, tmp_path: Path) -> None:
+    url, state = ollama_stub
+    journal = tmp_path / "run.jsonl"
+    assert ollama_chain.main(["--prompt", "P", "--step", f"a@{url}", "--journal", str(journal)]) == 0
+    with journal.open("ab") as handle:
+        handle.write(b'{"type": "stage", "output": "unvollst')
+
+    state.requests.clear()
+    assert ollama_chain.main(["--prompt", "P", "--step", f"a@{url}", "--resume", str(journal)]) == 0
+
+    assert state.requests == []
+    lines = journal.read_bytes().splitlines(keepends=True)
+    assert all(line.endswith(b"\n") for line in lines)
+    assert json.loads(lines[-1])["type"] == "reuse"
+
+
+def test_plain_and_journalled_transcripts_use_the_same_headings(ollama_stub, tmp_path: Path) -> None:
+    url, _ = ollama_stub
+    steps = ["--prompt", "Baue X", "--step", f"a@{url}", "--step", f"b@{url}"]
+    plain, journalled = tmp_path / "plain.md", tmp_path / "journalled.md"
+
+    assert ollama_chain.main([*steps, "--transcript", str(plain)]) == 0
+    assert ollama_chain.main([*steps, "--transcript", str(journalled), "--journal", str(tmp_path / "run.jsonl")]) == 0
+
+    assert plain.read_text(encoding="utf-8") == journalled.read_text(encoding="utf-8")
+    assert "## Step 2 (b)\n" in plain.read_text(encoding="utf-8")
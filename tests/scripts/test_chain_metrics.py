@@ -0,0 +1,79 @@
+"""Tests for per-stage telemetry in ``scripts/chain_metrics.py``."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import chain_metrics
+import ollama_chain
+
+
+def test_stage_metrics_derive_rates_and_overhead() -> None:
+    payload = {
+        "total_duration": 3_000_000_000,
+        "load_duration": 1_000_000_000,
+        "prompt_eval_count": 400,
+        "prompt_eval_duration": 500_000_000,
+        "eval_count": 120,
+        "eval_duration": 1_500_000_000,
+    }
+    metrics = chain_metrics.StageMetrics.from_payload("Step 1 (m)", "m", "http://a", payload, wall_s=3.25)
+    assert metrics.prefill_tps == pytest.approx(800.0)
+    assert metrics.decode_tps == pytest.approx(80.0)
+    assert metrics.client_overhead_s == pytest.approx(0.25)
+    assert metrics.summary() == "wall 3.25s, server 3.00s, load 1.00s, prefill 800 tok/s, decode 80.0 tok/s"
+
+
+def test_openmetrics_escapes_labels_and_skips_missing_values() -> None:
+    collector = chain_metrics.MetricsCollector("chain")
+    collector.add(chain_metrics.StageMetrics('Step 1 ("x")', "m", "http://a", wall_s=1.5, eval_tokens=10, eval_s=0.5))
+    collector.add(chain_metrics.StageMetrics("Step 2 (m)", "m", "http://a", wall_s=0.01, cached=True))
+    text = collector.openmetrics()
+    assert '# TYPE ollama_chain_stage_decode_tokens_per_second gauge' in text
+    assert 'ollama_chain_stage_decode_tokens_per_second{stage="Step 1 (\\"x\\")",model="m",endpoint="http://a"} 20' in text
+    assert "ollama_chain_stage_server_seconds" not in text, "families without samples are omitted"
+    assert 'ollama_chain_run_cached_stages{mode="chain"} 1' in text
+    assert text.endswith("\n")
+
+
+def test_openmetrics_keeps_timestamps_and_large_counters_exact(monkeypatch) -> None:
+    finished = 1792300123.456789
+    monkeypatch.setattr(chain_metrics.time, "time", lambda: finished)
+    collector = chain_metrics.MetricsCollector("chain")
+    collector.add(chain_metrics.StageMetrics("Step 1 (m)", "m", "http://a", wall_s=1.0, eval_tokens=12_345_678, eval_s=2.0))
+    samples = dict(line.rsplit(" ", 1) for line in collector.openmetrics().splitlines() if not line.startswith("#"))
+    assert float(samples['ollama_chain_run_last_completion_timestamp_seconds{mode="chain"}']) == finished
+    assert samples['ollama_chain_stage_eval_tokens{stage="Step 1 (m)",model="m",endpoint="http://a"}'] == "12345678"
+
+
+def test_run_stage_keeps_server_metrics(ollama_stub, tmp_path: Path) -> None:
+    url, _ = ollama_stub
+    assert ollama_chain.main(["--prompt", "Hi", "--step", f"m@{url}", "--metrics-dir", str(tmp_path)]) == 0
+
+    [summary_path] = tmp_path.glob("chain-*.json")
+    [stage] = json.loads(summary_path.read_text(encoding="utf-8"))["stages"]
+    assert stage["load_s"] == pytest.approx(2.0)
+    assert stage["eval_tokens"] == 3
+    assert stage["ttft_s"] is None
+
+
+def test_chain_writes_json_and_textfile(ollama_stub, tmp_path: Path, capsys) -> None:
+    url, _ = ollama_stub
+    exit_code = ollama_chain.main(
+        ["--prompt", "P", "--step", f"a@{url}", "--step", f"b@{url}", "--stream", "--metrics-dir", str(tmp_path)]
+    )
+
+    assert exit_code == 0
+    [summary_path] = tmp_path.glob("chain-*.json")
+    summary = json.loads(summary_path.read_text(encoding="utf-8"))
+    assert summary["mode"] == "chain"
+    assert [stage["label"] for stage in summary["stages"]] == ["Step 1 (a)", "Step 2 (b)"]
+    assert summary["totals"]["load_s"] == pytest.approx(4.0)
+    assert summary["totals"]["decode_tps"] == pytest.approx(1000.0)
+    assert summary["stages"][0]["ttft_s"] is not None
+    prom = (tmp_path / "ollama_chain.prom").read_text(encoding="utf-8")
+    assert 'ollama_chain_stage_load_seconds{stage="Step 2 (b)",model="b",endpoint="' in prom
+    assert list(tmp_path.glob(".*.tmp")) == []
+    assert "[Step 2] wall " in capsys.readouterr().out
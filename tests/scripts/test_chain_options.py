@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+import ollama_chain
+from chain_options import describe_options
+
+
+def test_step_options_block_is_parsed_and_validated() -> None:
+    step = ollama_chain.parse_step(
+        'llama3.1{num_predict=256, temperature=0.2, stop="}#@", stop="\\n\\n", keep_alive=10m}@localhost:11435#Fix {this}',
+        "http://fallback",
+    )
+
+    assert step.model == "llama3.1"
+    assert step.normalised_endpoint() == "http://localhost:11435"
+    assert step.directive == "Fix {this}"
+    assert step.options == {"num_predict": 256, "temperature": 0.2, "stop": ["}#@", "\n\n"]}
+    assert step.keep_alive == "10m"
+    assert describe_options(step.options, step.keep_alive) == 'num_predict=256, temperature=0.2, stop="}#@", stop="\\n\\n", keep_alive=10m'
+
+    plain = ollama_chain.parse_step("llama3.1#Return {\"a\": 1}", "http://fallback")
+    assert plain.options == {} and plain.directive == 'Return {"a": 1}'
+
+
+@pytest.mark.parametrize(
+    ("raw", "message"),
+    [
+        ("m{num_predikt=5}", "unknown option 'num_predikt'"),
+        ("m{num_ctx=0}", "option 'num_ctx' must be >= 1"),
+        ("m{top_p=1.5}", "option 'top_p' must be between 0 and 1"),
+        ("m{num_predict=1.5}", "option 'num_predict' expects an integer"),
+        ("m{num_predict=5", "missing its closing '}'"),
+        ("m{seed=1}x@host", "unexpected 'x@host'"),
+    ],
+)
+def test_invalid_step_options_are_rejected(raw: str, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        ollama_chain.parse_step(raw, "http://fallback")
+
+
+def test_options_reach_ollama_and_are_recorded_per_stage(ollama_stub, tmp_path) -> None:
+    url, state = ollama_stub
+    state.timing = lambda payload: {"done_reason": "length"} if payload.get("options") else {}
+
+    exit_code = ollama_chain.main(
+        [
+            "--prompt", "P",
+            "--step", f'a{{num_predict=8,stop="###",keep_alive=5m}}@{url}',
+            "--step", f"b@{url}",
+            "--stream",
+            "--keep-alive", "1m",
+            "--metrics-dir", str(tmp_path),
+        ]
+    )
+
+    assert exit_code == 0
+    first, second = (request["body"] for request in state.requests)
+    assert first["options"] == {"num_predict": 8, "stop": ["###"]} and first["keep_alive"] == "5m"
+    assert "options" not in second and second["keep_alive"] == "1m"
+    [report] = tmp_path.glob("chain-*.json")
+    data = json.loads(report.read_text(encoding="utf-8"))
+    assert [(stage["options"], stage["done_reason"]) for stage in data["stages"]] == [
+        ({"num_predict": 8, "stop": ["###"]}, "length"),
+        ({}, None),
+    ]
+    assert data["totals"]["truncated_stages"] == 1
+
+
+def test_pipeline_options_override_the_step_block(ollama_stub, tmp_path) -> None:
+    url, state = ollama_stub
+    pipeline = tmp_path / "pipeline.json"
+    pipeline.write_text(
+        json.dumps(
+            {
+                "prompt": "P",
+                "nodes": [
+                    {"id": "a", "step": f"a{{num_predict=8,seed=1}}@{url}", "options": {"num_predict": 64, "stop": ["END"]}, "keep_alive": "2m"},
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    assert ollama_chain.main(["--pipeline", str(pipeline)]) == 0
+    body = state.requests[0]["body"]
+    assert body["options"] == {"num_predict": 64, "seed": 1, "stop": ["END"]}
+    assert body["keep_alive"] == "2m"
+
+    pipeline.write_text(json.dumps({"prompt": "P", "nodes": [{"id": "a", "step": f"a@{url}", "options": {"top_k": -1}}]}), encoding="utf-8")
+    assert ollama_chain.main(["--pipeline", str(pipeline)]) != 0
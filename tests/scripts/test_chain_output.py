@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+import ollama_chain
+from chain_output import parse_output_filter, project
+
+REPLY = """Here is the implementation you asked for.
+
+```python
+def add(a, b):
+    return a + b
+```
+
+It is simple. A shell example:
+
+```sh
+python -c 'print(1)'
+```
+"""
+
+
+@pytest.mark.parametrize(
+    ("spec", "text", "expected"),
+    [
+        ("code", REPLY, "```python\ndef add(a, b):\n    return a + b\n```\n\n```sh\npython -c 'print(1)'\n```"),
+        ("code:python", REPLY, "```python\ndef add(a, b):\n    return a + b\n```"),
+        ("json:review.issues.0", '```json\n{"review": {"issues": ["off by one", "typo"]}}\n```', "off by one"),
+        ("json:review", 'Sure: {"review": {"ok": false}}', '{\n  "ok": false\n}'),
+        ("regex:^- (.+)$", "Findings:\n- first\n- second\nDone", "first\nsecond"),
+        ("last:2", "# A\nalpha\n## B\nbeta\n## C\ngamma", "## B\nbeta\n\n## C\ngamma"),
+        ("last:1", "one\n\ntwo\n\nthree", "three"),
+    ],
+)
+def test_output_filters_extract_the_relevant_part(spec: str, text: str, expected: str) -> None:
+    assert parse_output_filter(spec).apply(text) == expected
+
+
+def test_unmatched_filter_passes_the_full_reply() -> None:
+    extract, projection = project("a", "no code here", parse_output_filter("code"))
+    assert extract == "no code here"
+    assert not projection.matched and projection.saved_tokens == 0
+    for raw, message in [("xml", "unknown output filter"), ("regex:(", "invalid regex"), ("last:0", "positive section count")]:
+        with pytest.raises(ValueError, match=message):
+            parse_output_filter(raw)
+
+
+@pytest.mark.parametrize("text", ['{"review": "truncated by num_predict', '} stray {"review": 1', "{ {"])
+def test_truncated_or_unbalanced_json_passes_the_full_reply(text: str) -> None:
+    extract, projection = project("x", text, parse_output_filter("json:review"))
+    assert extract == text.strip()
+    assert not projection.matched
+
+
+def test_later_stages_see_only_the_extract_and_transcript_keeps_everything(ollama_stub, tmp_path, capsys) -> None:
+    url, state = ollama_stub
+    state.chunks_by_model = {"coder": [REPLY], "lead": ['{"verdict": "ship it", "notes": "' + "x" * 400 + '"}']}
+    transcript = tmp_path / "chain.md"
+
+    exit_code = ollama_chain.main(
+        [
+            "--prompt", "Write add()",
+            "--step", f"coder{{output=code:python}}@{url}",
+            "--step", f"lead{{output=json:verdict}}@{url}#Judge the code",
+            "--step", f"docs@{url}#Document it",
+            "--stream",
+            "--transcript", str(transcript),
+        ]
+    )
+
+    assert exit_code == 0
+    coder, lead, docs = (request["body"] for request in state.requests)
+    assert "format" not in coder
+    assert lead["format"] == {"type": "object", "properties": {"verdict": {}}, "required": ["verdict"]}
+    assert "return a + b" in lead["prompt"] and "It is simple" not in lead["prompt"]
+    assert "### lead\nship it" in docs["prompt"] and "xxxx" not in docs["prompt"]
+    written = transcript.read_text(encoding="utf-8")
+    assert "It is simple" in written and "xxxx" in written
+    output = capsys.readouterr().out
+    assert "=== Output filters" in output
+    assert "Step 2 (lead): output filter json:verdict: later stages see ~2 of ~" in output
@@ -0,0 +1,103 @@
+"""Tests for replica routing in ``scripts/chain_router.py``."""
+from __future__ import annotations
+
+import socket
+
+import pytest
+
+import chain_router
+import ollama_chain
+
+
+def unused_endpoint() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_parse_step_accepts_replica_pools() -> None:
+    step = ollama_chain.parse_step("m@localhost:1, http://b:2/ ,localhost:1#Prüfe", "http://default")
+    assert step.endpoints == ["http://localhost:1", "http://b:2"]
+    assert step.normalised_endpoint() == "http://localhost:1,http://b:2"
+    assert step.directive == "Prüfe"
+
+
+def test_ewma_policy_prefers_warm_fast_replicas() -> None:
+    router = chain_router.Router(policy="ewma")
+    pool = ["http://a", "http://b"]
+    first = router.acquire(pool, "m")
+    router.succeeded(first, "m", seconds=2.5, load_seconds=2.0)
+    assert first.endpoint == "http://a"
+    # b would have to load the model (2s); a is warm and answers in ~0.5s.
+    assert router.acquire(pool, "m").endpoint == "http://a"
+    # With a busy queue on a, paying the load on b becomes cheaper.
+    router.replicas["http://a"].in_flight = 5
+    assert router.acquire(pool, "m").endpoint == "http://b"
+
+
+def test_preloads_mark_the_replica_warm_without_touching_its_latency() -> None:
+    router = chain_router.Router(policy="ewma")
+    for replica in ("http://a", "http://b"):
+        router._replica(replica).probed = True
+    assert router.call(["http://a", "http://b"], "m", lambda endpoint: 3.0, lambda seconds: seconds, record_latency=False) == 3.0
+    warmed = router.replicas["http://a"]
+    assert "m" in warmed.models and warmed.latency == {} and router.cold_load["m"] == 3.0
+    assert router.acquire(["http://a", "http://b"], "m").endpoint == "http://a", "the next request goes to the warmed replica"
+
+
+def test_least_loaded_policy_spreads_requests() -> None:
+    router = chain_router.Router(policy="least-loaded")
+    pool = ["http://a", "http://b", "http://c"]
+    chosen = [router.acquire(pool, "m").endpoint for _ in range(3)]
+    assert sorted(chosen) == pool
+
+
+def test_call_fails_over_and_gives_up_after_max_attempts() -> None:
+    router = chain_router.Router(max_attempts=2)
+    for replica in ("http://a", "http://b", "http://c"):
+        router._replica(replica).probed = True
+    seen: list[str] = []
+
+    def send(endpoint: str) -> str:
+        seen.append(endpoint)
+        raise chain_router.ReplicaUnavailable(f"{endpoint} refused")
+
+    with pytest.raises(chain_router.ReplicaUnavailable, match="after 2 attempt"):
+        router.call(["http://a", "http://b", "http://c"], "m", send)
+    assert seen == ["http://a", "http://b"]
+    assert router.replicas["http://a"].failovers == 1
+    assert router.acquire(["http://a", "http://c"], "m").endpoint == "http://c", "failed replicas cool down"
+
+
+def test_chain_step_fails_over_to_live_replica(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    dead = unused_endpoint()
+
+    exit_code = ollama_chain.main(["--prompt", "Hallo", "--step", f"m@{dead},{url}", "--step", f"m@{dead},{url}", "--stream"])
+
+    assert exit_code == 0
+    assert len(state.requests) == 2
+    output = capsys.readouterr().out
+    assert output.count("[router]") == 1, "the dead replica is skipped while it cools down"
+    assert "=== Replica routing ===" in output
+    rows = {line.split()[0]: line.split()[1:5] for line in output.splitlines() if line.startswith("http://")}
+    assert rows[dead] == ["1", "0", "1", "1"]
+    assert rows[url] == ["2", "2", "0", "0"]
+
+
+def test_batch_spreads_prompts_across_replicas(ollama_stub, tmp_path) -> None:
+    url, state = ollama_stub
+    state.response_delay = 0.05
+    alias = url.replace("127.0.0.1", "localhost")
+    batch = tmp_path / "prompts.jsonl"
+    batch.write_text("\n".join(f'"Frage {n}"' for n in range(6)) + "\n", encoding="utf-8")
+
+    exit_code = ollama_chain.main(
+        ["--batch", str(batch), "--step", f"m@{url},{alias}", "--route-policy", "least-loaded", "--concurrency", "2"]
+    )
+
+    assert exit_code == 0
+    router = chain_router.default_router()
+    served = {endpoint: replica.succeeded for endpoint, replica in router.replicas.items()}
+    assert sum(served.values()) == 6
+    assert all(count > 0 for count in served.values())
@@ -0,0 +1,135 @@
+"""Tests for the chain service in ``scripts/chain_service.py``."""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+import chain_service
+from http_pool import ConnectionPool, HttpStatusError
+
+
+def test_affinity_queue_drains_loaded_model_without_starving_others() -> None:
+    queue: chain_service.AffinityQueue[str] = chain_service.AffinityQueue(max_affinity=2, max_wait=100)
+    queue.push("e", "m2", "x", now=0)
+    assert queue.pop("e", now=0)[:2] == ("m2", "x")
+    for now, (model, item) in enumerate([("m1", "a"), ("m2", "b"), ("m1", "c"), ("m2", "d"), ("m2", "f")], start=1):
+        queue.push("e", model, item, now=now)
+    order = [queue.pop("e", now=10)[1] for _ in range(len(queue))]
+    # m2 is loaded: it keeps the endpoint for max_affinity stages, then the longest-waiting group gets its turn.
+    assert order == ["b", "a", "c", "d", "f"]
+    assert queue.switches == 2
+
+    aged: chain_service.AffinityQueue[str] = chain_service.AffinityQueue(max_affinity=10, max_wait=5)
+    aged.push("e", "m1", "warm", now=0)
+    aged.pop("e", now=0)
+    aged.push("e", "m2", "old", now=1)
+    aged.push("e", "m1", "next", now=2)
+    assert aged.pop("e", now=7)[1] == "old", "a group waiting max_wait seconds preempts affinity"
+    assert aged.pop("e", now=7)[2] == pytest.approx(5)
+
+
+@pytest.fixture
+def service() -> Iterator[tuple[str, chain_service.ChainService]]:
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    instance = chain_service.ChainService(max_jobs=4, max_affinity=4)
+    port = asyncio.run_coroutine_threadsafe(instance.start("127.0.0.1", 0), loop).result(5)
+    try:
+        yield f"http://127.0.0.1:{port}", instance
+    finally:
+        asyncio.run_coroutine_threadsafe(instance.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+
+def get_json(pool: ConnectionPool, url: str) -> dict:
+    return json.loads(pool.request("GET", url, timeout=5).text())
+
+
+def post_job(pool: ConnectionPool, url: str, payload: dict) -> dict:
+    body = json.dumps(payload).encode("utf-8")
+    return json.loads(pool.request("POST", f"{url}/jobs", body=body, headers={"Content-Type": "application/json"}, timeout=5).text())
+
+
+def test_service_groups_stages_by_model_and_streams_results(ollama_stub, service) -> None:
+    ollama_url, state = ollama_stub
+    url, instance = service
+    state.response_delay = 0.2
+    pool = ConnectionPool()
+
+    first = post_job(pool, url, {"prompt": "X", "steps": [f"m2@{ollama_url}"], "stream": False})
+    deadline = time.monotonic() + 5
+    while get_json(pool, f"{url}/jobs/{first['id']}")["state"] != "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queued = [
+        post_job(pool, url, {"prompt": prompt, "steps": [f"{model}@{ollama_url}"], "stream": False})
+        for prompt, model in (("A", "m1"), ("B", "m2"), ("C", "m1"))
+    ]
+    depth = get_json(pool, f"{url}/queue")
+    assert depth["depth"] == {f"m1@{ollama_url}": 2, f"m2@{ollama_url}": 1}
+    assert depth["running"] == {ollama_url: 1}
+
+    with pytest.raises(HttpStatusError) as rejected:
+        post_job(pool, url, {"prompt": "D", "steps": [f"m1@{ollama_url}"], "stream": False})
+    assert rejected.value.status == 429, "admission control caps queued plus running jobs"
+
+    with pool.stream("GET", f"{url}/jobs/{queued[-1]['id']}/events", timeout=10) as response:
+        events = [json.loads(line) for line in response if line.strip()]
+    assert events[0]["event"] == "accepted" and events[-1]["event"] == "done"
+    assert "".join(event["text"] for event in events if event["event"] == "token") == "Hallo Welt"
+    kept = instance.jobs[queued[-1]["id"]].events
+    assert [event["text"] for event in kept if event["event"] == "token"] == ["Hallo Welt"], "finished jobs keep one token event per stage"
+
+    served = [str(request["body"]["prompt"]).rsplit("\n", 1)[-1] for request in state.requests]
+    assert served == ["X", "B", "A", "C"], "the loaded model drains its queue before the endpoint switches"
+    assert get_json(pool, f"{url}/queue")["switches"] == 1
+
+    streamed = []
+    body = json.dumps({"prompt": "Hallo", "steps": [f"m1@{ollama_url}", f"m3@{ollama_url}#Prüfe"]}).encode("utf-8")
+    with pool.stream("POST", f"{url}/jobs", body=body, headers={"Content-Type": "application/json"}, timeout=10) as response:
+        streamed = [json.loads(line)["event"] for line in response if line.strip()]
+    assert streamed.count("stage_started") == 2 and streamed[-1] == "done"
+    assert "### Task for m3\nPrüfe" in state.requests[-1]["body"]["prompt"]
+    pool.close()
+
+
+def test_empty_default_directive_disables_it(ollama_stub, service) -> None:
+    ollama_url, state = ollama_stub
+    url, _ = service
+    pool = ConnectionPool()
+
+    with pytest.raises(HttpStatusError) as rejected:
+        post_job(pool, url, {"prompt": "X", "steps": [f"m1@{ollama_url}"], "default_directive": 7, "stream": False})
+    assert rejected.value.status == 400
+
+    body = json.dumps({"prompt": "Hallo", "steps": [f"m1@{ollama_url}", f"m2@{ollama_url}"], "default_directive": ""}).encode("utf-8")
+    with pool.stream("POST", f"{url}/jobs", body=body, headers={"Content-Type": "application/json"}, timeout=10) as response:
+        assert [json.loads(line)["event"] for line in response if line.strip()][-1] == "done"
+    assert "### Task" not in state.requests[-1]["body"]["prompt"], "like the CLI, an empty default directive sends none"
+    pool.close()
+
+
+def test_invalid_or_oversized_content_length_is_rejected(service) -> None:
+    url, _ = service
+    host, port = url.rsplit("/", 1)[-1].split(":")
+
+    async def send(length: str) -> bytes:
+        reader, writer = await asyncio.open_connection(host, int(port))
+        writer.write(f"POST /jobs HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        reply = await reader.read()
+        writer.close()
+        return reply
+
+    for length in ("abc", "-5"):
+        reply = asyncio.run(send(length))
+        assert reply.startswith(b"HTTP/1.1 400 Bad Request") and b"invalid Content-Length" in reply
+    reply = asyncio.run(send(str(chain_service.DEFAULT_MAX_BODY + 1)))
+    assert reply.startswith(b"HTTP/1.1 413 Payload Too Large"), "oversized bodies are refused before they are read"
@@ -0,0 +1,97 @@
+"""Tests for ``scripts/context_sweep.py``."""
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+import context_sweep
+
+
+def test_plan_only_reports_without_contacting_ollama(tmp_path: Path, monkeypatch, capsys) -> None:
+    monkeypatch.delenv("CONTEXT_SWEEP_PROFILE", raising=False)
+    exit_code = context_sweep.main(
+        [
+            "--safe", "--cpu-only", "--plan-only", "--write-report",
+            "--report-dir", str(tmp_path),
+            "--base-url", "http://127.0.0.1:9",
+            "--env-file", str(tmp_path / "missing.env"),
+        ]
+    )
+    assert exit_code == 0
+    [report] = tmp_path.glob("CONTEXT_RESULTS_*.md")
+    text = report.read_text(encoding="utf-8")
+    assert text.count("| plan-only |") == 3
+    assert "| baseline | 8192 | 3000/n/a |" in text, "safe mode caps the prompt at the profile's token budget"
+    summary = json.loads(report.with_suffix(".json").read_text(encoding="utf-8"))
+    assert summary["plan_only"] is True and summary["profile"] == "baseline-cpu"
+
+
+def test_calibration_gpu_inventory_and_cooldown() -> None:
+    calibration = context_sweep.TokenCalibration()
+    calibration.observe(0, 120)
+    calibration.observe(200, 520)
+    assert calibration.calibrated
+    assert calibration.units_for(1000) == 440
+    assert calibration.units_for(50) == 0
+
+    def fake_run(*args, **kwargs):
+        return subprocess.CompletedProcess(args, 0, stdout="0, NVIDIA A10, 23028 MiB\n1, NVIDIA T4, 15360 MiB\n")
+
+    gpus = context_sweep.gpu_inventory(fake_run)
+    assert [(gpu.index, gpu.name, gpu.memory_gib) for gpu in gpus] == [(0, "NVIDIA A10", 22.49), (1, "NVIDIA T4", 15.0)]
+    plan = context_sweep.build_plan(context_sweep.PROFILES["baseline-cpu"], False, gpus, [2048])
+    assert [cell.options["main_gpu"] for cell in plan] == [0, 1]
+
+    assert context_sweep.cooldown_seconds(None, 5.0) == 0.0, "warm runs continue immediately"
+    assert context_sweep.cooldown_seconds(4.0, 5.0) == pytest.approx(2.0)
+    assert context_sweep.cooldown_seconds(30.0, 5.0) == 5.0
+    assert context_sweep.cooldown_seconds(None, 15.0, 5.0) == 5.0, "a GPU switch waits even after a warm model"
+    assert context_sweep.cooldown_seconds(None, 0.0, 5.0) == 0.0
+
+
+def test_list_profiles_prints_every_builtin_profile(capsys) -> None:
+    assert context_sweep.main(["--list-profiles"]) == 0
+    listed = [line.split()[0] for line in capsys.readouterr().out.splitlines() if not line.startswith(" ")]
+    assert listed == sorted(context_sweep.PROFILES)
+
+
+def test_sweep_hits_token_targets_and_finds_largest_context(ollama_stub, tmp_path: Path, capsys) -> None:
+    base_url, state = ollama_stub
+
+    def reply(payload) -> str:
+        prompt = str(payload["prompt"])
+        if len(prompt) > 2500:
+            time.sleep(0.3)  # Long contexts miss the latency target.
+        asked = re.search(r"KEY in \[S(\d+)\]", prompt).group(1)
+        return "<" + re.search(rf"\[S{asked}\] KEY: <(\w+)>", prompt).group(1) + ">"
+
+    state.reply = reply
+    exit_code = context_sweep.main(
+        [
+            "--cpu-only", "--num-ctx", "1024,4096",
+            "--inter-run-delay", "0",
+            "--target-latency", "0.2",
+            "--base-url", base_url,
+            "--write-report", "--report-dir", str(tmp_path),
+            "--seed", "7",
+            "--env-file", str(tmp_path / "missing.env"),
+        ]
+    )
+    assert exit_code == 0
+    output = capsys.readouterr().out
+    assert "largest context within 0.2s is num_ctx 1024" in output
+    [report] = tmp_path.glob("CONTEXT_RESULTS_*.json")
+    results = json.loads(report.read_text(encoding="utf-8"))["results"]
+    assert [result["num_ctx"] for result in results] == [1024, 4096]
+    for result in results:
+        assert result["recall"] is True
+        # The stub counts characters, so a filler unit is len(" lorem") "tokens".
+        assert abs(result["prompt_tokens"] - result["target_tokens"]) <= len(context_sweep.FILLER_UNIT)
+    generates = [request for request in state.requests if request["path"] == "/api/generate"]
+    assert len(generates) == 2 + 2, "two calibration probes, then one request per context"
+    assert generates[-1]["body"]["options"]["num_ctx"] == 4096
@@ -0,0 +1,113 @@
+"""Tests for ``scripts/evidence_store.py``."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+import evidence_store
+
+
+def write_bench(root: Path, name: str, decode: float, latency_p95: float, commit: str, host: str = "abc123def456") -> Path:
+    run_dir = root / "benchmarks" / name
+    run_dir.mkdir(parents=True, exist_ok=True)
+    sample: Dict[str, Any] = {"ok": True, "wall_s": latency_p95, "ttft_s": 0.1, "prefill_tps": 400.0, "decode_tps": decode}
+    report = {
+        "generated_at": f"2026-10-{name[-2:]}T08:00:00+00:00",
+        "model": "llama3.1",
+        "levels": [
+            {
+                "concurrency": 1,
+                "requests": 2,
+                "errors": 0,
+                "throughput_rps": 1.0,
+                "latency_s": {"p50": latency_p95 / 2, "p95": latency_p95},
+                "ttft_s": {"p50": 0.1, "p95": 0.1},
+                "prefill_tps": {"p50": 400.0},
+                "decode_tps": {"p50": decode},
+                "samples": [sample, sample],
+            }
+        ],
+        "provenance": {"host": host, "host_facts": {"node": "bench-box"}, "parameters": {"num_ctx": "4096"}, "git_commit": commit},
+    }
+    path = run_dir / "summary.json"
+    path.write_text(json.dumps(report), encoding="utf-8")
+    return path
+
+
+def test_ingest_is_incremental_and_parses_all_formats(tmp_path: Path) -> None:
+    first = write_bench(tmp_path, "bench-llama3-1-20261001-080000-01", 50.0, 2.0, "c1")
+    legacy = tmp_path / "benchmarks" / "bench-llama3-1-20250918-101500"
+    legacy.mkdir(parents=True)
+    results = [
+        {"Iteration": 1, "ExitCode": 0, "WallMs": 1500.0, "EvalCount": 100, "EvalDurationNs": 2e9, "PromptEvalCount": 50, "PromptEvalDurationNs": 1e8},
+        {"Iteration": 2, "ExitCode": -1, "WallMs": 10.0},
+    ]
+    legacy_report = {"model": "llama3.1", "iterations": 2, "results": results}
+    (legacy / "summary.json").write_text("\ufeff" + json.dumps(legacy_report), encoding="utf-8")  # PowerShell writes a BOM.
+    load = tmp_path / "benchmarks" / "load-llama3-1-20261002-080000"
+    load.mkdir()
+    steps = [{"offered_rps": 0.5, "sent": 4, "errors": 1, "achieved_rps": 0.4, "latency_s": {"p50": 1.0, "p95": 3.0}, "ttft_s": None}]
+    (load / "summary.json").write_text(json.dumps({"model": "llama3.1", "steps": steps}), encoding="utf-8")
+
+    store = evidence_store.EvidenceStore(tmp_path)
+    try:
+        assert (store.ingest().added, store.ingest().unchanged) == (3, 3)
+        runs = {row["path"]: row for row in store.runs()}
+        assert runs["benchmarks/bench-llama3-1-20250918-101500"]["host"] == evidence_store.UNKNOWN
+        assert runs["benchmarks/bench-llama3-1-20261001-080000-01"]["git_commit"] == "c1"
+        [legacy_row] = store.trend("llama3.1", host=evidence_store.UNKNOWN)
+        assert legacy_row["decode_tps"] == pytest.approx(50.0)
+        assert (legacy_row["requests"], legacy_row["errors"]) == (2, 1)
+        [load_row] = store.trend("llama3.1", kind="load")
+        assert (load_row["level"], load_row["latency_p95"], load_row["decode_tps"]) == (0.5, 3.0, None)
+
+        write_bench(tmp_path, "bench-llama3-1-20261001-080000-01", 60.0, 2.0, "c1")
+        os.utime(first, ns=(first.stat().st_atime_ns, first.stat().st_mtime_ns + 1_000_000))
+        outcome = store.ingest()
+        assert (outcome.added, outcome.updated) == (0, 1)
+        assert [row["decode_tps"] for row in store.trend("llama3.1", host="abc123def456")] == [60.0]
+    finally:
+        store.close()
+
+
+def test_check_flags_regressions_against_rolling_median(tmp_path: Path, capsys) -> None:
+    for day, decode in zip(("01", "02", "03", "04"), (50.0, 52.0, 48.0, 51.0)):
+        write_bench(tmp_path, f"bench-llama3-1-20261001-080000-{day}", decode, 2.0, f"c{day}")
+    args = ["--root", str(tmp_path), "--env-file", str(tmp_path / "missing.env"), "check", "--threshold", "10"]
+    write_bench(tmp_path, "bench-llama3-1-20261001-080000-05", 49.0, 2.1, "c05")
+    assert evidence_store.main(args) == 0
+
+    write_bench(tmp_path, "bench-llama3-1-20261001-080000-06", 40.0, 2.6, "c06")
+    assert evidence_store.main(args) == 1
+    output = capsys.readouterr().out
+    assert "REGRESSION llama3.1" in output and "decode_tps: 40.000 vs baseline 50.000" in output
+    assert "latency_p95: 2.600 vs baseline 2.000 (+30.0%" in output
+    assert "prefill_tps" in output and "2 regression(s)" in output
+
+    write_bench(tmp_path, "bench-llama3-1-20261001-080000-07", 40.0, 2.6, "c07", host="otherhost000")
+    store = evidence_store.EvidenceStore(tmp_path)
+    try:
+        store.ingest()
+        assert not [f for f in store.check(0.1, 5, 3) if f.host == "otherhost000"], "another host starts its own baseline"
+    finally:
+        store.close()
+
+
+def test_prune_drops_samples_but_keeps_aggregates(tmp_path: Path) -> None:
+    for day in ("01", "02", "03"):
+        write_bench(tmp_path, f"bench-llama3-1-20261001-080000-{day}", 50.0, 2.0, f"c{day}")
+    store = evidence_store.EvidenceStore(tmp_path)
+    try:
+        store.ingest()
+        assert store.prune(keep=1, delete_files=True) == (2, 2)
+        assert sorted(path.name for path in (tmp_path / "benchmarks").iterdir()) == ["bench-llama3-1-20261001-080000-03"]
+        runs = store.runs()
+        assert [(row["pruned"], row["sample_count"]) for row in runs] == [(0, 2), (1, 0), (1, 0)]
+        assert len(store.trend("llama3.1")) == 3, "aggregates of pruned runs stay queryable"
+        assert store.ingest().added == 0
+    finally:
+        store.close()
@@ -0,0 +1,78 @@
+"""Tests for the shared keep-alive pool in ``scripts/http_pool.py``."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+import http_pool
+
+
+def test_pool_reuses_connection_per_host(ollama_stub) -> None:
+    url, _ = ollama_stub
+    pool = http_pool.ConnectionPool()
+    try:
+        for _ in range(5):
+            assert pool.request("GET", f"{url}/api/version", timeout=5).status == 200
+        assert pool.stats.created == 1
+        assert pool.stats.reused == 4
+    finally:
+        pool.close()
+
+
+def test_streamed_response_is_returned_after_full_read(ollama_stub) -> None:
+    url, _ = ollama_stub
+    pool = http_pool.ConnectionPool()
+    try:
+        for _ in range(2):
+            with pool.stream("POST", f"{url}/api/generate", body=b'{"model":"m"}', timeout=5) as response:
+                lines = [line for line in response if line.strip()]
+            assert len(lines) == 4
+        assert pool.stats.created == 1
+    finally:
+        pool.close()
+
+
+def test_idle_connections_are_evicted(ollama_stub) -> None:
+    url, _ = ollama_stub
+    pool = http_pool.ConnectionPool(idle_timeout=0.01)
+    try:
+        pool.request("GET", url, timeout=5)
+        time.sleep(0.05)
+        assert pool.evict_idle() == 1
+        pool.request("GET", url, timeout=5)
+        assert pool.stats.created == 2
+    finally:
+        pool.close()
+
+
+def test_release_sweeps_idle_connections_of_other_hosts(ollama_stub) -> None:
+    url, _ = ollama_stub
+    pool = http_pool.ConnectionPool(idle_timeout=0.01)
+    try:
+        pool.request("GET", url, timeout=5)
+        time.sleep(0.05)
+        pool.request("GET", url.replace("127.0.0.1", "localhost"), timeout=5)
+        assert pool.stats.evicted == 1, "the idle 127.0.0.1 connection is closed without another request to it"
+    finally:
+        pool.close()
+
+
+def test_configure_default_pool_only_grows(monkeypatch) -> None:
+    monkeypatch.setattr(http_pool, "_DEFAULT_POOL", None)
+    assert http_pool.configure_default_pool(4).max_per_host == http_pool.DEFAULT_MAX_PER_HOST
+    wide = http_pool.configure_default_pool(16)
+    assert wide.max_per_host == 16 and http_pool.default_pool() is wide
+    assert http_pool.configure_default_pool(10) is wide
+
+
+def test_unreachable_host_raises_connection_error() -> None:
+    pool = http_pool.ConnectionPool()
+    with pytest.raises(http_pool.HttpConnectionError):
+        pool.request("GET", "http://127.0.0.1:9/", timeout=1)
+
+
+def test_benchmark_reports_pooled_connection_reuse() -> None:
+    result = http_pool.run_benchmark(20)
+    assert result["connections_created"] == 1
+    assert result["pooled_us_per_request"] > 0
@@ -0,0 +1,79 @@
+"""Tests for the open-loop load generator in ``scripts/load_ollama.py``."""
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import load_ollama
+from bench_ollama import Sample
+
+
+def test_arrival_offsets_follow_the_requested_process() -> None:
+    assert load_ollama.arrival_offsets(4.0, 1.0, "constant", random.Random(0)) == [0.0, 0.25, 0.5, 0.75]
+    poisson = load_ollama.arrival_offsets(50.0, 20.0, "poisson", random.Random(1))
+    assert len(poisson) == pytest.approx(1000, rel=0.1)
+    assert poisson == sorted(poisson)
+
+
+def test_open_loop_step_exposes_queueing_past_capacity() -> None:
+    server = threading.Semaphore(1)  # One request at a time, 20 ms each: 50 req/s capacity.
+
+    def send(prompt: str) -> Sample:
+        started = time.perf_counter()
+        with server:
+            begun = time.perf_counter()
+            time.sleep(0.02)
+        finished = time.perf_counter()
+        return Sample(1, 0, True, finished - started, ttft_s=finished - started, server_s=finished - begun)
+
+    light = load_ollama.run_step(send, ["p"], rate=10.0, duration=0.5)
+    heavy = load_ollama.run_step(send, ["p"], rate=150.0, duration=0.5)
+
+    assert light["sent"] == 5 and light["errors"] == 0
+    assert light["queue_s"]["p95"] < 0.02
+    assert heavy["achieved_rps"] < 0.9 * heavy["offered_rps"]
+    assert heavy["queue_s"]["p95"] > 0.2, "arrivals beyond capacity must wait"
+    assert load_ollama.find_knee([light, heavy]) is light
+
+
+def test_find_knee_stops_at_latency_blowup_or_errors() -> None:
+    def step(rate: float, achieved: float, p95: float, error_rate: float = 0.0) -> dict:
+        return {"offered_rps": rate, "achieved_rps": achieved, "error_rate": error_rate, "latency_s": {"p95": p95}}
+
+    steps = [step(1, 1, 1.0), step(2, 2, 1.2), step(4, 3.9, 3.0), step(8, 4, 9.0)]
+    assert load_ollama.find_knee(steps)["offered_rps"] == 2
+    assert load_ollama.find_knee([step(1, 1, 1.0, error_rate=0.2)]) is None
+
+
+def test_load_test_writes_report_against_stub(ollama_stub, tmp_path: Path, monkeypatch, capsys) -> None:
+    url, state = ollama_stub
+    pool = tmp_path / "pool.jsonl"
+    pool.write_text('"Erste Frage"\n{"id": "b", "prompt": "Zweite Frage"}\n', encoding="utf-8")
+    monkeypatch.delenv("EVIDENCE_ROOT", raising=False)
+
+    exit_code = load_ollama.main(
+        [
+            "--model", "m",
+            "--prompts", str(pool),
+            "--base-url", url,
+            "--rates", "20,10",
+            "--duration", "0.2",
+            "--arrival", "constant",
+            "--env-file", str(tmp_path / "none.env"),
+            "--output-root", str(tmp_path),
+        ]
+    )
+
+    assert exit_code == 0
+    [run_dir] = (tmp_path / "benchmarks").iterdir()
+    report = json.loads((run_dir / "summary.json").read_text(encoding="utf-8"))
+    assert [step["offered_rps"] for step in report["steps"]] == [10.0, 20.0]
+    assert [step["sent"] for step in report["steps"]] == [2, 4]
+    prompts = [entry["body"]["prompt"] for entry in state.requests]
+    assert prompts[:2] == ["Erste Frage", "Zweite Frage"]
+    assert "Knee:" in capsys.readouterr().out
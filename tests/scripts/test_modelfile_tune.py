@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import modelfile_tune
+
+BASELINE = """# Minimal baseline
+FROM llama3.1
+
+TEMPLATE \"\"\"{{ .Prompt }}\"\"\"
+
+PARAMETER num_ctx 8192
+PARAMETER num_thread 4
+"""
+
+
+def test_render_modelfile_rewrites_and_appends_parameters() -> None:
+    base, parameters = modelfile_tune.modelfile_parameters(BASELINE)
+    assert base == "llama3.1"
+    assert parameters == {"num_ctx": "8192", "num_thread": "4"}
+
+    rendered = modelfile_tune.render_modelfile(BASELINE, {"num_thread": 8, "num_batch": 256, "num_ctx": 4096}, ["Tuned."])
+
+    lines = rendered.splitlines()
+    assert lines[0] == "# Tuned."
+    assert "TEMPLATE \"\"\"{{ .Prompt }}\"\"\"" in lines
+    assert [line for line in lines if line.startswith("PARAMETER")] == [
+        "PARAMETER num_ctx 4096",
+        "PARAMETER num_thread 8",
+        "PARAMETER num_batch 256",
+    ]
+
+
+def tuner_workspace(tmp_path: Path, state) -> Path:
+    (tmp_path / "baseline.Modelfile").write_text(BASELINE, encoding="utf-8")
+    (tmp_path / "prompt.txt").write_text("Summarise the bench workload.", encoding="utf-8")
+
+    def timing(payload):
+        options = payload["options"]
+        # Decoding peaks at 8 threads, prefill at batch 256; the context barely matters.
+        decode_ms = 20 + abs(options["num_thread"] - 8) * 5 + options["num_ctx"] // 4096
+        prefill_ms = 10 + abs(options["num_batch"] - 256) // 32
+        return {"prompt_eval_count": 1000, "prompt_eval_duration": prefill_ms * 1_000_000, "eval_count": 100, "eval_duration": decode_ms * 1_000_000}
+
+    state.timing = timing
+    return tmp_path
+
+
+def tune(workspace: Path, url: str, *extra: str) -> int:
+    return modelfile_tune.main(
+        [
+            "--modelfile", str(workspace / "baseline.Modelfile"),
+            "--prompt-file", str(workspace / "prompt.txt"),
+            "--model", "llama3.1",
+            "--base-url", url,
+            "--num-thread", "4,8",
+            "--num-batch", "128,256",
+            "--num-ctx", "4096,8192",
+            "--output-dir", str(workspace / "tuned"),
+            "--cache-dir", str(workspace / "cache"),
+            "--env-file", str(workspace / "missing.env"),
+            *extra,
+        ]
+    )
+
+
+def test_halving_search_writes_tuned_modelfile_and_report(ollama_stub, tmp_path: Path) -> None:
+    url, state = ollama_stub
+    workspace = tuner_workspace(tmp_path, state)
+
+    assert tune(workspace, url) == 0
+
+    [tuned] = (workspace / "tuned").glob("*.Modelfile")
+    _, parameters = modelfile_tune.modelfile_parameters(tuned.read_text(encoding="utf-8"))
+    assert parameters == {"num_ctx": "4096", "num_thread": "8", "num_batch": "256"}
+    report = json.loads(tuned.with_suffix(".json").read_text(encoding="utf-8"))
+    assert [round["candidates"] for round in report["rounds"]] == [8, 3, 1]
+    assert [round["repeats"] for round in report["rounds"]] == [1, 2, 4]
+    assert report["baseline"] is None, "the baseline's num_batch is not in the Modelfile"
+    assert report["best"]["decode_tps"] == 4761.9
+    options = [request["body"]["options"] for request in state.requests]
+    assert all(option["num_predict"] == 128 for option in options)
+
+
+def test_repeat_runs_only_measure_new_candidates(ollama_stub, tmp_path: Path) -> None:
+    url, state = ollama_stub
+    workspace = tuner_workspace(tmp_path, state)
+
+    assert tune(workspace, url, "--strategy", "grid", "--repeats", "2") == 0
+    first = len(state.requests)
+    assert first == 8 * 3, "one untimed and two timed requests per candidate"
+
+    assert tune(workspace, url, "--strategy", "grid", "--repeats", "2") == 0
+    assert len(state.requests) == first, "everything was cached"
+
+    assert tune(workspace, url, "--strategy", "grid", "--repeats", "2", "--num-thread", "4,8,16") == 0
+    measured = [request["body"]["options"]["num_thread"] for request in state.requests[first:]]
+    assert measured and set(measured) == {16}
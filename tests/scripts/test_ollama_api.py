@@ -0,0 +1,36 @@
+"""Tests for the Ollama request helpers in ``scripts/ollama_api.py``."""
+from __future__ import annotations
+
+import json
+
+import ollama_api
+
+
+def test_stage_request_switches_to_chat_and_carries_options() -> None:
+    stage = ollama_api.StageRequest("m", "http://a", messages=[{"role": "user", "content": "Hallo"}], options={"num_ctx": 4096})
+    assert stage.url == "http://a/api/chat"
+    body = json.loads(stage.body(stream=False))
+    assert body == {"model": "m", "stream": False, "messages": [{"role": "user", "content": "Hallo"}], "options": {"num_ctx": 4096}}
+    assert ollama_api.StageRequest("m", "http://a,http://b").replicas == ["http://a", "http://b"]
+
+
+def test_send_and_stream_return_the_same_text(ollama_stub) -> None:
+    url, _ = ollama_stub
+    chat = ollama_api.StageRequest("m", url, messages=[{"role": "user", "content": "Hallo"}])
+    assert ollama_api.send_request(chat, 5)["response"] == "Hallo Welt", "chat replies mirror the message as response"
+    text, stats = ollama_api.stream_request(ollama_api.StageRequest("m", url, prompt="Hallo"), 5)
+    assert text == "Hallo Welt" and stats.chunks == 3 and stats.time_to_first_token is not None
+
+
+def test_stream_request_forwards_tokens_and_records_latency(ollama_stub) -> None:
+    url, state = ollama_stub
+    seen: list[str] = []
+    text, stats = ollama_api.stream_request(ollama_api.StageRequest("llama3.1", url, prompt="Hi"), 5, seen.append)
+
+    assert text == "Hallo Welt"
+    assert seen == state.chunks
+    assert state.requests[0]["body"]["stream"] is True
+    assert stats.chunks == 3
+    assert stats.time_to_first_token is not None and stats.time_to_first_token >= 0
+    assert stats.mean_inter_token is not None
+    assert stats.elapsed is not None and stats.elapsed >= stats.time_to_first_token
@@ -0,0 +1,88 @@
+"""Offline tests for ``scripts/ollama_chain.py`` against a local stub server."""
+from __future__ import annotations
+
+import json
+
+import ollama_chain
+
+
+def test_parse_step_splits_endpoint_and_directive() -> None:
+    step = ollama_chain.parse_step("llama3.1@localhost:11435#Review it", "http://fallback")
+    assert step.model == "llama3.1"
+    assert step.normalised_endpoint() == "http://localhost:11435"
+    assert step.directive == "Review it"
+
+
+def test_run_stage_prints_full_response(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    assert ollama_chain.main(["--prompt", "Hi", "--step", f"llama3.1@{url}"]) == 0
+    assert "Hallo Welt" in capsys.readouterr().out
+    assert state.requests[0]["body"]["stream"] is False
+
+
+def test_run_pipeline_streams_each_stage(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    exit_code = ollama_chain.main(["--prompt", "Start", "--step", f"a@{url}", "--step", f"b@{url}", "--stream"])
+
+    assert exit_code == 0
+    output = capsys.readouterr().out
+    assert output.count("ttft=") == 4  # Two inline stage lines plus the closing summary.
+    second_prompt = state.requests[1]["body"]["prompt"]
+    assert "### a\nHallo Welt" in second_prompt
+
+
+def test_batch_runs_stage_by_stage_and_reports_saved_loads(ollama_stub, tmp_path, capsys) -> None:
+    url, state = ollama_stub
+    batch = tmp_path / "prompts.jsonl"
+    batch.write_text('"Erster"\n{"id": "b", "prompt": "Zweiter"}\n"Dritter"\n', encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    exit_code = ollama_chain.main(
+        ["--batch", str(batch), "--batch-output", str(output), "--step", f"a@{url}", "--step", f"b@{url}"]
+    )
+
+    assert exit_code == 0
+    models = [entry["body"]["model"] for entry in state.requests]
+    assert models == ["a", "a", "a", "b", "b", "b"]
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(record["id"] for record in records) == ["1", "3", "b"]
+    assert all(len(record["responses"]) == 2 and record["error"] is None for record in records)
+    # Two cold loads stage-by-stage versus six when every prompt alternates a -> b.
+    assert "4.00s stage-by-stage vs ~12.00s prompt-by-prompt (saved ~8.00s)" in capsys.readouterr().out
+
+
+def test_chat_mode_sends_append_only_messages(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    argv = ["--prompt", "Start", "--api", "chat", "--keep-alive", "10m", "--step", f"m@{url}", "--step", f"m@{url}#Prüfe"]
+
+    assert ollama_chain.main(argv) == 0
+
+    first, second = (entry["body"] for entry in state.requests)
+    assert [entry["path"] for entry in state.requests] == ["/api/chat", "/api/chat"]
+    assert second["messages"][: len(first["messages"])] == first["messages"], "chat prefix must stay byte-stable"
+    assert second["messages"][-2:] == [
+        {"role": "assistant", "content": "Hallo Welt"},
+        {"role": "user", "content": "### Task for m\nPrüfe"},
+    ]
+    assert second["keep_alive"] == "10m"
+    output = capsys.readouterr().out
+    assert "=== Prefill (chat) ===" in output
+    # The stub only evaluates characters beyond the cached prefix (11 of 58), like Ollama's prompt cache.
+    assert "Step 2 (m): prefill: 47 prompt token(s)" in output
+
+
+def test_prefetch_hides_next_model_load_and_unloads_finished_models(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    other = url.replace("127.0.0.1", "localhost")  # Same stub, but a different endpoint for the chain.
+    argv = ["--prompt", "Start", "--step", f"a@{url}", "--step", f"b@{other}", "--prefetch", "--unload", "after-last-use"]
+
+    assert ollama_chain.main(argv) == 0
+
+    bodies = [entry["body"] for entry in state.requests]
+    preload = next(body for body in bodies if body["model"] == "b" and body.get("prompt") == "")
+    assert preload["keep_alive"] == ollama_chain.PREFETCH_KEEP_ALIVE
+    assert sorted(body["model"] for body in bodies if body.get("keep_alive") == 0) == ["a", "b"]
+    assert not state.resident
+    output = capsys.readouterr().out
+    assert "Step 1 (a): load hidden=0.00s exposed=2.00s (on demand)" in output
+    assert "Step 2 (b): load hidden=2.00s" in output
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import wait_for_http
+from http_pool import ConnectionPool
+from ollama_chain import StageRequest, stream_request
+from ollama_standin import Cassette, Exchange, ReplayConfig, parse_fault
+
+
+def send(url: str, prompt: str = "hi", model: str = "m1", messages=None):
+    pool = ConnectionPool()
+    try:
+        return stream_request(StageRequest(model, url, prompt=prompt, messages=messages), 5, pool=pool)
+    finally:
+        pool.close()
+
+
+def test_recorded_exchanges_replay_with_their_text_and_first_token_delay(ollama_stub, ollama_standin, tmp_path: Path) -> None:
+    stub_url, state = ollama_stub
+    state.load_duration_ns = 0
+    state.response_delay = 0.2
+    cassette_path = tmp_path / "ollama.cassette.json"
+    recorder_url, recorder = ollama_standin(upstream=stub_url, cassette_path=cassette_path)
+
+    recorded_text, _ = send(recorder_url)
+    send(recorder_url, messages=[{"role": "user", "content": "hi"}])
+    assert recorder.stats["recorded"] == 2
+
+    cassette = Cassette.load(cassette_path)
+    assert [exchange.path for exchange in cassette.exchanges] == ["/api/generate", "/api/chat"]
+    replay_url, replay = ollama_standin(cassette)
+    state.requests.clear()
+
+    text, stats = send(replay_url)
+    chat_text, _ = send(replay_url, messages=[{"role": "user", "content": "hi"}])
+
+    assert text == chat_text == recorded_text == "Hallo Welt"
+    assert stats.time_to_first_token >= 0.18, "the recorded prefill is replayed"
+    assert state.requests == [], "replay never reaches the upstream"
+    assert replay.stats["replayed"] == 2
+
+
+def test_token_rate_and_load_delay_shape_the_replay(ollama_standin) -> None:
+    url, _ = ollama_standin(config=ReplayConfig(token_rate=100, load_delay=0.2, synthetic_tokens=21))
+
+    _, cold = send(url)
+    _, warm = send(url)
+
+    assert cold.time_to_first_token >= 0.2
+    assert warm.time_to_first_token < 0.1
+    decode_tps = (warm.chunks - 1) / (warm.last_token_at - warm.first_token_at)
+    assert 70 <= decode_tps <= 101
+    assert cold.server["load_duration"] == 200_000_000 and warm.server["load_duration"] == 0
+    assert warm.server["eval_count"] == 21
+
+
+def test_concurrency_limit_queues_generations(ollama_standin) -> None:
+    url, standin = ollama_standin(config=ReplayConfig(token_rate=200, concurrency=1, synthetic_tokens=11))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(lambda _: send(url), range(3)))
+    wall = time.perf_counter() - started
+
+    assert standin.stats["peak_in_flight"] == 1
+    assert wall >= 3 * 10 / 200
+    assert max(stats.time_to_first_token for _, stats in results) >= 2 * 10 / 200, "the last request waited for two others"
+
+
+def test_injected_faults(ollama_standin) -> None:
+    error_url, _ = ollama_standin(config=ReplayConfig(faults=[parse_fault("error=1")]))
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        send(error_url)
+
+    drop_url, _ = ollama_standin(config=ReplayConfig(faults=[parse_fault("disconnect=1")], token_rate=1000))
+    with pytest.raises(RuntimeError, match="closed the stream before completion"):
+        send(drop_url)
+
+    stall_url, standin = ollama_standin(config=ReplayConfig(faults=[parse_fault("stall=1:0.2")], token_rate=1000))
+    _, stats = send(stall_url)
+    assert stats.time_to_first_token >= 0.2
+    assert standin.stats["faults"] == 1
+
+    with pytest.raises(ValueError, match="kind must be one of"):
+        parse_fault("boom=0.5")
+
+
+def test_wait_for_http_warms_models_against_the_standin(ollama_standin, capsys) -> None:
+    exchange = Exchange("/api/generate", {"model": "m1:latest", "prompt": "hi"}, 200, [(0.01, {"response": "ok", "done": True})])
+    url, standin = ollama_standin(Cassette([exchange]), ReplayConfig(load_delay=0.1))
+
+    assert wait_for_http.main(["--ollama-url", url, "--model", "m1", "--warm"]) == 0
+
+    [model] = json.loads(capsys.readouterr().out)["readiness"]["models"]
+    assert model["warm"] is True and model["load_duration_s"] == 0.1
+    assert "m1" in standin.resident
@@ -0,0 +1,24 @@
+"""Tests for ``scripts/provenance.py``."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import provenance
+
+
+def test_modelfile_for_accepts_the_latest_tag_and_git_commit_outside_a_repo(tmp_path: Path) -> None:
+    (tmp_path / "modelfiles").mkdir()
+    modelfile = tmp_path / "modelfiles" / "baseline.Modelfile"
+    modelfile.write_text("FROM llama3.1\nPARAMETER num_ctx 4096\n", encoding="utf-8")
+    assert provenance.modelfile_for("baseline:latest", tmp_path) == modelfile
+    assert provenance.modelfile_for("other", tmp_path) is None
+    assert provenance.modelfile_parameters(modelfile.read_text(encoding="utf-8")) == ("llama3.1", {"num_ctx": "4096"})
+    assert provenance.git_commit(tmp_path) is None
+
+
+def test_provenance_keys_the_run_by_host_and_model(ollama_stub) -> None:
+    url, _ = ollama_stub
+    origin = provenance.provenance(url, "baseline")
+    assert len(origin["host"]) == 12 and origin["host_facts"]["endpoint"] == url
+    assert origin["modelfile"] == "modelfiles/baseline.Modelfile" and origin["parameters"]
+    assert origin["git_commit"] == provenance.git_commit()
@@ -0,0 +1,22 @@
+"""Tests for ``scripts/settings.py``."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import settings
+
+
+def test_settings_prefer_cli_then_environment_then_env_file(tmp_path: Path, monkeypatch) -> None:
+    env = tmp_path / ".env"
+    env.write_text("# comment\nOLLAMA_BENCH_MODEL= qwen2.5:7b \nEVIDENCE_ROOT=out\n", encoding="utf-8")
+    values = settings.read_env_file(env)
+    assert values == {"OLLAMA_BENCH_MODEL": "qwen2.5:7b", "EVIDENCE_ROOT": "out"}
+    assert settings.read_env_file(tmp_path / "missing") == {}
+
+    monkeypatch.setenv("OLLAMA_BENCH_MODEL", "llama3.1")
+    assert settings.resolve_setting("cli", "OLLAMA_BENCH_MODEL", values) == "cli"
+    assert settings.resolve_setting(None, "OLLAMA_BENCH_MODEL", values) == "llama3.1"
+    monkeypatch.delenv("OLLAMA_BENCH_MODEL")
+    assert settings.resolve_setting(None, "OLLAMA_BENCH_MODEL", values) == "qwen2.5:7b"
+    assert settings.resolve_repo_path("out") == settings.REPO_ROOT / "out"
+    assert settings.resolve_repo_path(str(tmp_path)) == tmp_path
@@ -0,0 +1,21 @@
+"""Tests for ``scripts/stats.py``."""
+from __future__ import annotations
+
+import pytest
+
+import stats
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+    values = [4.0, 1.0, 3.0, 2.0]
+    assert stats.percentile(values, 50) == pytest.approx(2.5)
+    assert stats.percentile(values, 99) == pytest.approx(3.97)
+    assert stats.percentile([7.0], 95) == 7.0
+    assert stats.percentile([], 50) is None
+    assert stats.median([3.0, 1.0, 2.0]) == 2.0
+
+
+def test_rate_ignores_missing_or_zero_figures() -> None:
+    assert stats.rate(50, 2_000_000_000) == pytest.approx(25.0)
+    assert stats.rate(None, 1) is None
+    assert stats.rate(10, 0) is None
@@ -0,0 +1,93 @@
+"""Tests for the concurrent health poller in ``scripts/wait_for_http.py``."""
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+
+import pytest
+
+import wait_for_http
+
+
+def test_backoff_grows_and_respects_ceiling() -> None:
+    rng = random.Random(1)
+    delays = [wait_for_http.backoff_delay(n, 1.0, 4.0, 2.0, rng) for n in range(1, 6)]
+    assert 0.5 <= delays[0] <= 1.0
+    assert 1.0 <= delays[1] <= 2.0
+    assert all(2.0 <= value <= 4.0 for value in delays[2:])
+
+
+def test_main_reports_time_to_healthy_as_json(ollama_stub, capsys) -> None:
+    url, _ = ollama_stub
+    exit_code = wait_for_http.main([f"{url}/api/version", f"{url}/", "--retries", "2", "--delay", "0.01"])
+
+    assert exit_code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["healthy"] is True
+    assert [entry["url"] for entry in report["urls"]] == [f"{url}/api/version", f"{url}/"]
+    assert all(entry["attempts"] == 1 and entry["time_to_healthy"] is not None for entry in report["urls"])
+
+
+def test_deadline_caps_total_wait_for_unreachable_urls(capsys) -> None:
+    started = time.monotonic()
+    exit_code = wait_for_http.main(
+        ["http://127.0.0.1:9/", "http://127.0.0.1:9/other", "--retries", "100", "--delay", "0.05", "--deadline", "0.5"]
+    )
+    elapsed = time.monotonic() - started
+
+    assert exit_code == 1
+    assert elapsed < 2.0, "unreachable URLs must be polled concurrently within the shared deadline"
+    report = json.loads(capsys.readouterr().out)
+    assert report["healthy"] is False
+    assert all(entry["last_error"] for entry in report["urls"])
+
+
+def test_models_are_not_checked_when_a_url_is_unhealthy(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    exit_code = wait_for_http.main(["http://127.0.0.1:9/", "--ollama-url", url, "--model", "m1", "--warm", "--retries", "1"])
+
+    assert exit_code == 1
+    assert "readiness" not in json.loads(capsys.readouterr().out)
+    assert state.requests == [], "neither /api/tags nor a warm-up is requested once a URL failed"
+
+
+def test_deadline_must_be_positive(capsys) -> None:
+    with pytest.raises(SystemExit):
+        wait_for_http.parse_args(["http://localhost/", "--deadline", "0"])
+    assert "--deadline must be positive" in capsys.readouterr().err
+
+
+def test_readiness_waits_for_models_and_warms_them_in_parallel(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    state.tags = ["m1:latest"]
+    threading.Timer(0.2, lambda: state.tags.append("m2:7b")).start()
+
+    exit_code = wait_for_http.main(
+        [f"{url}/", "--ollama-url", url, "--model", "m1", "--model", "m2:7b", "--warm", "--retries", "50", "--delay", "0.02", "--max-delay", "0.05"]
+    )
+
+    assert exit_code == 0
+    readiness = json.loads(capsys.readouterr().out)["readiness"]
+    assert readiness["ready"] is True
+    assert readiness["tags"]["attempts"] > 1, "m2:7b only appears after a few polls"
+    assert [(entry["model"], entry["warm"], entry["load_duration_s"]) for entry in readiness["models"]] == [
+        ("m1", True, 2.0),
+        ("m2:7b", True, 2.0),
+    ]
+    warmups = [request["body"] for request in state.requests if request["path"] == "/api/generate"]
+    assert sorted(body["model"] for body in warmups) == ["m1", "m2:7b"]
+    assert all(body["prompt"] == "" and body["keep_alive"] == "30m" for body in warmups)
+
+
+def test_readiness_fails_when_a_model_never_appears(ollama_stub, capsys) -> None:
+    url, state = ollama_stub
+    state.tags = ["m1:latest"]
+    exit_code = wait_for_http.main(["--ollama-url", url, "--model", "m1", "--model", "absent", "--retries", "2", "--delay", "0.01"])
+
+    assert exit_code == 1
+    readiness = json.loads(capsys.readouterr().out)["readiness"]
+    assert readiness["ready"] is False
+    assert all(entry["error"] == "missing model(s): absent" for entry in readiness["models"])
+    assert not any(request["path"] == "/api/generate" for request in state.requests), "nothing is warmed without --warm"